@@ -0,0 +1 @@
+# Benchmarks Package - Offline performance benchmarks for CardGuard hot paths
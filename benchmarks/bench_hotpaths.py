@@ -0,0 +1,251 @@
+"""
+Benchmarks for CardGuard hot paths.
+
+Runs fully offline against a throwaway home directory, so the real
+~/.cardguard is never touched. Results are printed as a table and can be
+written as JSON (--output) and compared against a saved baseline
+(--compare) to catch regressions.
+
+    python benchmarks/bench_hotpaths.py --quick --output bench.json
+    python benchmarks/bench_hotpaths.py --compare bench.json
+"""
+import os
+import sys
+import json
+import itertools
+import shutil
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+
+# Allow running as a script from the repository root or benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import BenchmarkRunner, compare_results, isolate_home, remove_home
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000, 10_000)
+DEFAULT_SAVE_SIZES = (1_000, 100_000)
+DEFAULT_APP_COUNTS = (1_000, 5_000)
+
+
+def populate_blacklist(block_manager, count):
+    """Fill a BlockManager with count blocked card hashes and count patterns."""
+    block_manager.blacklist = {
+        'blocked_cards': [
+            {
+                'hash': hashlib.sha256(f"BLOCKED-{i:08d}".encode()).hexdigest(),
+                'reason': 'benchmark',
+                'timestamp': '2024-01-01T00:00:00',
+            }
+            for i in range(count)
+        ],
+        'blocked_patterns': [f"PAT{i:08X}" for i in range(count)],
+    }
+    block_manager._index_blacklist()
+
+
+def populate_locker(app_locker, count):
+    """Fill an AppLocker with count registered cards and count locked apps."""
+    from utils.records import LockedApp, RegisteredCard
+
+    registered_at = 1704067200.0
+    app_locker.registered_cards = {
+        card_id: RegisteredCard(card_id, f"Card {i}", registered_at)
+        for i, card_id in ((i, f"CARD-{i:08d}") for i in range(count))
+    }
+    app_locker.locked_apps = {
+        path: LockedApp(path, f"App {i}")
+        for i, path in ((i, f"/opt/vendor{i}/bin/app{i}") for i in range(count))
+    }
+    app_locker.locked_apps_version += 1
+
+
+def build_linux_apps(home, count):
+    """Create count .desktop entries under ~/.local/share/applications."""
+    folder = home / '.local/share/applications'
+    shutil.rmtree(folder, ignore_errors=True)
+    folder.mkdir(parents=True)
+    for i in range(count):
+        (folder / f"app{i}.desktop").write_text(
+            f"[Desktop Entry]\nType=Application\nName=App {i}\nExec=/usr/bin/app{i}\n")
+
+
+def build_windows_apps(home, count):
+    """Create count program folders containing an .exe under ~/AppData/Local/Programs."""
+    folder = home / 'AppData/Local/Programs'
+    shutil.rmtree(folder, ignore_errors=True)
+    for i in range(count):
+        bin_dir = folder / f"App{i}" / 'bin'
+        bin_dir.mkdir(parents=True)
+        (bin_dir / f"app{i}.exe").write_bytes(b'MZ')
+
+
+def bench_block_manager(runner, sizes):
+    from utils.block_manager import BlockManager
+
+    block_manager = BlockManager(velocity=None)
+    for size in sizes:
+        if not runner.wants('block_manager.is_suspicious'):
+            break
+        populate_blacklist(block_manager, size)
+        probes = {
+            'clean': 'CARD-12345678',
+            'blocked': f"BLOCKED-{size - 1:08d}",
+            'builtin_pattern': 'INVALID-CARD-DATA',
+        }
+        for probe, card in probes.items():
+            runner.run('block_manager.is_suspicious', lambda: block_manager.is_suspicious(card),
+                       {'entries': size, 'probe': probe})
+    block_manager.blacklist = {'blocked_cards': [], 'blocked_patterns': []}
+    block_manager._index_blacklist()
+
+
+def bench_velocity(runner, sizes):
+    from utils.block_manager import hash_card
+    from utils.velocity import VelocityTracker
+
+    for size in sizes:
+        if not runner.wants('velocity.check'):
+            break
+        tracker = VelocityTracker()
+        keys = itertools.cycle([hash_card(f"CARD-{i:08d}") for i in range(size)])
+        runner.run('velocity.check', lambda: tracker.check(next(keys), 'reader-0'),
+                   {'distinct_cards': size, 'tracked': tracker.max_tracked})
+
+
+def bench_app_locker(runner, sizes, root):
+    from utils.app_locker import AppLocker
+
+    for size in sizes:
+        if not any(runner.wants(name) for name in ('app_locker.verify_access',
+                                                   'app_locker.is_app_locked',
+                                                   'app_locker.get_registered_cards')):
+            break
+        app_locker = AppLocker(config_dir=root / f"locker-{size}")
+        populate_locker(app_locker, size)
+        hit_card, miss_card = f"CARD-{size - 1:08d}", 'CARD-UNKNOWN'
+        hit_app, miss_app = f"/opt/vendor{size - 1}/bin/app{size - 1}", '/usr/bin/unlocked'
+        runner.run('app_locker.verify_access', lambda: app_locker.verify_access(hit_card),
+                   {'entries': size, 'probe': 'registered'})
+        runner.run('app_locker.verify_access', lambda: app_locker.verify_access(miss_card),
+                   {'entries': size, 'probe': 'unknown'})
+        runner.run('app_locker.is_app_locked', lambda: app_locker.is_app_locked(hit_app),
+                   {'entries': size, 'probe': 'locked'})
+        runner.run('app_locker.is_app_locked', lambda: app_locker.is_app_locked(miss_app),
+                   {'entries': size, 'probe': 'unlocked'})
+        runner.run('app_locker.get_registered_cards', app_locker.get_registered_cards,
+                   {'entries': size})
+
+
+def bench_installed_apps(runner, app_counts, home):
+    from utils.app_locker import AppLocker
+
+    app_locker = AppLocker(config_dir=home / 'inventory')
+    # Time the full scans: _get_windows_apps() stops after 50 entries, which
+    # would make the per-entry rate grow with the tree size
+    scans = (
+        ('linux', build_linux_apps, app_locker._iter_linux_apps),
+        ('windows', build_windows_apps, app_locker._iter_windows_apps),
+    )
+    for count in app_counts:
+        for platform_name, build, scan in scans:
+            name = f'app_locker.iter_installed_apps[{platform_name}]'
+            if not runner.wants(name):
+                continue
+            build(home, count)
+            # Rate per entry actually returned (the Linux scan also sees system entries)
+            found = len(list(scan()))
+            runner.run(name, lambda scan=scan: list(scan()),
+                       {'entries': count}, ops_per_call=found)
+
+
+def bench_persistence(runner, sizes, root):
+    from utils.app_locker import AppLocker
+    from utils.block_manager import BlockManager
+    from utils.usage_counter import UsageCounter
+
+    block_manager = BlockManager(velocity=None)
+    usage_counter = UsageCounter()
+    for size in sizes:
+        app_locker = AppLocker(config_dir=root / f"persist-{size}")
+        populate_locker(app_locker, size)
+        runner.run('app_locker._save_config', app_locker._save_config, {'entries': size})
+        runner.run('app_locker._save_cards', app_locker._save_cards, {'entries': size})
+        runner.run('app_locker._save_locked_apps', app_locker._save_locked_apps, {'entries': size})
+        if runner.wants('block_manager._save_blacklist'):
+            populate_blacklist(block_manager, size)
+            runner.run('block_manager._save_blacklist', block_manager._save_blacklist,
+                       {'entries': size})
+    block_manager.clear_blacklist()
+    runner.run('usage_counter._save_data', usage_counter._save_data, {'history': 100})
+
+
+def bench_usage_counter(runner):
+    from utils.usage_counter import UsageCounter
+
+    usage_counter = UsageCounter()
+    runner.run('usage_counter.increment', usage_counter.increment, {})
+
+
+def parse_sizes(value):
+    return tuple(int(v) for v in value.split(',') if v.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CardGuard hot path benchmarks')
+    parser.add_argument('--sizes', type=parse_sizes, default=None,
+                        help='Comma separated store sizes (default: 1000,100000,1000000)')
+    parser.add_argument('--save-sizes', type=parse_sizes, default=None,
+                        help='Store sizes for the _save_* benchmarks (default: 1000,100000)')
+    parser.add_argument('--app-counts', type=parse_sizes, default=None,
+                        help='Synthetic installed app counts (default: 1000,5000)')
+    parser.add_argument('--quick', action='store_true', help='Small sizes for a fast smoke run')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Minimum seconds spent timing each case')
+    parser.add_argument('--filter', default=None, help='Only run cases whose name contains this')
+    parser.add_argument('--output', default=None, help='Write JSON results to this file')
+    parser.add_argument('--compare', default=None, help='Baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown vs baseline before failing (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    save_sizes = args.save_sizes or (QUICK_SIZES if args.quick else DEFAULT_SAVE_SIZES)
+    app_counts = args.app_counts or ((200,) if args.quick else DEFAULT_APP_COUNTS)
+
+    root = Path(tempfile.mkdtemp(prefix='cardguard-bench-'))
+    isolate_home(root)
+    runner = BenchmarkRunner(min_time=args.min_time, name_filter=args.filter)
+    try:
+        bench_block_manager(runner, sizes)
+        bench_velocity(runner, sizes)
+        bench_app_locker(runner, sizes, root)
+        bench_installed_apps(runner, app_counts, root)
+        bench_persistence(runner, save_sizes, root)
+        bench_usage_counter(runner)
+    finally:
+        remove_home(root)
+
+    report = runner.report(sizes=list(sizes), save_sizes=list(save_sizes),
+                           app_counts=list(app_counts))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.tolerance)
+        for name, params, old, new in regressions:
+            print(f"REGRESSION {name} {params}: {old * 1e6:.2f} us -> {new * 1e6:.2f} us")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import shutil
+import platform
+import statistics
+from datetime import datetime
+
+
+def isolate_home(root):
+    """Point Path.home() at a scratch directory so ~/.cardguard is never touched."""
+    os.environ['HOME'] = str(root)
+    os.environ['USERPROFILE'] = str(root)
+
+
+def remove_home(root):
+    """Delete a scratch home from isolate_home(), releasing its state snapshot first."""
+    from utils.snapshot import close_snapshot
+    close_snapshot(os.path.join(str(root), '.cardguard'))
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def percentiles(samples, points=(50, 95, 99, 99.9)):
+    """
+    Nearest-rank percentiles of a list of samples.
+
+    Returns:
+        dict: e.g. {'p50': ..., 'p99': ...}; empty if there are no samples
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    result = {}
+    for point in points:
+        index = min(len(ordered) - 1, max(0, int(round(point / 100 * len(ordered))) - 1))
+        result[f"p{point:g}"] = ordered[index]
+    return result
+
+
+class BenchmarkRunner:
+    """
+    Times benchmark cases and collects machine-readable results.
+    Each case runs for at least min_time seconds (adaptive iteration count).
+    """
+
+    def __init__(self, min_time=0.2, max_iterations=1_000_000, name_filter=None):
+        self.min_time = min_time
+        self.max_iterations = max_iterations
+        self.name_filter = name_filter
+        self.results = []
+
+    def wants(self, name):
+        """Check whether a case is selected by the name filter."""
+        return not self.name_filter or self.name_filter in name
+
+    def run(self, name, func, params=None, setup=None, ops_per_call=1):
+        """
+        Time func() repeatedly and record the result.
+
+        Args:
+            name (str): Case name, e.g. 'block_manager.is_suspicious'
+            func (callable): Zero-argument callable to time
+            params (dict): Parameters that identify this case (sizes etc.)
+            setup (callable): Called before every timed call (not timed)
+            ops_per_call (int): Operations performed by one call of func
+
+        Returns:
+            dict: Result record, or None if filtered out
+        """
+        if not self.wants(name):
+            return None
+
+        # Warm-up call so one-off work (caches, lazily compiled indexes) is not timed
+        if setup is not None:
+            setup()
+        func()
+
+        samples = []
+        deadline = time.perf_counter() + self.min_time
+        while len(samples) < self.max_iterations:
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+            if time.perf_counter() >= deadline and len(samples) >= 3:
+                break
+
+        samples.sort()
+        mean = statistics.fmean(samples)
+        result = {
+            'name': name,
+            'params': params or {},
+            'iterations': len(samples),
+            'mean_s': mean,
+            'min_s': samples[0],
+            'p50_s': samples[len(samples) // 2],
+            'p95_s': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            'ops_per_sec': ops_per_call / mean if mean > 0 else float('inf'),
+        }
+        self.results.append(result)
+        print(f"{name:<40} {_format_params(params):<34} "
+              f"{mean * 1e6:>12.2f} us/call {result['ops_per_sec']:>14.0f} ops/s")
+        return result
+
+    def report(self, **meta):
+        """Build the JSON report for all collected results."""
+        return {
+            'meta': {
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                **meta,
+            },
+            'results': self.results,
+        }
+
+
+def _format_params(params):
+    return ','.join(f"{k}={v}" for k, v in (params or {}).items())
+
+
+def _result_key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare_results(current, baseline, tolerance=0.25):
+    """
+    Compare two reports and list regressions.
+
+    Args:
+        current (dict): Report from this run
+        baseline (dict): Previously saved report
+        tolerance (float): Allowed slowdown of mean time (0.25 = 25%)
+
+    Returns:
+        list: (name, params, baseline_mean, current_mean) for each regression
+    """
+    previous = {_result_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in current.get('results', []):
+        old = previous.get(_result_key(result))
+        if old is None:
+            continue
+        if result['mean_s'] > old['mean_s'] * (1 + tolerance):
+            regressions.append((result['name'], result['params'], old['mean_s'], result['mean_s']))
+    return regressions
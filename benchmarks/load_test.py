@@ -0,0 +1,238 @@
+"""
+Load test for the card verification path.
+
+Drives BlockManager.is_suspicious and AppLocker.verify_access with a
+simulated card stream (or a recorded scan log) and reports throughput and
+tail latency as JSON. No hardware is needed.
+
+    python benchmarks/load_test.py --rate 10000 --duration 5 --seed 1
+    python benchmarks/load_test.py --rate 0 --count 200000        # unthrottled
+    python benchmarks/load_test.py --replay scans.jsonl --speed 10
+    python benchmarks/load_test.py --rate 0 --readers 8 --pipeline --burst 64
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+
+# Allow running as a script from the repository root or benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import isolate_home, percentiles, remove_home
+from hardware.simulator import (CardStreamGenerator, ScanLogReplayer, record_scan_log,
+                                DEFAULT_MIX)
+
+
+def parse_mix(value):
+    """Parse 'registered=0.7,unknown=0.3' into a weight dict."""
+    mix = {}
+    for part in value.split(','):
+        if part.strip():
+            kind, weight = part.split('=')
+            mix[kind.strip()] = float(weight)
+    return mix
+
+
+def prepare_state(app_locker, block_manager, generator):
+    """Register the generator's card pool and blacklist its blocked pool."""
+    from utils.block_manager import hash_card
+    from utils.records import RegisteredCard
+
+    for card_id in generator.registered_cards:
+        app_locker.registered_cards[card_id] = RegisteredCard(card_id, card_id)
+    app_locker._save_cards()
+    block_manager.add_hashes_to_blacklist(
+        (hash_card(card_id), 'load test') for card_id in generator.blacklisted_cards)
+
+
+def run_load(events, app_locker, block_manager, paced):
+    """
+    Verify every tap and measure per-tap latency.
+
+    For paced streams the lag between a tap's scheduled time and the moment
+    it was verified is measured too, which shows when the verifier falls behind.
+    """
+    latencies = []
+    lags = []
+    decisions = Counter()
+    start = time.perf_counter()
+    for event in events:
+        t0 = time.perf_counter()
+        if block_manager.is_suspicious(event.card_id, event.reader_id):
+            decision = 'blocked'
+        elif app_locker.verify_access(event.card_id):
+            decision = 'granted'
+        else:
+            decision = 'denied'
+        t1 = time.perf_counter()
+        latencies.append(t1 - t0)
+        if paced:
+            lags.append(max(0.0, t1 - (start + event.offset)))
+        decisions[f"{event.kind or 'unknown'}:{decision}"] += 1
+    elapsed = time.perf_counter() - start
+
+    report = {
+        'taps': len(latencies),
+        'elapsed_s': elapsed,
+        'throughput_per_s': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_s': {
+            'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'max': max(latencies) if latencies else 0.0,
+            **percentiles(latencies),
+        },
+        'decisions': dict(sorted(decisions.items())),
+    }
+    if paced:
+        report['lag_s'] = {'max': max(lags) if lags else 0.0, **percentiles(lags)}
+    return report
+
+
+def run_pipeline_load(events, app_locker, block_manager, paced, burst=1, workers=None):
+    """
+    Push every tap through a ScanPipeline and measure submit-to-decision latency.
+
+    Taps are handed over burst at a time with submit_many(). Decisions are
+    also checked to come out in tap order for each reader.
+    """
+    from utils.scan_pipeline import ScanPipeline
+
+    latencies = []
+    lags = []
+    decisions = Counter()
+    last_seq = {}
+    reordered = 0
+    # on_result runs on every notify worker thread
+    results_lock = threading.Lock()
+    start = time.perf_counter()
+
+    def on_result(ctx):
+        nonlocal reordered
+        t1 = time.perf_counter()
+        event, t0 = ctx.event
+        with results_lock:
+            latencies.append(t1 - t0)
+            if paced:
+                lags.append(max(0.0, t1 - (start + event.offset)))
+            if event.seq < last_seq.get(event.reader_id, -1):
+                reordered += 1
+            last_seq[event.reader_id] = event.seq
+            decisions[f"{event.kind or 'unknown'}:{ctx.decision}"] += 1
+
+    pipeline = ScanPipeline(app_locker, block_manager, on_result=on_result, workers=workers)
+    try:
+        pending = []
+        for event in events:
+            pending.append((event.reader_id, event.card_id, (event, time.perf_counter())))
+            if len(pending) >= burst:
+                pipeline.submit_many(pending)
+                pending = []
+        if pending:
+            pipeline.submit_many(pending)
+        pipeline.wait_idle()
+    finally:
+        pipeline.close()
+    elapsed = time.perf_counter() - start
+
+    report = {
+        'taps': len(latencies),
+        'elapsed_s': elapsed,
+        'throughput_per_s': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_s': {
+            'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'max': max(latencies) if latencies else 0.0,
+            **percentiles(latencies),
+        },
+        'decisions': dict(sorted(decisions.items())),
+        'reordered': reordered,
+    }
+    if paced:
+        report['lag_s'] = {'max': max(lags) if lags else 0.0, **percentiles(lags)}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CardGuard verification load test')
+    parser.add_argument('--rate', type=float, default=10000,
+                        help='Target taps per second, 0 for unthrottled (default: 10000)')
+    parser.add_argument('--count', type=int, default=None, help='Number of taps to generate')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='Seconds of traffic to generate (default: 5 when no --count)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--mix', type=parse_mix, default=None,
+                        help='Card mix, e.g. registered=0.7,unknown=0.2,blacklisted=0.05,pattern=0.05')
+    parser.add_argument('--readers', type=int, default=1, help='Number of simulated readers')
+    parser.add_argument('--pool-size', type=int, default=1000,
+                        help='Registered and blacklisted card pool size')
+    parser.add_argument('--velocity', action='store_true',
+                        help='Enable velocity checks (off by default: a small card pool trips them)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Process taps through utils.scan_pipeline instead of inline')
+    parser.add_argument('--burst', type=int, default=1,
+                        help='Taps handed to the pipeline at once (default: 1)')
+    parser.add_argument('--replay', default=None, help='Replay this recorded scan log instead')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Replay speed multiplier, 0 for unthrottled')
+    parser.add_argument('--record', default=None, help='Also write the generated taps to this log')
+    parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    root = Path(tempfile.mkdtemp(prefix='cardguard-load-'))
+    isolate_home(root)
+    try:
+        from utils.app_locker import AppLocker
+        from utils.block_manager import BlockManager
+
+        app_locker = AppLocker(config_dir=root / '.cardguard')
+        block_manager = BlockManager(velocity=True if args.velocity else None)
+        generator = CardStreamGenerator(rate=args.rate or None, seed=args.seed,
+                                        mix=args.mix, readers=args.readers,
+                                        pool_size=args.pool_size)
+        prepare_state(app_locker, block_manager, generator)
+
+        if args.replay:
+            events = ScanLogReplayer(args.replay, speed=args.speed or None).events()
+            paced = bool(args.speed)
+        else:
+            count, duration = args.count, args.duration
+            if count is None and duration is None:
+                duration = 5.0
+            if count is None and not args.rate:
+                count = int(duration * 100000)
+                duration = None
+            if args.record:
+                record_scan_log(generator.events(count, duration, paced=False), args.record)
+                generator = CardStreamGenerator(rate=args.rate or None, seed=args.seed,
+                                                mix=args.mix, readers=args.readers,
+                                                pool_size=args.pool_size)
+            events = generator.events(count=count, duration=duration)
+            paced = bool(args.rate)
+
+        if args.pipeline:
+            report = run_pipeline_load(events, app_locker, block_manager, paced,
+                                       burst=max(1, args.burst))
+        else:
+            report = run_load(events, app_locker, block_manager, paced)
+        report['config'] = {
+            'rate': args.rate, 'seed': args.seed, 'readers': args.readers,
+            'mix': args.mix or DEFAULT_MIX, 'pool_size': args.pool_size,
+            'replay': args.replay, 'velocity': args.velocity,
+            'pipeline': args.pipeline, 'burst': args.burst if args.pipeline else None,
+        }
+    finally:
+        remove_home(root)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
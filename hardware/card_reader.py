@@ -1,21 +1,31 @@
 import time
 import random
 from typing import Optional, Dict
+from utils.metrics import CARD_SCANS
 
 class CardReader:
     """Hardware interface for NFC/RFID card reader"""
     
-    def __init__(self):
+    def __init__(self, simulator=None):
         self.card_present = False
         self.last_card_id = None
+        # Optional CardStreamGenerator used instead of the random demo reads
+        self.simulator = simulator
         
     def read_card(self) -> Optional[str]:
         """Read card ID from reader. Returns None if no card present."""
+        if self.simulator is not None:
+            self.card_present = True
+            self.last_card_id = self.simulator.next_card()
+            CARD_SCANS.inc(source='simulator', result='card')
+            return self.last_card_id
         # Simulate card reading with random ID for demo
         if random.random() < 0.3:  # 30% chance of card being present
             self.card_present = True
             self.last_card_id = f"CARD-{random.randint(1000, 9999)}"
+            CARD_SCANS.inc(source='reader', result='card')
             return self.last_card_id
+        CARD_SCANS.inc(source='reader', result='none')
         return None
     
     def is_card_present(self) -> bool:
@@ -1,5 +1,6 @@
 import time
 import random
+from utils.metrics import CARD_SCANS
 
 class DeviceHandler:
     """
@@ -7,10 +8,12 @@ class DeviceHandler:
     Provides simulated and real hardware connectivity.
     """
     
-    def __init__(self):
+    def __init__(self, simulator=None):
         self.connected = False
         self.device_info = None
         self.last_scan_time = None
+        # Optional CardStreamGenerator; replaces the slow random demo scans
+        self.simulator = simulator
         
     def connect(self):
         """
@@ -22,7 +25,8 @@ class DeviceHandler:
         try:
             # Simulate device connection
             # In a real implementation, this would connect to actual hardware
-            time.sleep(0.5)  # Simulate connection delay
+            if self.simulator is None:
+                time.sleep(0.5)  # Simulate connection delay
             
             # For demo purposes, simulate successful connection
             self.connected = True
@@ -59,6 +63,11 @@ class DeviceHandler:
             print("Device not connected")
             return None
             
+        if self.simulator is not None:
+            self.last_scan_time = time.time()
+            CARD_SCANS.inc(source='simulator', result='card')
+            return self.simulator.next_card()
+            
         try:
             # Simulate card scanning
             time.sleep(1)  # Simulate scan time
@@ -74,10 +83,12 @@ class DeviceHandler:
                 card_data = "INVALID-CARD-DATA"
                 
             self.last_scan_time = time.time()
+            CARD_SCANS.inc(source='device', result='card')
             return card_data
             
         except Exception as e:
             print(f"Scan error: {e}")
+            CARD_SCANS.inc(source='device', result='error')
             return None
             
     def get_device_info(self):
@@ -0,0 +1,210 @@
+import csv
+import json
+import time
+import random
+import bisect
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+REGISTERED = 'registered'
+UNKNOWN = 'unknown'
+BLACKLISTED = 'blacklisted'
+PATTERN = 'pattern'
+
+DEFAULT_MIX = {REGISTERED: 0.7, UNKNOWN: 0.2, BLACKLISTED: 0.05, PATTERN: 0.05}
+
+# Same markers BlockManager treats as suspicious
+SUSPICIOUS_MARKERS = ['INVALID', 'ERROR', 'CORRUPT', 'MALFORMED', '00000000', 'FFFFFFFF']
+
+# Don't bother sleeping for less than this; catch up in bursts instead
+_MIN_SLEEP = 0.001
+
+
+class ScanEvent:
+    """A single simulated card tap."""
+
+    __slots__ = ('seq', 'offset', 'reader_id', 'card_id', 'kind')
+
+    def __init__(self, seq, offset, reader_id, card_id, kind=None):
+        self.seq = seq
+        self.offset = offset
+        self.reader_id = reader_id
+        self.card_id = card_id
+        self.kind = kind
+
+    def to_dict(self) -> Dict:
+        return {
+            'seq': self.seq,
+            'offset': round(self.offset, 6),
+            'reader_id': self.reader_id,
+            'card_id': self.card_id,
+            'kind': self.kind,
+        }
+
+    def __repr__(self):
+        return f"ScanEvent({self.seq}, {self.reader_id!r}, {self.card_id!r}, {self.kind!r})"
+
+
+def _paced(events: Iterator[ScanEvent], speed: Optional[float]) -> Iterator[ScanEvent]:
+    """Release events at their offsets (scaled by speed); None means unthrottled."""
+    if not speed:
+        yield from events
+        return
+    start = time.perf_counter()
+    for event in events:
+        delay = start + event.offset / speed - time.perf_counter()
+        if delay > _MIN_SLEEP:
+            time.sleep(delay)
+        yield event
+
+
+class CardStreamGenerator:
+    """
+    Deterministic, rate-controlled card tap generator for load testing.
+
+    Taps are drawn from a weighted mix of registered, unknown, blacklisted
+    and pattern-matching cards. The same seed always produces the same stream.
+    """
+
+    def __init__(self, rate: Optional[float] = None, seed: Optional[int] = None,
+                 mix: Optional[Dict[str, float]] = None,
+                 registered_cards: Optional[List[str]] = None,
+                 blacklisted_cards: Optional[List[str]] = None,
+                 readers: int = 1, pool_size: int = 1000):
+        """
+        Args:
+            rate (float): Target taps per second, None or 0 for unthrottled
+            seed (int): Random seed for a reproducible stream
+            mix (dict): Relative weights for each card kind
+            registered_cards (list): Card IDs to use for registered taps
+            blacklisted_cards (list): Card IDs to use for blacklisted taps
+            readers (int): Number of simulated readers taps are spread over
+            pool_size (int): Size of the synthetic pools when no IDs are given
+        """
+        self.rate = rate
+        self.seed = seed
+        self.readers = max(1, readers)
+        self._random = random.Random(seed)
+
+        mix = dict(DEFAULT_MIX if mix is None else mix)
+        unknown_kinds = set(mix) - set(DEFAULT_MIX)
+        if unknown_kinds:
+            raise ValueError(f"Unknown card kinds in mix: {sorted(unknown_kinds)}")
+        total = sum(mix.values())
+        if total <= 0:
+            raise ValueError("Card mix weights must add up to more than zero")
+        self._kinds = [kind for kind, weight in mix.items() if weight > 0]
+        self._cumulative = []
+        running = 0.0
+        for kind in self._kinds:
+            running += mix[kind] / total
+            self._cumulative.append(running)
+
+        self.registered_cards = list(registered_cards or
+                                     [f"CARD-{i:08d}" for i in range(1, pool_size + 1)])
+        self.blacklisted_cards = list(blacklisted_cards or
+                                      [f"BLOCKED-{i:08d}" for i in range(1, pool_size + 1)])
+        self._seq = 0
+
+    def _pick_kind(self) -> str:
+        index = bisect.bisect_left(self._cumulative, self._random.random())
+        return self._kinds[min(index, len(self._kinds) - 1)]
+
+    def _card_for(self, kind: str) -> str:
+        rng = self._random
+        if kind == REGISTERED:
+            return rng.choice(self.registered_cards)
+        if kind == BLACKLISTED:
+            return rng.choice(self.blacklisted_cards)
+        if kind == PATTERN:
+            return f"{rng.choice(SUSPICIOUS_MARKERS)}-{rng.randrange(10 ** 6):06d}"
+        return f"CARD-U{rng.randrange(10 ** 8):08d}"
+
+    def next_event(self) -> ScanEvent:
+        """Generate the next tap immediately (no pacing)."""
+        seq = self._seq
+        self._seq += 1
+        kind = self._pick_kind()
+        offset = seq / self.rate if self.rate else 0.0
+        reader_id = f"reader-{self._random.randrange(self.readers)}" if self.readers > 1 else 'reader-0'
+        return ScanEvent(seq, offset, reader_id, self._card_for(kind), kind)
+
+    def next_card(self) -> str:
+        """Generate the next card ID immediately (for CardReader/DeviceHandler)."""
+        return self.next_event().card_id
+
+    def _generate(self, count, duration) -> Iterator[ScanEvent]:
+        produced = 0
+        while count is None or produced < count:
+            event = self.next_event()
+            if duration is not None and self.rate and event.offset >= duration:
+                return
+            produced += 1
+            yield event
+
+    def events(self, count: Optional[int] = None, duration: Optional[float] = None,
+               paced: bool = True) -> Iterator[ScanEvent]:
+        """
+        Yield taps paced at the target rate.
+
+        Args:
+            count (int): Stop after this many taps (None for endless)
+            duration (float): Stop after this many seconds of stream time
+            paced (bool): False yields as fast as possible (offsets are kept)
+        """
+        if duration is not None and not self.rate and count is None:
+            raise ValueError("duration needs a rate (or also pass count)")
+        speed = 1.0 if self.rate and paced else None
+        yield from _paced(self._generate(count, duration), speed)
+
+    def __iter__(self):
+        return self.events()
+
+
+class ScanLogReplayer:
+    """
+    Replays a recorded scan log (JSON lines or CSV with offset, reader_id,
+    card_id and optional kind columns) with the original timing.
+    """
+
+    def __init__(self, path, speed: Optional[float] = 1.0):
+        """
+        Args:
+            path (str): Scan log file (.jsonl/.ndjson or .csv)
+            speed (float): Playback speed multiplier, None for unthrottled
+        """
+        self.path = Path(path)
+        self.speed = speed
+
+    def _read(self) -> Iterator[ScanEvent]:
+        with open(self.path, 'r', newline='') as f:
+            if self.path.suffix.lower() == '.csv':
+                rows = csv.DictReader(f)
+            else:
+                rows = (json.loads(line) for line in f if line.strip())
+            for seq, row in enumerate(rows):
+                yield ScanEvent(int(row.get('seq') or seq), float(row.get('offset') or 0.0),
+                                row.get('reader_id') or 'reader-0', row['card_id'],
+                                row.get('kind') or None)
+
+    def events(self) -> Iterator[ScanEvent]:
+        """Yield recorded taps, paced by their offsets."""
+        yield from _paced(self._read(), self.speed)
+
+    def __iter__(self):
+        return self.events()
+
+
+def record_scan_log(events, path) -> int:
+    """
+    Write taps to a JSON-lines scan log that ScanLogReplayer can replay.
+
+    Returns:
+        int: Number of taps written
+    """
+    written = 0
+    with open(path, 'w') as f:
+        for event in events:
+            f.write(json.dumps(event.to_dict(), separators=(',', ':')) + '\n')
+            written += 1
+    return written
@@ -1,7 +1,9 @@
+import time
+_process_start = time.perf_counter()
+
 import sys
 import os
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtGui import QIcon
+import argparse
 
 # Add the base path for PyInstaller
 if getattr(sys, 'frozen', False):
@@ -14,16 +16,64 @@ else:
 # Add base_path to sys.path to help with imports
 sys.path.insert(0, base_path)
 
-# Now import MainWindow
-from ui.main_window import MainWindow
+def parse_args(argv):
+    """Parse CardGuard options, leaving anything else for Qt."""
+    parser = argparse.ArgumentParser(prog='CardGuard', add_help=True)
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve Prometheus metrics on this local port')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                        help='Interface for the metrics endpoint (default: 127.0.0.1)')
+    parser.add_argument('--trace-file', default=None,
+                        help='Write tap-to-decision traces to this rotating JSON-lines file')
+    parser.add_argument('--trace-sample', type=float, default=0.1,
+                        help='Fraction of taps to trace when --trace-file is set (default: 0.1)')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Print import and init timings up to the first paint')
+    return parser.parse_known_args(argv[1:])
 
 def main():
-    app = QApplication(sys.argv)
-    # Set default modern icon
-    app.setWindowIcon(QIcon('icons/default_icon.png'))
+    args, qt_args = parse_args(sys.argv)
+
+    if args.profile_startup:
+        from utils.startup_profiler import StartupProfiler
+        profiler = StartupProfiler(start=_process_start)
+        profiler.mark('main() entered')
+    else:
+        from utils.startup_profiler import NullProfiler
+        profiler = NullProfiler()
+
+    if args.metrics_port is not None:
+        from utils.metrics import start_metrics_server
+        server = start_metrics_server(args.metrics_port, args.metrics_host)
+        print(f"Metrics available at {server.url}")
+    if args.trace_file:
+        from utils.tracing import configure_tracing
+        configure_tracing(args.trace_sample, path=args.trace_file)
+
+    # Heavy imports happen here rather than at module load, so they can be timed
+    with profiler.stage('import PyQt6'):
+        from PyQt6.QtWidgets import QApplication
+        from PyQt6.QtGui import QIcon
+        from PyQt6.QtCore import QTimer
+    with profiler.stage('import ui.main_window'):
+        from ui.main_window import MainWindow
+
+    with profiler.stage('QApplication()'):
+        app = QApplication(sys.argv[:1] + qt_args)
+        # Set default modern icon
+        app.setWindowIcon(QIcon('icons/default_icon.png'))
     # Launch main window
-    window = MainWindow()
-    window.show()
+    with profiler.stage('MainWindow()'):
+        window = MainWindow(profiler=profiler)
+    with profiler.stage('window.show()'):
+        window.show()
+
+    if args.profile_startup:
+        def first_paint():
+            profiler.mark('first paint')
+            profiler.print_report()
+        # Runs once the event loop has processed the initial paint events
+        QTimer.singleShot(0, first_paint)
     sys.exit(app.exec())
 
 if __name__ == '__main__':
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the application packages from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.snapshot import close_snapshot
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """Point the home directory at a temporary one so state lands in tmp_path/.cardguard."""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    yield tmp_path
+    # Flush and drop the snapshot before pytest removes the directory
+    close_snapshot(tmp_path / '.cardguard')
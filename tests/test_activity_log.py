@@ -0,0 +1,60 @@
+import logging
+
+from utils.activity_log import ActivityLog
+
+
+def test_lines_are_buffered_and_drained(tmp_path):
+    log = ActivityLog(capacity=3, data_dir=tmp_path)
+    try:
+        for i in range(5):
+            log.add(f"event {i}")
+        assert [line.split('] ', 1)[1] for line in log.get_lines()] == ['event 2', 'event 3', 'event 4']
+        assert len(log.drain()) == 3
+        assert log.drain() == []
+    finally:
+        log.close()
+
+
+def test_file_mirrors_lines_and_rotates(tmp_path):
+    log = ActivityLog(data_dir=tmp_path, max_bytes=200, backup_count=2)
+    try:
+        for i in range(40):
+            log.add(f"event {i:02d}")
+    finally:
+        log.close()
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert names == ['activity.log', 'activity.log.1', 'activity.log.2']
+    last = (tmp_path / 'activity.log').read_text().splitlines()
+    assert last[-1].endswith(' event 39')
+
+
+def test_instances_do_not_register_loggers(tmp_path):
+    before = set(logging.Logger.manager.loggerDict)
+    for i in range(20):
+        log = ActivityLog(data_dir=tmp_path, log_file=f"activity-{i}.log")
+        log.add('started')
+        log.close()
+    assert set(logging.Logger.manager.loggerDict) == before
+
+
+def test_close_stops_file_writes(tmp_path):
+    first = ActivityLog(data_dir=tmp_path)
+    first.add('first')
+    first.close()
+    first.close()
+    # A new instance (possibly with the same id()) writes only its own lines once
+    second = ActivityLog(data_dir=tmp_path)
+    second.add('second')
+    first.add('after close')
+    second.close()
+    lines = (tmp_path / 'activity.log').read_text().splitlines()
+    assert [line.split(' ', 1)[1] for line in lines] == ['first', 'second']
+    assert first.get_lines()[-1].endswith('after close')
+
+
+def test_disabled_file(tmp_path):
+    log = ActivityLog(log_file=None, data_dir=tmp_path)
+    log.add('memory only')
+    log.close()
+    assert log.log_path is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,66 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+
+import pytest
+
+from utils.app_enforcer import AppEnforcer, is_interpreter, parse_exec
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Linux enforcement')
+
+
+@pytest.fixture
+def child():
+    proc = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    yield proc
+    proc.kill()
+    proc.wait()
+
+
+def make_enforcer():
+    return AppEnforcer(app_locker=None, on_locked_launch=lambda pid, exe, app: None, suspend=True)
+
+
+def test_stop_kills_undecided_launches(child):
+    enforcer = make_enforcer()
+    assert enforcer.suspend_process(child.pid)
+    assert enforcer.is_suspended(child.pid)
+
+    enforcer.stop()
+    assert child.wait(timeout=5) == -signal.SIGKILL
+    assert not enforcer.is_suspended(child.pid)
+
+
+def test_resumed_launch_is_left_alone(child):
+    enforcer = make_enforcer()
+    enforcer.suspend_process(child.pid)
+    assert enforcer.resume_process(child.pid)
+    assert not enforcer.is_suspended(child.pid)
+
+    enforcer.stop()
+    assert child.poll() is None
+
+
+def test_only_suspended_pids_are_signalled(child):
+    enforcer = make_enforcer()
+    assert not enforcer.terminate_process(child.pid)
+    assert not enforcer.resume_process(child.pid)
+    assert child.poll() is None
+
+
+def test_parse_exec():
+    ls = shutil.which('ls')
+    assert parse_exec(f'{ls} %u') == (os.path.realpath(ls), None)
+    assert parse_exec('env FOO=1 python3 /opt/tool/run.py --x') == (None, '/opt/tool/run.py')
+    # Inline code, launchers and relative scripts cannot be matched
+    assert parse_exec('python3 -m tool') == (None, None)
+    assert parse_exec('flatpak run org.example.App') == (None, None)
+    assert parse_exec('python3 run.py') == (None, None)
+
+
+def test_is_interpreter():
+    assert is_interpreter('/usr/bin/python3.11')
+    assert is_interpreter('/bin/sh')
+    assert not is_interpreter('/usr/bin/firefox')
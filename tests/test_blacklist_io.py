@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from utils.blacklist_io import (export_blacklist, import_blacklist, iter_blacklist, iter_records,
+                                detect_format)
+from utils.block_manager import BlockManager, hash_card
+
+HASH_A = hash_card('CARD-A')
+
+
+@pytest.fixture
+def block_manager(home):
+    return BlockManager(velocity=None)
+
+
+def write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def test_detect_format(tmp_path):
+    assert detect_format('feed.CSV') == 'csv'
+    assert detect_format('feed.jsonl') == 'ndjson'
+    assert detect_format('feed.dat', 'NDJSON') == 'ndjson'
+    with pytest.raises(ValueError):
+        detect_format('feed.xml')
+
+
+def test_csv_with_header(tmp_path):
+    feed = write(tmp_path / 'feed.csv',
+                 'card_id,reason\nCARD-A,stolen\n\n  CARD-B  ,\n,\n')
+    assert list(iter_records(feed)) == [('card', 'CARD-A', 'stolen'), ('card', 'CARD-B', None)]
+
+
+def test_csv_without_header(tmp_path):
+    feed = write(tmp_path / 'feed.csv', 'CARD-A,lost\nCARD-B\n')
+    assert list(iter_records(feed)) == [('card', 'CARD-A', 'lost'), ('card', 'CARD-B', None)]
+
+
+def test_ndjson_skips_malformed_lines(tmp_path, capsys):
+    feed = write(tmp_path / 'feed.ndjson', '\n'.join([
+        '"CARD-A"',
+        '{"card_data": "CARD-B", "reason": "fraud"}',
+        '{not json',
+        '42',
+        '{"pattern": "TEST"}',
+        '{"unrelated": 1}',
+    ]))
+    assert list(iter_records(feed)) == [
+        ('card', 'CARD-A', None), ('card', 'CARD-B', 'fraud'), ('pattern', 'TEST', None)]
+    assert 'Skipping invalid blacklist line 3' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_import_dedupes_and_counts_invalid(block_manager, tmp_path, workers):
+    block_manager.add_to_blacklist('CARD-A')
+    feed = write(tmp_path / 'feed.csv', '\n'.join([
+        'card_data,hash,pattern,reason',
+        'CARD-A,,,',                     # already blacklisted
+        'CARD-B,,,feed',
+        'CARD-B,,,again',                # duplicate within the feed
+        f',{hash_card("CARD-C").upper()},,',
+        ',not-a-hash,,',                 # invalid hash
+        ',,SKIMMER,',
+    ]))
+    stats = import_blacklist(block_manager, feed, workers=workers, chunk_size=2)
+
+    assert stats['records'] == 6
+    assert stats['added'] == 2
+    assert stats['duplicates'] == 2
+    assert stats['invalid'] == 1
+    assert stats['patterns_added'] == 1
+    assert block_manager.is_suspicious('CARD-B')
+    assert block_manager.is_hash_blacklisted(hash_card('CARD-C'))
+    assert 'SKIMMER' in block_manager.get_blacklist()['blocked_patterns']
+    reasons = {item['hash']: item['reason'] for item in block_manager.get_blacklist()['blocked_cards']}
+    assert reasons[hash_card('CARD-B')] == 'feed'
+    assert reasons[hash_card('CARD-C')] == 'Bulk import'
+
+
+def test_add_hashes_dedupes(block_manager):
+    assert block_manager.add_hashes_to_blacklist([(HASH_A, 'x'), (HASH_A, 'y')], ['P', 'P']) == (1, 1)
+    assert block_manager.add_hashes_to_blacklist([(HASH_A, 'z')], ['P']) == (0, 0)
+    assert len(block_manager.get_blacklist()['blocked_cards']) == 1
+
+
+@pytest.mark.parametrize('name', ['export.csv', 'export.ndjson'])
+def test_export_import_round_trip(block_manager, tmp_path, name):
+    block_manager.add_hashes_to_blacklist(
+        [(hash_card(f'CARD-{i}'), f'reason {i % 3}') for i in range(50)], ['SKIM', 'TEST'])
+    path = tmp_path / name
+    assert export_blacklist(block_manager, path) == 52
+
+    target = BlockManager(blacklist_file='imported.json', velocity=None)
+    stats = import_blacklist(target, path, workers=1)
+    assert stats['added'] == 50 and stats['patterns_added'] == 2 and stats['invalid'] == 0
+
+    def rows(manager):
+        return sorted((row.get('hash') or '', row.get('pattern') or '', row.get('reason') or '')
+                      for row in iter_blacklist(manager))
+    assert rows(target) == rows(block_manager)
+    # Importing the same export again adds nothing
+    assert import_blacklist(target, path, workers=1)['duplicates'] == 50
+
+
+def test_large_blacklist_uses_compact_writer(block_manager):
+    count = BlockManager.PRETTY_PRINT_LIMIT + 1
+    block_manager.add_hashes_to_blacklist(
+        [(f'{i:064x}', 'bulk') for i in range(count)], ['SKIM'])
+
+    text = block_manager.blacklist_file.read_text()
+    assert '\n' not in text
+    data = json.loads(text)
+    assert len(data['blocked_cards']) == count
+    assert data['blocked_patterns'] == ['SKIM']
+    assert data['blocked_cards'][-1]['hash'] == f'{count - 1:064x}'
@@ -0,0 +1,71 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils.metrics import MetricsRegistry, MetricsServer
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    scans = registry.counter('test_scans_total', 'Scans by result.', ('result',))
+    scans.inc(result='granted')
+    scans.inc(2, result='denied')
+    registry.gauge('test_depth', 'Items waiting.').set_function(lambda: 7)
+    registry.histogram('test_seconds', 'Latency.', buckets=(0.1, 1.0)).observe(0.5)
+    return registry
+
+
+@pytest.fixture
+def server(registry):
+    server = MetricsServer(port=0, registry=registry).start()
+    yield server
+    server.stop()
+
+
+def test_render_prometheus_text(registry):
+    text = registry.render()
+    assert '# TYPE test_scans_total counter' in text
+    assert 'test_scans_total{result="denied"} 2' in text
+    assert 'test_scans_total{result="granted"} 1' in text
+    assert 'test_depth 7' in text
+    assert 'test_seconds_bucket{le="0.1"} 0' in text
+    assert 'test_seconds_bucket{le="1"} 1' in text
+    assert 'test_seconds_bucket{le="+Inf"} 1' in text
+    assert 'test_seconds_count 1' in text
+
+
+def test_registry_rejects_type_conflict(registry):
+    with pytest.raises(ValueError):
+        registry.gauge('test_scans_total', 'Not a gauge.')
+
+
+def test_endpoint_serves_metrics_on_localhost(server):
+    assert server.host == '127.0.0.1'
+    assert server.port
+    with urllib.request.urlopen(server.url, timeout=5) as response:
+        assert response.status == 200
+        assert response.headers['Content-Type'].startswith('text/plain')
+        body = response.read().decode('utf-8')
+    assert 'test_scans_total{result="granted"} 1' in body
+
+
+def test_endpoint_reflects_new_samples(server, registry):
+    registry.get('test_scans_total').inc(result='granted')
+    with urllib.request.urlopen(server.url, timeout=5) as response:
+        body = response.read().decode('utf-8')
+    assert 'test_scans_total{result="granted"} 2' in body
+
+
+def test_endpoint_unknown_path_is_404(server):
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        urllib.request.urlopen(f"http://127.0.0.1:{server.port}/other", timeout=5)
+    assert excinfo.value.code == 404
+
+
+def test_stop_releases_port(registry):
+    server = MetricsServer(port=0, registry=registry).start()
+    server.stop()
+    assert server.port is None
+    server.stop()
@@ -0,0 +1,102 @@
+import pytest
+
+from utils.app_locker import AppLocker
+from utils.path_rules import PathRuleSet
+
+
+def build(*rules, case_insensitive=False):
+    rule_set = PathRuleSet(case_insensitive=case_insensitive)
+    for rule in rules:
+        rule_set.add(rule, rule)
+    return rule_set
+
+
+def test_exact_rule():
+    rules = build('/usr/bin/firefox')
+    assert rules.match('/usr/bin/firefox') == '/usr/bin/firefox'
+    assert rules.match('/usr/bin/firefox-esr') is None
+    assert rules.match('/usr/bin') is None
+
+
+@pytest.mark.parametrize('rule', ['/opt/vendor/', '/opt/vendor/**'])
+def test_directory_rule_covers_descendants_only(rule):
+    rules = build(rule)
+    assert rules.match('/opt/vendor/app') == rule
+    assert rules.match('/opt/vendor/bin/deep/tool') == rule
+    assert rules.match('/opt/vendor') is None
+    assert rules.match('/opt/vendorx/app') is None
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/opt/a/bin/run.sh', True),
+    ('/opt/a/bin/run.py', False),
+    ('/opt/a/b/bin/run.sh', False),   # '*' stays within one component
+    ('/opt/a/bin/sub/run.sh', False),
+])
+def test_single_star_glob(path, expected):
+    rules = build('/opt/*/bin/*.sh')
+    assert (rules.match(path) is not None) == expected
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/games/steam', True),
+    ('/games/x/y/steam', True),
+    ('/games/x/steamy', False),
+])
+def test_double_star_glob_spans_components(path, expected):
+    rules = build('/games/**/steam')
+    assert (rules.match(path) is not None) == expected
+
+
+def test_character_class_glob():
+    rules = build('/bin/tool[0-9]', '/bin/x[!a]')
+    assert rules.match('/bin/tool3') == '/bin/tool[0-9]'
+    assert rules.match('/bin/toolz') is None
+    assert rules.match('/bin/xb') == '/bin/x[!a]'
+    assert rules.match('/bin/xa') is None
+
+
+def test_most_specific_rule_wins():
+    rules = build('/opt/', '/opt/vendor/', '/opt/vendor/*.bin', '/opt/vendor/app.bin')
+    assert rules.match('/opt/other') == '/opt/'
+    assert rules.match('/opt/vendor/x/y') == '/opt/vendor/'
+    # Glob beats prefix at equal depth, exact beats both
+    assert rules.match('/opt/vendor/tool.bin') == '/opt/vendor/*.bin'
+    assert rules.match('/opt/vendor/app.bin') == '/opt/vendor/app.bin'
+
+
+def test_case_insensitive_and_backslashes():
+    rules = build('C:\\Program Files\\Vendor\\', case_insensitive=True)
+    assert rules.match('c:/program files/vendor/App.exe') == 'C:\\Program Files\\Vendor\\'
+    assert build('/Opt/App').match('/opt/app') is None
+
+
+def test_len_counts_rules():
+    assert len(build()) == 0
+    assert len(build('/a', '/b/', '/c/*.sh')) == 3
+
+
+def test_app_locker_matches_rules(home):
+    locker = AppLocker()
+    locker.lock_app('/opt/vendor/', 'Vendor tools')
+    locker.lock_app('/usr/bin/firefox', 'Firefox')
+
+    assert locker.is_app_locked('/opt/vendor/bin/tool')
+    assert locker.match_locked_app('/usr/bin/firefox').name == 'Firefox'
+    assert not locker.is_app_locked('/usr/bin/chromium')
+
+    # Cached rules are rebuilt after the locked list changes
+    locker.unlock_app('/opt/vendor/')
+    assert not locker.is_app_locked('/opt/vendor/bin/tool')
+
+
+@pytest.mark.parametrize('order', [
+    ['/opt/*', '/opt/*.bin', '/opt/app-?.bin'],
+    ['/opt/app-?.bin', '/opt/*.bin', '/opt/*'],
+    ['/opt/*.bin', '/opt/app-?.bin', '/opt/*'],
+])
+def test_most_specific_glob_wins_regardless_of_order(order):
+    rules = build(*order)
+    assert rules.match('/opt/x.bin') == '/opt/*.bin'
+    assert rules.match('/opt/app-1.bin') == '/opt/app-?.bin'
+    assert rules.match('/opt/readme') == '/opt/*'
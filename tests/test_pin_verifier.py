@@ -0,0 +1,111 @@
+import hashlib
+
+import pytest
+
+from utils.app_locker import AppLocker
+from utils.pin_verifier import ALGORITHM, PinVerifier
+
+
+@pytest.fixture
+def verifier():
+    # A low fixed iteration count keeps the KDF fast; calibration is tested separately
+    verifier = PinVerifier(iterations=1000, min_iterations=1000)
+    yield verifier
+    verifier.shutdown()
+
+
+@pytest.fixture
+def locker(home, verifier):
+    return AppLocker(pin_verifier=verifier)
+
+
+def legacy_hash(pin):
+    return hashlib.sha256(pin.encode()).hexdigest()
+
+
+def test_hash_format_and_salt(verifier):
+    first, second = verifier.hash_pin('1234'), verifier.hash_pin('1234')
+    algorithm, iterations, salt, digest = first.split('$')
+    assert (algorithm, iterations) == (ALGORITHM, '1000')
+    assert len(bytes.fromhex(salt)) == 16 and len(bytes.fromhex(digest)) == 32
+    assert first != second
+
+
+def test_verify(verifier):
+    encoded = verifier.hash_pin('1234')
+    assert verifier.verify('1234', encoded) == (True, None)
+    assert verifier.verify('4321', encoded) == (False, None)
+    assert verifier.verify('1234', None) == (False, None)
+    assert verifier.verify('1234', 'pbkdf2_sha256$x$y') == (False, None)
+    assert verifier.verify_async('1234', encoded).result(timeout=5) == (True, None)
+
+
+def test_weak_hash_is_reported_for_upgrade(verifier):
+    weak = PinVerifier(iterations=100).hash_pin('1234')
+    ok, replacement = verifier.verify('1234', weak)
+    assert ok and replacement.split('$')[1] == '1000'
+
+
+@pytest.mark.parametrize('budget_ms, expected', [(0.001, 1000), (10_000, 50_000)])
+def test_calibration_stays_within_bounds(budget_ms, expected):
+    verifier = PinVerifier(budget_ms=budget_ms, min_iterations=1000, max_iterations=50_000)
+    try:
+        assert verifier.iterations == expected
+    finally:
+        verifier.shutdown()
+
+
+def test_calibration_rounds_to_thousands():
+    verifier = PinVerifier(budget_ms=5, min_iterations=1000, max_iterations=10_000_000)
+    try:
+        iterations = verifier.calibrate(sample_iterations=2000)
+        assert 1000 <= iterations <= 10_000_000
+        assert iterations % 1000 == 0
+    finally:
+        verifier.shutdown()
+
+
+def test_set_and_verify_pin(locker):
+    assert not locker.has_pin()
+    assert locker.verify_pin_async('anything').result(timeout=5)
+
+    assert locker.set_pin('1234')
+    assert locker.has_pin()
+    assert locker.config['pin_hash'].startswith(ALGORITHM + '$')
+    assert locker.verify_pin('1234')
+    assert not locker.verify_pin('0000')
+    assert locker.verify_pin_async('1234').result(timeout=5)
+
+    # Persisted for the next start
+    assert AppLocker(pin_verifier=locker.pin_verifier).verify_pin('1234')
+
+
+def test_legacy_hash_upgrades_on_successful_verify_only(locker):
+    locker._save_pin_hash(legacy_hash('1234'))
+
+    assert not locker.verify_pin('0000')
+    assert locker.config['pin_hash'] == legacy_hash('1234')
+
+    assert locker.verify_pin('1234')
+    upgraded = locker.config['pin_hash']
+    assert upgraded.startswith(ALGORITHM + '$')
+    assert locker.verify_pin('1234')
+    assert AppLocker(pin_verifier=locker.pin_verifier).config['pin_hash'] == upgraded
+
+
+def test_upgrade_does_not_overwrite_a_concurrent_set_pin(locker, verifier):
+    locker._save_pin_hash(legacy_hash('1234'))
+    verify = verifier.verify
+
+    def verify_then_change_pin(pin, encoded):
+        result = verify(pin, encoded)
+        # The PIN is changed (e.g. by another window) before the upgrade is saved
+        locker.set_pin('5678')
+        return result
+
+    verifier.verify = verify_then_change_pin
+    assert locker.verify_pin('1234')
+    verifier.verify = verify
+
+    assert locker.verify_pin('5678')
+    assert not locker.verify_pin('1234')
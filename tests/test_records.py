@@ -0,0 +1,105 @@
+import json
+import sys
+
+import pytest
+
+from utils.app_locker import AppLocker
+from utils.records import LockedApp, RegisteredCard
+from utils.snapshot import close_snapshot
+
+
+def built(*parts):
+    """A string equal to ''.join(parts) but not the same object as its literal."""
+    return ''.join(parts)
+
+
+def test_records_use_slots():
+    card = RegisteredCard('CARD1', 'Mine')
+    app = LockedApp('/usr/bin/x', 'X')
+    for record in (card, app):
+        assert not hasattr(record, '__dict__')
+        with pytest.raises(AttributeError):
+            record.extra = 1
+
+
+def test_card_ids_are_interned():
+    assert RegisteredCard(built('CA', 'RD9'), 'x').card_id is sys.intern('CARD9')
+    loaded = RegisteredCard.load_all({built('CA', 'RD8'): {'name': 'x'}})
+    assert next(iter(loaded)) is sys.intern('CARD8')
+    rebuilt = RegisteredCard.from_columns(([built('CA', 'RD7')], ['x'], [None]))
+    assert rebuilt[sys.intern('CARD7')].card_id is sys.intern('CARD7')
+
+
+def test_card_json_and_columns_round_trip():
+    cards = RegisteredCard.load_all({
+        'A': {'name': 'Work', 'registered_at': '2024-01-02T03:04:05'},
+        'B': {'name': '', 'registered_at': None},
+    })
+    assert cards['B'].name == 'B'
+    assert cards['A'].to_json() == {'name': 'Work', 'registered_at': '2024-01-02T03:04:05'}
+    again = RegisteredCard.from_columns(RegisteredCard.to_columns(cards))
+    assert {k: v.to_json() for k, v in again.items()} == {k: v.to_json() for k, v in cards.items()}
+
+
+@pytest.mark.parametrize('stored', ['/home/olduser', 'garbage', True, [1]])
+def test_unusable_registered_at_is_dropped(stored):
+    assert RegisteredCard.from_json('A', {'registered_at': stored}).registered_at is None
+
+
+def test_locked_app_round_trip():
+    apps = LockedApp.load_all([{'path': '/a', 'name': 'A'}, {'path': '/b'}])
+    assert apps['/b'].name == '/b'
+    assert [app.to_json() for app in apps.values()] == [
+        {'path': '/a', 'name': 'A'}, {'path': '/b', 'name': '/b'}]
+    assert LockedApp.from_pairs(LockedApp.to_pairs(apps)).keys() == apps.keys()
+
+
+def test_app_locker_save_and_load(home):
+    locker = AppLocker()
+    locker.register_card('CARD1', 'Mine')
+    locker.lock_app('/usr/bin/x', 'X')
+    close_snapshot(home / '.cardguard')
+
+    # Both from the snapshot and from JSON alone
+    for remove_snapshot in (False, True):
+        if remove_snapshot:
+            (home / '.cardguard' / 'state.snapshot').unlink()
+        reloaded = AppLocker()
+        assert reloaded.is_card_registered('CARD1')
+        assert reloaded.get_registered_cards()['CARD1'].name == 'Mine'
+        assert reloaded.get_locked_apps()['/usr/bin/x'].name == 'X'
+        close_snapshot(home / '.cardguard')
+
+
+def test_views_are_read_only(home):
+    locker = AppLocker()
+    locker.register_card('CARD1')
+    locker.lock_app('/usr/bin/x', 'X')
+    with pytest.raises(TypeError):
+        locker.get_locked_apps()['/usr/bin/y'] = LockedApp('/usr/bin/y', 'Y')
+    with pytest.raises(TypeError):
+        del locker.get_registered_cards()['CARD1']
+    assert locker.is_card_registered('CARD1')
+
+
+def test_legacy_files_still_load(home):
+    state_dir = home / '.cardguard'
+    state_dir.mkdir()
+    # Shapes written by older versions: locked apps as a plain list of dicts
+    # (with extra keys), registered_at holding the home directory
+    (state_dir / 'locked_apps.json').write_text(json.dumps([
+        {'path': '/usr/bin/x', 'name': 'X', 'locked_at': 'yesterday'},
+        {'path': '/opt/y'},
+    ]))
+    (state_dir / 'cards.json').write_text(json.dumps({
+        'CARD1': {'name': 'Mine', 'registered_at': str(home)}}))
+
+    locker = AppLocker()
+    assert locker.is_app_locked('/usr/bin/x')
+    assert locker.get_locked_apps()['/opt/y'].name == '/opt/y'
+    assert locker.get_registered_cards()['CARD1'].registered_at is None
+
+    locker.lock_app('/usr/bin/z', 'Z')
+    saved = json.loads((state_dir / 'locked_apps.json').read_text())
+    assert isinstance(saved, list)
+    assert [app['path'] for app in saved] == ['/usr/bin/x', '/opt/y', '/usr/bin/z']
@@ -0,0 +1,203 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from utils.scan_pipeline import (BLOCKED, DENIED, ERROR, GRANTED, NO_CARD, ScanPipeline)
+
+
+class Locker:
+    def __init__(self, registered=()):
+        self.registered = set(registered)
+
+    def verify_card(self, card_id):
+        return card_id in self.registered
+
+
+class Blocker:
+    def __init__(self, blocked=()):
+        self.blocked = set(blocked)
+
+    def is_suspicious(self, card_id, reader_id=None):
+        if card_id == 'BROKEN':
+            raise ValueError('bad card')
+        return card_id in self.blocked
+
+
+class Notifier:
+    def __init__(self):
+        self.sent = []
+
+    def send_notification(self, title, message, urgency='normal'):
+        self.sent.append((title, urgency))
+
+
+@pytest.fixture
+def make_pipeline():
+    pipelines = []
+
+    def make(**kwargs):
+        kwargs.setdefault('block_manager', Blocker({'BAD'}))
+        pipeline = ScanPipeline(Locker({'OK'}), **kwargs)
+        pipelines.append(pipeline)
+        return pipeline
+
+    yield make
+    for pipeline in pipelines:
+        pipeline.close()
+
+
+@pytest.mark.parametrize('card_id, decision', [
+    ('OK', GRANTED),
+    (' OK\n', GRANTED),
+    ('OTHER', DENIED),
+    ('BAD', BLOCKED),
+    ('', NO_CARD),
+    (None, NO_CARD),
+])
+def test_decisions(make_pipeline, card_id, decision):
+    ctx = make_pipeline().submit('r1', card_id).result(timeout=5)
+    assert ctx.decision == decision
+    assert ctx.error is None
+
+
+def test_stage_error_is_recorded(make_pipeline):
+    lines = []
+    ctx = make_pipeline(log=lines.append).submit('r1', 'BROKEN').result(timeout=5)
+    assert ctx.decision == ERROR
+    assert isinstance(ctx.error, ValueError)
+    assert lines == ['Scan failed: bad card']
+
+
+def test_card_is_read_when_not_given(make_pipeline):
+    class Reader:
+        def read_card(self):
+            return 'OK'
+
+    assert make_pipeline(card_reader=Reader()).submit('r1').result(timeout=5).decision == GRANTED
+
+
+def test_action_log_and_notification(make_pipeline):
+    actions, lines, notifier = [], [], Notifier()
+    pipeline = make_pipeline(action=lambda ctx: actions.append(ctx.decision),
+                             log=lines.append, notifier=notifier)
+    pipeline.submit('door', 'BAD').result(timeout=5)
+    pipeline.submit('door', 'OK').result(timeout=5)
+    assert actions == [BLOCKED, GRANTED]
+    assert lines == ['Blocked suspicious card on reader door']
+    assert notifier.sent == [('Card Blocked', 'critical')]
+
+
+def test_unknown_stage_rejected():
+    with pytest.raises(ValueError):
+        ScanPipeline(Locker(), workers={'bogus': 2})
+
+
+def test_per_reader_order_with_several_workers(make_pipeline):
+    results = []
+    lock = threading.Lock()
+
+    def on_result(ctx):
+        with lock:
+            results.append(ctx)
+
+    pipeline = make_pipeline(on_result=on_result,
+                             workers={'check': 4, 'verify': 4, 'notify': 4})
+    taps = [(f"reader-{i % 7}", 'OK' if i % 3 else 'OTHER', i) for i in range(3000)]
+    for start in range(0, len(taps), 100):
+        assert pipeline.submit_many(taps[start:start + 100]) == 100
+    assert pipeline.wait_idle(timeout=10)
+
+    assert len(results) == len(taps)
+    last = {}
+    for ctx in results:
+        assert ctx.event > last.get(ctx.reader_id, -1)
+        last[ctx.reader_id] = ctx.event
+    assert sum(ctx.decision == GRANTED for ctx in results) == 2000
+
+
+def gated_pipeline(make_pipeline):
+    """A pipeline whose action stage waits on the returned event."""
+    gate = threading.Event()
+    pipeline = make_pipeline(action=lambda ctx: gate.wait(10), capacity=1)
+    return pipeline, gate
+
+
+def fill(pipeline):
+    """Submit until backpressure rejects a tap; returns the accepted futures."""
+    futures = []
+    for _ in range(100):
+        try:
+            futures.append(pipeline.submit('r1', 'OK', timeout=0.05))
+        except queue.Full:
+            return futures
+    pytest.fail('pipeline never pushed back')
+
+
+def test_backpressure_then_drain(make_pipeline):
+    pipeline, gate = gated_pipeline(make_pipeline)
+    futures = fill(pipeline)
+    assert 0 < len(futures) < 20
+    assert not pipeline.wait_idle(timeout=0.05)
+    with pytest.raises(queue.Full):
+        pipeline.submit_many([('r1', 'OK', None)] * 10, timeout=0.05)
+
+    gate.set()
+    assert pipeline.wait_idle(timeout=5)
+    assert all(f.result(timeout=5).decision == GRANTED for f in futures)
+    assert sum(pipeline.queue_depths().values()) == 0
+
+
+def test_close_finishes_blocked_submit(make_pipeline):
+    pipeline, gate = gated_pipeline(make_pipeline)
+    futures = fill(pipeline)
+
+    # One producer blocks on the full pipeline while another thread closes it
+    submitted = []
+    producer = threading.Thread(target=lambda: submitted.append(pipeline.submit('r1', 'OK')))
+    producer.start()
+    time.sleep(0.1)
+    closer = threading.Thread(target=pipeline.close)
+    closer.start()
+    time.sleep(0.1)
+    assert closer.is_alive()
+
+    gate.set()
+    producer.join(timeout=5)
+    closer.join(timeout=5)
+    assert not closer.is_alive()
+    for future in futures + submitted:
+        assert future.result(timeout=5).decision == GRANTED
+    assert len(submitted) == 1
+
+    with pytest.raises(RuntimeError):
+        pipeline.submit('r1', 'OK')
+
+
+def test_close_waits_for_submit_in_progress(make_pipeline):
+    pipeline = make_pipeline()
+    entered, release = threading.Event(), threading.Event()
+    first_stage = pipeline._stages[0]
+    put = first_stage.put
+
+    def slow_put(taps, timeout=None):
+        # Hold the submit between its closed check and queueing its taps
+        entered.set()
+        release.wait(5)
+        return put(taps, timeout)
+
+    first_stage.put = slow_put
+    submitted = []
+    producer = threading.Thread(target=lambda: submitted.append(pipeline.submit('r1', 'OK')))
+    producer.start()
+    assert entered.wait(5)
+
+    closer = threading.Thread(target=pipeline.close)
+    closer.start()
+    time.sleep(0.1)
+    release.set()
+    producer.join(timeout=5)
+    closer.join(timeout=5)
+
+    assert submitted[0].result(timeout=5).decision == GRANTED
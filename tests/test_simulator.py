@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from hardware.card_reader import CardReader
+from hardware.device_handler import DeviceHandler
+from hardware.simulator import (BLACKLISTED, DEFAULT_MIX, REGISTERED, CardStreamGenerator,
+                                ScanLogReplayer, record_scan_log)
+from utils.metrics import CARD_SCANS
+
+
+def taps(events):
+    return [(e.seq, e.offset, e.reader_id, e.card_id, e.kind) for e in events]
+
+
+def generator(seed=42, **kwargs):
+    kwargs.setdefault('rate', 1000)
+    kwargs.setdefault('readers', 3)
+    return CardStreamGenerator(seed=seed, **kwargs)
+
+
+def test_same_seed_gives_same_stream():
+    first = taps(generator().events(count=500, paced=False))
+    second = taps(generator().events(count=500, paced=False))
+    assert first == second
+    assert {kind for *_, kind in first} == set(DEFAULT_MIX)
+    assert {reader for _, _, reader, _, _ in first} == {'reader-0', 'reader-1', 'reader-2'}
+
+
+def test_different_seed_gives_different_stream():
+    assert (taps(generator(1).events(count=100, paced=False)) !=
+            taps(generator(2).events(count=100, paced=False)))
+
+
+def test_stream_is_independent_of_global_random():
+    random.seed(0)
+    first = [generator().next_card() for _ in range(50)]
+    random.seed(1)
+    second = [generator().next_card() for _ in range(50)]
+    assert first == second
+
+
+def test_offsets_follow_rate_and_duration():
+    events = list(generator(rate=100).events(duration=0.5, paced=False))
+    assert len(events) == 50
+    assert [e.offset for e in events] == pytest.approx([i / 100 for i in range(50)])
+
+
+def test_mix_restricts_kinds():
+    stream = CardStreamGenerator(seed=3, mix={REGISTERED: 1, BLACKLISTED: 0},
+                                 registered_cards=['CARD-A', 'CARD-B'])
+    assert {stream.next_card() for _ in range(100)} == {'CARD-A', 'CARD-B'}
+    with pytest.raises(ValueError):
+        CardStreamGenerator(mix={'stolen': 1})
+    with pytest.raises(ValueError):
+        CardStreamGenerator(mix={REGISTERED: 0})
+
+
+@pytest.mark.parametrize('name', ['scans.jsonl', 'scans.csv'])
+def test_replay_reproduces_recorded_stream(tmp_path, name):
+    recorded = list(generator().events(count=200, paced=False))
+    path = tmp_path / name
+    if path.suffix == '.csv':
+        with open(path, 'w') as f:
+            f.write('seq,offset,reader_id,card_id,kind\n')
+            for e in recorded:
+                f.write(f"{e.seq},{e.offset},{e.reader_id},{e.card_id},{e.kind}\n")
+    else:
+        assert record_scan_log(recorded, path) == 200
+
+    replayed = taps(ScanLogReplayer(path, speed=None))
+    assert [t[:1] + t[2:] for t in replayed] == [t[:1] + t[2:] for t in taps(recorded)]
+    assert [t[1] for t in replayed] == pytest.approx([t[1] for t in taps(recorded)])
+
+
+def test_card_reader_uses_enabled_simulator():
+    reference = generator(7)
+    expected = [reference.next_card() for _ in range(20)]
+    reader = CardReader(simulator=generator(7))
+    before = CARD_SCANS.get(source='simulator', result='card')
+    read = []
+    for _ in range(20):
+        read.append(reader.read_card())
+        assert reader.is_card_present()
+        assert reader.get_card_info()['card_id'] == read[-1]
+    assert read == expected
+    assert CARD_SCANS.get(source='simulator', result='card') == before + 20
+
+
+def test_card_reader_without_simulator_uses_demo_reads(monkeypatch):
+    monkeypatch.setattr('hardware.card_reader.random.random', lambda: 0.99)
+    reader = CardReader()
+    assert reader.simulator is None
+    assert reader.read_card() is None
+
+
+def test_device_handler_scans_from_simulator():
+    reference = generator(9)
+    expected = [reference.next_card() for _ in range(5)]
+    handler = DeviceHandler(simulator=generator(9))
+    assert handler.connect()
+    assert [handler.scan_card() for _ in range(5)] == expected
@@ -0,0 +1,125 @@
+import json
+import marshal
+import struct
+
+import pytest
+
+from utils import snapshot as snapshot_module
+from utils.snapshot import FORMAT_VERSION, MAGIC, SNAPSHOT_FILE, StateSnapshot, close_snapshot
+from utils.usage_counter import UsageCounter
+
+VALUE = {'cards': ['A1', 'B2'], 'count': 3}
+
+
+def write_json(path, value):
+    path.write_text(json.dumps(value))
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'cards.json'
+    write_json(path, VALUE)
+    StateSnapshot(tmp_path, write_delay=None).update(path, VALUE)
+    return path
+
+
+def fresh(directory):
+    """A new reader, so nothing is served from the writer's memory."""
+    return StateSnapshot(directory, write_delay=None)
+
+
+def patch_bytes(path, offset, data):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def test_round_trip(source):
+    assert (source.parent / SNAPSHOT_FILE).exists()
+    assert fresh(source.parent).load(source) == VALUE
+
+
+def test_pending_update_is_served_before_flush(tmp_path):
+    path = tmp_path / 'cards.json'
+    write_json(path, VALUE)
+    snapshot = StateSnapshot(tmp_path, write_delay=60)
+    snapshot.update(path, VALUE)
+    assert not (tmp_path / SNAPSHOT_FILE).exists()
+    assert snapshot.load(path) == VALUE
+    snapshot.close()
+    assert fresh(tmp_path).load(path) == VALUE
+
+
+def test_flush_keeps_other_current_sections(source):
+    other = source.parent / 'config.json'
+    write_json(other, {'pin_enabled': False})
+    fresh(source.parent).update(other, {'pin_enabled': False})
+
+    reader = fresh(source.parent)
+    assert reader.load(source) == VALUE
+    assert reader.load(other) == {'pin_enabled': False}
+
+
+def test_stale_section_falls_back(source):
+    write_json(source, {'cards': [], 'count': 0, 'changed': True})
+    assert fresh(source.parent).load(source) is None
+
+
+def test_missing_source_or_section(source, tmp_path):
+    assert fresh(tmp_path).load(tmp_path / 'missing.json') is None
+    other = tmp_path / 'other.json'
+    write_json(other, {})
+    assert fresh(tmp_path).load(other) is None
+
+
+def test_corrupt_section_falls_back(source, capsys):
+    snapshot_path = source.parent / SNAPSHOT_FILE
+    size = snapshot_path.stat().st_size
+    last = snapshot_path.read_bytes()[-1]
+    patch_bytes(snapshot_path, size - 1, bytes([last ^ 0xFF]))
+
+    assert fresh(source.parent).load(source) is None
+    assert 'corrupt' in capsys.readouterr().out
+
+
+def test_corrupt_index_falls_back(source, capsys):
+    snapshot_path = source.parent / SNAPSHOT_FILE
+    offset = snapshot_module._HEADER.size
+    byte = snapshot_path.read_bytes()[offset]
+    patch_bytes(snapshot_path, offset, bytes([byte ^ 0xFF]))
+
+    assert fresh(source.parent).load(source) is None
+    assert 'index is corrupt' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('header', [
+    (b'NOTSNAP\n', FORMAT_VERSION, marshal.version),
+    (MAGIC, FORMAT_VERSION + 1, marshal.version),
+    (MAGIC, FORMAT_VERSION, marshal.version + 1),
+])
+def test_foreign_header_falls_back(source, header):
+    patch_bytes(source.parent / SNAPSHOT_FILE, 0, struct.pack('<8sHH', *header))
+    assert fresh(source.parent).load(source) is None
+
+
+@pytest.mark.parametrize('keep', [0, 4, snapshot_module._HEADER.size + 2])
+def test_truncated_snapshot_falls_back(source, keep):
+    snapshot_path = source.parent / SNAPSHOT_FILE
+    snapshot_path.write_bytes(snapshot_path.read_bytes()[:keep])
+    assert fresh(source.parent).load(source) is None
+
+
+def test_component_reads_json_when_snapshot_is_corrupt(home):
+    counter = UsageCounter()
+    counter.increment()
+    counter.increment()
+    state_dir = home / '.cardguard'
+    close_snapshot(state_dir)
+
+    snapshot_path = state_dir / SNAPSHOT_FILE
+    snapshot_path.write_bytes(b'\0' * snapshot_path.stat().st_size)
+
+    assert UsageCounter().data['total_launches'] == 2
+    # The first load from JSON re-seeds a good snapshot
+    close_snapshot(state_dir)
+    assert fresh(state_dir).load(state_dir / 'usage_data.json')['total_launches'] == 2
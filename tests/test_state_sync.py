@@ -0,0 +1,182 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from utils.state_sync import StateDirectory, atomic_write_json, get_state_directory
+from utils.usage_counter import UsageCounter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason='uses POSIX file locks from child processes')
+
+
+def spawn(code, home):
+    """Run code in a separate Python process with HOME pointing at home."""
+    env = dict(os.environ, HOME=str(home), PYTHONPATH=REPO_ROOT)
+    return subprocess.Popen([sys.executable, '-c', textwrap.dedent(code)],
+                            env=env, cwd=REPO_ROOT)
+
+
+def wait_for(path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline, f"timed out waiting for {path}"
+        time.sleep(0.01)
+
+
+def test_get_state_directory_is_shared(tmp_path):
+    assert get_state_directory(tmp_path) is get_state_directory(str(tmp_path) + '/.')
+
+
+def test_bump_is_seen_as_changed(tmp_path):
+    state = StateDirectory(tmp_path)
+    seen = {'cards.json': state.generations().get('cards.json', 0)}
+    assert state.changed(seen) == {}
+    generation = state.bump('cards.json')
+    assert state.changed(seen) == {'cards.json': generation}
+
+
+def test_write_lock_is_reentrant(tmp_path):
+    state = StateDirectory(tmp_path)
+    with state.write_lock():
+        with state.write_lock():
+            state.bump('a.json')
+    assert state.generations()['a.json'] == 1
+
+
+def test_writers_in_other_processes_lose_no_updates(home):
+    workers, per_worker = 4, 25
+    code = f"""
+        from utils.usage_counter import UsageCounter
+        counter = UsageCounter()
+        for _ in range({per_worker}):
+            counter.increment()
+    """
+    procs = [spawn(code, home) for _ in range(workers)]
+    for proc in procs:
+        assert proc.wait(timeout=60) == 0
+
+    counter = UsageCounter()
+    assert counter.data['total_launches'] == workers * per_worker
+
+
+def test_reader_sees_other_process_write(home):
+    counter = UsageCounter()
+    assert counter.refresh() is False
+
+    proc = spawn("""
+        from utils.usage_counter import UsageCounter
+        UsageCounter().increment()
+    """, home)
+    assert proc.wait(timeout=30) == 0
+
+    assert counter.refresh() is True
+    assert counter.data['total_launches'] == 1
+
+
+def test_readers_do_not_wait_for_blocked_writer(tmp_path):
+    state_dir = tmp_path / 'state'
+    state = get_state_directory(state_dir)
+    state.bump('cards.json')
+    held = tmp_path / 'held'
+
+    # Another process holds the directory lock for a while
+    proc = spawn(f"""
+        import time
+        from utils.state_sync import get_state_directory
+        state = get_state_directory({str(state_dir)!r})
+        with state.write_lock():
+            open({str(held)!r}, 'w').close()
+            time.sleep(1.5)
+            state.bump('cards.json')
+    """, tmp_path)
+    try:
+        wait_for(held)
+
+        # A writer thread in this process now blocks on the file lock
+        writer_done = threading.Event()
+
+        def write():
+            with state.write_lock():
+                atomic_write_json(state_dir / 'cards.json', {})
+            writer_done.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        time.sleep(0.1)
+        assert not writer_done.is_set()
+
+        start = time.monotonic()
+        state.generations()
+        state.changed({'cards.json': 1})
+        assert time.monotonic() - start < 0.5
+
+        writer.join(timeout=30)
+        assert writer_done.is_set()
+        assert state.changed({'cards.json': 1}) == {'cards.json': 2}
+    finally:
+        assert proc.wait(timeout=30) == 0
+
+
+def test_refresh_waits_for_update_in_progress(home):
+    counter = UsageCounter()
+    proc = spawn("""
+        from utils.usage_counter import UsageCounter
+        UsageCounter().increment()
+    """, home)
+    assert proc.wait(timeout=30) == 0
+
+    # An update on another thread is halfway through its read-modify-write
+    in_update, release = threading.Event(), threading.Event()
+
+    def update():
+        with counter._update_lock:
+            in_update.set()
+            release.wait(5)
+
+    updater = threading.Thread(target=update)
+    updater.start()
+    assert in_update.wait(5)
+    refresher = threading.Thread(target=counter.refresh)
+    refresher.start()
+    refresher.join(timeout=0.2)
+    assert refresher.is_alive()
+
+    release.set()
+    refresher.join(timeout=5)
+    updater.join(timeout=5)
+    assert counter.data['total_launches'] == 1
+
+
+def test_updates_survive_concurrent_refreshes(home):
+    counter = UsageCounter()
+    writer = spawn("""
+        from utils.usage_counter import UsageCounter
+        counter = UsageCounter()
+        for _ in range(20):
+            counter.increment()
+    """, home)
+    stop = threading.Event()
+
+    def refresh_loop():
+        while not stop.is_set():
+            counter.refresh()
+
+    refresher = threading.Thread(target=refresh_loop)
+    refresher.start()
+    workers = [threading.Thread(target=lambda: [counter.increment() for _ in range(20)])
+               for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+    assert writer.wait(timeout=60) == 0
+    stop.set()
+    refresher.join(timeout=5)
+
+    assert UsageCounter().data['total_launches'] == 80
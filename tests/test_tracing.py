@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from utils.tracing import NULL_TRACE, JsonLinesSink, MemorySink, Tracer
+
+
+@pytest.fixture
+def sink():
+    return MemorySink()
+
+
+def tap(tracer):
+    with tracer.start_trace('tap', reader='test') as trace:
+        with trace.span('read'):
+            pass
+    return trace
+
+
+def test_rate_zero_records_nothing(sink):
+    tracer = Tracer(sample_rate=0.0, sink=sink)
+    traces = [tap(tracer) for _ in range(200)]
+    assert all(trace is NULL_TRACE for trace in traces)
+    assert sink.get_records() == []
+
+
+def test_rate_one_records_every_tap(sink):
+    tracer = Tracer(sample_rate=1.0, sink=sink)
+    for _ in range(200):
+        tap(tracer)
+    records = sink.get_records()
+    assert len(records) == 200
+    assert len({record['trace_id'] for record in records}) == 200
+    assert all(record['attributes'] == {'reader': 'test'} for record in records)
+
+
+def test_nested_spans_record_parent_and_duration(sink):
+    tracer = Tracer(sample_rate=1.0, sink=sink)
+    with tracer.start_trace('tap') as trace:
+        with trace.span('pipeline'):
+            with trace.span('blacklist'):
+                pass
+            with trace.span('verify'):
+                pass
+        pending = trace.start_span('notify')
+        pending.end()
+    record, = sink.get_records()
+    spans = record['spans']
+    assert [s['name'] for s in spans] == ['pipeline', 'blacklist', 'verify', 'notify']
+    assert [s['parent'] for s in spans] == [None, 0, 0, None]
+
+    outer, first, second, notify = spans
+    for span in spans:
+        assert span['duration_ns'] >= 0
+        assert span['offset_ns'] >= 0
+        assert span['offset_ns'] + span['duration_ns'] <= record['duration_ns']
+    # Children run inside the parent and one after another
+    assert first['offset_ns'] >= outer['offset_ns']
+    assert second['offset_ns'] >= first['offset_ns'] + first['duration_ns']
+    assert second['offset_ns'] + second['duration_ns'] <= outer['offset_ns'] + outer['duration_ns']
+    assert notify['offset_ns'] >= outer['offset_ns'] + outer['duration_ns']
+
+
+def test_failed_span_is_closed_and_marked(sink):
+    tracer = Tracer(sample_rate=1.0, sink=sink)
+    with pytest.raises(ValueError):
+        with tracer.start_trace('tap') as trace:
+            with trace.span('verify'):
+                raise ValueError('bad card')
+    record, = sink.get_records()
+    assert record['attributes']['error'] == 'ValueError'
+    assert record['spans'][0]['attributes'] == {'error': 'ValueError'}
+    assert record['spans'][0]['duration_ns'] is not None
+
+
+def test_jsonl_sink_rotates_at_size_limit(tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    record = {'trace_id': 'x', 'pad': 'a' * 80}
+    line_size = len(json.dumps(record, separators=(',', ':'))) + 1
+    sink = JsonLinesSink(path, max_bytes=line_size * 3, backup_count=2)
+
+    for _ in range(3):
+        sink.emit(record)
+    assert path.stat().st_size == line_size * 3
+    assert not (tmp_path / 'traces.jsonl.1').exists()
+
+    # The fourth line would push the file past max_bytes, so it starts a new file
+    sink.emit(record)
+    assert path.stat().st_size == line_size
+    assert (tmp_path / 'traces.jsonl.1').stat().st_size == line_size * 3
+
+    for _ in range(6):
+        sink.emit(record)
+    # Only backup_count rotated files are kept
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'traces.jsonl', 'traces.jsonl.1', 'traces.jsonl.2']
+    for p in tmp_path.iterdir():
+        lines = p.read_text().splitlines()
+        assert all(json.loads(line) == record for line in lines)
+        assert p.stat().st_size <= line_size * 3
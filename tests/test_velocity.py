@@ -0,0 +1,122 @@
+import pytest
+
+from utils.block_manager import BlockManager, hash_card
+from utils.velocity import (CARD_VELOCITY, GLOBAL_VELOCITY, NEW_CARD_BURST, READER_SPREAD,
+                            SlidingWindowCounter, VelocityTracker)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def tracker(clock, **limits):
+    limits.setdefault('max_new_cards', 0)
+    return VelocityTracker(window=60.0, clock=clock, **limits)
+
+
+def test_card_over_tap_limit_until_window_slides(clock):
+    velocity = tracker(clock, max_card_taps=3)
+    assert [velocity.check('card') for _ in range(3)] == [None, None, None]
+    assert velocity.check('card') == CARD_VELOCITY
+    assert velocity.check('other') is None
+
+    # Tokens refill at max_card_taps per window
+    clock.now += 20
+    assert velocity.check('card') is None
+    assert velocity.check('card') == CARD_VELOCITY
+    clock.now += 60
+    assert [velocity.check('card') for _ in range(3)] == [None, None, None]
+
+
+def test_card_over_reader_limit_until_window_slides(clock):
+    velocity = tracker(clock, max_card_taps=0, max_card_readers=2)
+    assert velocity.check('card', 'r1') is None
+    assert velocity.check('card', 'r2') is None
+    assert velocity.check('card', 'r2') is None
+    assert velocity.check('card', 'r3') == READER_SPREAD
+
+    clock.now += 61
+    assert velocity.check('card', 'r4') is None
+
+
+def test_new_card_burst_and_global_limit(clock):
+    velocity = tracker(clock, max_card_taps=0, max_new_cards=2, max_global_taps=3)
+    assert velocity.check('a') is None
+    assert velocity.check('b') is None
+    assert velocity.check('c') == NEW_CARD_BURST
+    assert velocity.check('a') == GLOBAL_VELOCITY
+    clock.now += 61
+    assert velocity.check('d') is None
+
+
+def test_lru_bound_evicts_least_recently_seen(clock):
+    velocity = tracker(clock, max_card_taps=1, max_tracked=2)
+    velocity.check('a')
+    velocity.check('b')
+    assert velocity.check('a') == CARD_VELOCITY   # refreshes 'a'
+    velocity.check('c')                            # evicts 'b'
+    assert len(velocity) == 2
+    assert velocity.check('b') is None             # forgotten, so a fresh bucket
+    assert velocity.check('c') == CARD_VELOCITY
+
+
+def test_forget_and_clear(clock):
+    velocity = tracker(clock, max_card_taps=1)
+    velocity.check('a')
+    velocity.forget('a')
+    assert velocity.check('a') is None
+    velocity.clear()
+    assert len(velocity) == 0
+
+
+def test_sliding_window_counter():
+    counter = SlidingWindowCounter(window=60, buckets=6)
+    assert counter.add(0) == 1
+    assert counter.add(30, 2) == 3
+    assert counter.total(65) == 2
+    assert counter.total(200) == 0
+
+
+def make_block_manager(clock, **kwargs):
+    return BlockManager(velocity=tracker(clock, max_card_taps=2), **kwargs)
+
+
+def test_flagged_card_is_refused_but_not_blacklisted_by_default(home, clock):
+    block_manager = make_block_manager(clock)
+    assert not block_manager.is_suspicious('CARD1234')
+    assert not block_manager.is_suspicious('CARD1234')
+    assert block_manager.is_suspicious('CARD1234')
+    assert hash_card('CARD1234') not in block_manager._blocked_hashes
+
+    clock.now += 60
+    assert not block_manager.is_suspicious('CARD1234')
+
+
+def test_blacklist_reasons_opt_in(home, clock):
+    velocity = tracker(clock, max_card_taps=1, blacklist_reasons=(CARD_VELOCITY,))
+    block_manager = BlockManager(velocity=velocity)
+    block_manager.is_suspicious('CARD1234')
+    assert block_manager.is_suspicious('CARD1234')
+    clock.now += 600
+    assert block_manager.is_suspicious('CARD1234')
+    assert hash_card('CARD1234') in block_manager._blocked_hashes
+
+
+def test_trusted_cards_skip_velocity(home, clock):
+    block_manager = make_block_manager(clock, trusted=lambda card: card == 'OWNER1234')
+    assert not any(block_manager.is_suspicious('OWNER1234', 'r1') for _ in range(50))
+    assert any(block_manager.is_suspicious('CARD1234', 'r1') for _ in range(50))
+
+
+def test_velocity_can_be_disabled(home):
+    block_manager = BlockManager(velocity=None)
+    assert not any(block_manager.is_suspicious('CARD1234') for _ in range(100))
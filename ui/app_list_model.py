@@ -0,0 +1,152 @@
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt, QThread, pyqtSignal
+
+
+class AppListModel(QAbstractListModel):
+    """
+    List model of installed applications for the Lock tab.
+    Rows are appended in batches and filtered against a precomputed
+    lowercase name index, so views stay responsive with tens of thousands of apps.
+    """
+
+    AppRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._apps = []
+        self._names = []
+        self._keys = []
+        # Indices into _apps that match the current filter, in display order
+        self._visible = []
+        # Leading rows of _visible whose name starts with the filter
+        self._prefix_count = 0
+        self._filter = ''
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._visible)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._visible):
+            return None
+        i = self._visible[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._names[i]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self._apps[i].get('path', '')
+        if role == self.AppRole:
+            return self._apps[i]
+        return None
+
+    def app_at(self, row):
+        """Get the app dict shown at a row."""
+        return self._apps[self._visible[row]]
+
+    def total_count(self):
+        """Number of loaded apps, ignoring the filter."""
+        return len(self._apps)
+
+    def clear(self):
+        self.beginResetModel()
+        self._apps.clear()
+        self._names.clear()
+        self._keys.clear()
+        self._visible.clear()
+        self._prefix_count = 0
+        self.endResetModel()
+
+    def append_apps(self, apps):
+        """Append a batch of app dicts, showing those that match the filter."""
+        if not apps:
+            return
+        start = len(self._apps)
+        for app in apps:
+            if isinstance(app, dict):
+                name = app.get('name') or app.get('path', '')
+            else:
+                name = str(app)
+                app = {'name': name, 'path': ''}
+            self._apps.append(app)
+            self._names.append(name)
+            self._keys.append(name.lower())
+
+        matches = self._match(range(start, len(self._apps)), self._filter)
+        if self._filter:
+            # New apps sort after the loaded ones, so new prefix matches go at
+            # the end of the prefix rows and the rest at the end of the list.
+            # Inserting rows (not resetting) keeps the selection and scroll position.
+            prefix, matches = self._rank(matches, self._filter)
+            if prefix:
+                first = self._prefix_count
+                self.beginInsertRows(QModelIndex(), first, first + len(prefix) - 1)
+                self._visible[first:first] = prefix
+                self._prefix_count += len(prefix)
+                self.endInsertRows()
+        if matches:
+            first = len(self._visible)
+            self.beginInsertRows(QModelIndex(), first, first + len(matches) - 1)
+            self._visible.extend(matches)
+            self.endInsertRows()
+
+    def set_filter(self, text):
+        """Show apps whose name contains text (case-insensitive), prefix matches first."""
+        text = text.strip().lower()
+        if text == self._filter:
+            return
+        if self._filter and text.startswith(self._filter):
+            # Narrowing the query: only rows that matched before can still match
+            candidates = self._visible
+        else:
+            candidates = range(len(self._apps))
+        prefix, rest = self._rank(self._match(candidates, text), text)
+        self.beginResetModel()
+        self._visible = prefix + rest
+        self._prefix_count = len(prefix)
+        self._filter = text
+        self.endResetModel()
+
+    def _match(self, candidates, text):
+        if not text:
+            return list(candidates)
+        keys = self._keys
+        return [i for i in candidates if text in keys[i]]
+
+    def _rank(self, indices, text):
+        """Split indices into (prefix matches, other matches), each in load order."""
+        if not text:
+            return [], sorted(indices)
+        keys = self._keys
+        prefix = sorted(i for i in indices if keys[i].startswith(text))
+        rest = sorted(i for i in indices if not keys[i].startswith(text))
+        return prefix, rest
+
+
+class AppInventoryLoader(QThread):
+    """Scans installed applications off the GUI thread and emits them in batches."""
+
+    batch_loaded = pyqtSignal(list)
+    loading_finished = pyqtSignal(int)
+
+    def __init__(self, app_locker, batch_size=500, parent=None):
+        super().__init__(parent)
+        self.app_locker = app_locker
+        self.batch_size = batch_size
+
+    def run(self):
+        batch = []
+        total = 0
+        try:
+            for app in self.app_locker.iter_installed_apps():
+                if self.isInterruptionRequested():
+                    return
+                batch.append(app)
+                if len(batch) >= self.batch_size:
+                    total += len(batch)
+                    self.batch_loaded.emit(batch)
+                    batch = []
+            if batch:
+                total += len(batch)
+                self.batch_loaded.emit(batch)
+        except Exception as e:
+            print(f"Error loading applications: {e}")
+        self.loading_finished.emit(total)
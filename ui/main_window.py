@@ -1,35 +1,340 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QLabel, QLineEdit, QListWidget,
-                             QTextEdit, QMessageBox, QTabWidget, QCheckBox)
-from PyQt6.QtCore import Qt, QTimer
+                             QPushButton, QLabel, QLineEdit, QListView,
+                             QPlainTextEdit, QMessageBox, QTabWidget, QCheckBox,
+                             QInputDialog, QAbstractItemView)
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont
-from utils.notifier import Notifier
-from utils.usage_counter import UsageCounter
-from utils.app_locker import AppLocker
-from hardware.card_reader import CardReader
+from ui.app_list_model import AppListModel, AppInventoryLoader
+from utils.activity_log import ActivityLog
+from utils.tracing import get_tracer
+from utils.startup_profiler import NullProfiler
 import sys
+import time
+import platform
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _LaunchChallenge:
+    """Suspended launches of one locked app, decided together by one card (and PIN) check."""
+    
+    def __init__(self, enforcer, path, name, pid, deadline):
+        self.enforcer = enforcer
+        self.path = path
+        self.name = name
+        self.pids = [pid]
+        self.deadline = deadline
+        self.prompt = None
+        self.timer = None
+        self.done = False
+
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # Emitted from the enforcer thread when a locked app starts: enforcer, pid, exe, app path, app name
+    locked_app_launched = pyqtSignal(object, int, str, str, str)
+    # Emitted from worker threads when a future finishes: callback, future
+    future_done = pyqtSignal(object, object)
+    
+    # Lines kept in the activity log view, and how often new lines are flushed to it
+    LOG_CAPACITY = 1000
+    LOG_FLUSH_INTERVAL_MS = 250
+    
+    # Reader ID given to taps on the built-in card reader
+    READER_ID = 'local'
+    
+    # Locked-app challenges: how long to wait for a card tap, how often the
+    # reader is polled meanwhile, and how long a passed challenge covers new launches
+    CHALLENGE_TIMEOUT_S = 30
+    CHALLENGE_POLL_MS = 250
+    CHALLENGE_GRANT_S = 120
+    
+    def __init__(self, profiler=None):
         super().__init__()
+        self.profiler = profiler or NullProfiler()
         self.setWindowTitle("CardGuard - Application Locker")
         self.setGeometry(100, 100, 900, 700)
         
-        # Initialize components
-        self.notifier = Notifier()
-        self.usage_counter = UsageCounter()
-        self.app_locker = AppLocker()
-        self.card_reader = CardReader()
+        # Components are created on first use (see the properties below)
+        self._notifier = None
+        self._usage_counter = None
+        self._app_locker = None
+        self._card_reader = None
+        self._block_manager = None
+        self._scan_pipeline = None
         
-        # Setup UI
-        self.init_ui()
+        # Locked-app challenges in progress, and when recent grants expire (both by app path)
+        self._challenges = {}
+        self._grants = {}
         
-        # Record usage
-        self.usage_counter.increment()
+        # App loaders replaced by a rescan that have not stopped yet
+        self._retired_loaders = []
         
+        # Started on a worker once the window has painted (Linux only)
+        self.enforcer = None
+        self._enforcer_startup = None
+        self._closing = False
+        
+        # Tabs other than the first are built the first time they are shown
+        self._lazy_tabs = {}
+        self.log_area = None
+        self.activity_log = ActivityLog(capacity=self.LOG_CAPACITY)
+        self.future_done.connect(self._on_future_done)
+        
+        # Setup UI
+        with self.profiler.stage('MainWindow.init_ui'):
+            self.init_ui()
+        
+        # Record usage and start card monitoring once the window has painted
+        QTimer.singleShot(0, self._finish_startup)
+        
+    @property
+    def notifier(self):
+        if self._notifier is None:
+            from utils.notifier import Notifier
+            self._notifier = Notifier()
+        return self._notifier
+        
+    @property
+    def usage_counter(self):
+        if self._usage_counter is None:
+            from utils.usage_counter import UsageCounter
+            self._usage_counter = UsageCounter()
+        return self._usage_counter
+        
+    @property
+    def app_locker(self):
+        if self._app_locker is None:
+            from utils.app_locker import AppLocker
+            self._app_locker = AppLocker()
+        return self._app_locker
+        
+    @property
+    def card_reader(self):
+        if self._card_reader is None:
+            from hardware.card_reader import CardReader
+            self._card_reader = CardReader()
+        return self._card_reader
+        
+    @property
+    def block_manager(self):
+        if self._block_manager is None:
+            from utils.block_manager import BlockManager
+            # The owner taps their registered card at every challenge; only other cards are rate-limited
+            self._block_manager = BlockManager(trusted=self.app_locker.is_card_registered)
+        return self._block_manager
+        
+    @property
+    def scan_pipeline(self):
+        """Reads, checks and verifies card taps off the GUI thread."""
+        if self._scan_pipeline is None:
+            from utils.scan_pipeline import ScanPipeline
+            self._scan_pipeline = ScanPipeline(self.app_locker, self.block_manager,
+                                               card_reader=self.card_reader,
+                                               notifier=self.notifier, log=self.add_log)
+        return self._scan_pipeline
+        
+    def run_when_done(self, future, callback):
+        """Call callback(future) on the GUI thread once a worker future completes."""
+        future.add_done_callback(lambda f: self.future_done.emit(callback, f))
+        
+    def _on_future_done(self, callback, future):
+        callback(future)
+        
+    def _finish_startup(self):
+        """Deferred startup work that does not need to block the first paint."""
         # Start card monitoring
         self.start_card_monitoring()
         
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start(self.LOG_FLUSH_INTERVAL_MS)
+        self.add_log("CardGuard initialized")
+        
+        # Loading the usage counter and app locker reads (and may wait on) the
+        # state directory, the usage write waits for its lock, and the enforcer
+        # builds its rules and scans /proc: all of it runs on a worker, and the
+        # components are handed back to the GUI thread when ready
+        worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cardguard-startup')
+        self.run_when_done(worker.submit(self._record_usage), self._on_usage_recorded)
+        self.start_enforcement(worker)
+        worker.shutdown(wait=False)
+        
+    def _record_usage(self):
+        """Worker: load the usage counter and count this launch."""
+        from utils.usage_counter import UsageCounter
+        usage_counter = UsageCounter()
+        usage_counter.increment()
+        return usage_counter
+        
+    def _on_usage_recorded(self, future):
+        if future.exception() is not None:
+            print(f"Error recording usage: {future.exception()}")
+            return
+        if self._usage_counter is None:
+            self._usage_counter = future.result()
+        else:
+            # A tab built its own counter meanwhile; pick up the launch just recorded
+            self._usage_counter.refresh()
+        if self.log_area is not None:
+            self.usage_label.setText(f"App Usage: {self._usage_counter.get_count()} times")
+        
+    def start_enforcement(self, executor):
+        """
+        Watch for locked apps being launched (Linux only).
+        
+        Args:
+            executor: Runs the enforcer's startup (loading the lock list,
+                building its rules and the first /proc scan)
+        """
+        if platform.system() != 'Linux':
+            return
+        self.locked_app_launched.connect(self.challenge_locked_launch)
+        self._enforcer_startup = executor.submit(self._start_enforcer, self._app_locker)
+        self.run_when_done(self._enforcer_startup, self._on_enforcement_started)
+        
+    def _start_enforcer(self, app_locker):
+        """Worker: start an AppEnforcer. Returns (app_locker, enforcer or None)."""
+        from utils.app_enforcer import AppEnforcer
+        if app_locker is None:
+            from utils.app_locker import AppLocker
+            app_locker = AppLocker()
+        enforcer = AppEnforcer(
+            app_locker,
+            lambda pid, exe, app: self.locked_app_launched.emit(enforcer, pid, exe, app.path, app.name),
+            suspend=True)
+        if not enforcer.start():
+            return app_locker, None
+        return app_locker, enforcer
+            
+    def _on_enforcement_started(self, future):
+        try:
+            app_locker, enforcer = future.result()
+        except Exception as e:
+            print(f"Error starting app enforcement: {e}")
+            return
+        if self._app_locker is None:
+            self._app_locker = app_locker
+        if enforcer is None:
+            return
+        if self._closing or self.enforcer not in (None, enforcer):
+            # Shut down while starting
+            enforcer.stop()
+            return
+        self._adopt_enforcer(enforcer)
+        
+    def _adopt_enforcer(self, enforcer):
+        if self.enforcer is not enforcer:
+            self.enforcer = enforcer
+            self.add_log(f"App enforcement active ({enforcer.mode})")
+            
+    def challenge_locked_launch(self, enforcer, pid, exe, path, name):
+        """
+        A locked app was started and suspended: allow it only after a card tap (and PIN).
+        
+        Further launches of an app that is being challenged join that challenge,
+        and launches within CHALLENGE_GRANT_S of a passed challenge are let
+        through, so a multi-process app (a browser, an Electron app) asks once.
+        """
+        if enforcer is not self.enforcer:
+            if self.enforcer is None and not self._closing and enforcer.is_running():
+                # Caught before the startup result reached this thread
+                self._adopt_enforcer(enforcer)
+            else:
+                # Enforcement was shut down after this launch was suspended
+                enforcer.terminate_process(pid)
+                return
+        if time.monotonic() < self._grants.get(path, 0):
+            enforcer.resume_process(pid)
+            return
+        challenge = self._challenges.get(path)
+        if challenge is not None:
+            challenge.pids.append(pid)
+            return
+            
+        self.add_log(f"Locked app launched: {name}")
+        challenge = _LaunchChallenge(enforcer, path, name, pid,
+                                     time.monotonic() + self.CHALLENGE_TIMEOUT_S)
+        self._challenges[path] = challenge
+        challenge.prompt = QMessageBox(QMessageBox.Icon.Information, "Locked Application",
+                                       f"{name} is locked.\nTap your card on the reader to open it.",
+                                       QMessageBox.StandardButton.Cancel, self)
+        challenge.prompt.finished.connect(lambda result: self._cancel_challenge(challenge))
+        challenge.prompt.show()
+        # Wait for the tap without blocking the window
+        challenge.timer = QTimer(self)
+        challenge.timer.timeout.connect(lambda: self._poll_challenge_card(challenge))
+        challenge.timer.start(self.CHALLENGE_POLL_MS)
+        
+    def _cancel_challenge(self, challenge):
+        if not challenge.done:
+            self.add_log(f"Challenge for {challenge.name} cancelled")
+            self._decide_locked_launch(challenge, False)
+        
+    def _poll_challenge_card(self, challenge):
+        if challenge.done:
+            return
+        if time.monotonic() > challenge.deadline:
+            self.add_log(f"No card tapped for {challenge.name}")
+            self._decide_locked_launch(challenge, False)
+            return
+        card_id = self.card_reader.read_card()
+        if not card_id:
+            return
+        challenge.timer.stop()
+        challenge.prompt.setText(f"Checking card for {challenge.name}...")
+        self.run_when_done(self.scan_pipeline.submit(self.READER_ID, card_id),
+                           lambda future: self._on_challenge_scanned(challenge, future))
+        
+    def _on_challenge_scanned(self, challenge, future):
+        from utils.scan_pipeline import GRANTED
+        if challenge.done:
+            return
+        try:
+            allowed = future.result().decision == GRANTED
+        except Exception as e:
+            print(f"Error scanning card: {e}")
+            allowed = False
+        if allowed and self.app_locker.has_pin():
+            challenge.prompt.hide()
+            pin, ok = QInputDialog.getText(self, "Locked Application",
+                                           f"{challenge.name} is locked. Enter your PIN:",
+                                           QLineEdit.EchoMode.Password)
+            if ok:
+                # The processes stay suspended while the PIN is checked off the GUI thread
+                self.run_when_done(self.app_locker.verify_pin_async(pin),
+                                   lambda future: self._finish_challenge(challenge, future))
+                return
+            allowed = False
+        self._decide_locked_launch(challenge, allowed)
+        
+    def _finish_challenge(self, challenge, future):
+        try:
+            allowed = future.result()
+        except Exception as e:
+            print(f"Error verifying PIN: {e}")
+            allowed = False
+        self._decide_locked_launch(challenge, allowed)
+        
+    def _decide_locked_launch(self, challenge, allowed):
+        """Resume or kill every launch waiting on a challenge."""
+        if challenge.done:
+            return
+        challenge.done = True
+        challenge.timer.stop()
+        challenge.prompt.close()
+        challenge.prompt.deleteLater()
+        self._challenges.pop(challenge.path, None)
+        if allowed:
+            self._grants[challenge.path] = time.monotonic() + self.CHALLENGE_GRANT_S
+            for pid in challenge.pids:
+                challenge.enforcer.resume_process(pid)
+            self.add_log(f"Access to {challenge.name} granted")
+        else:
+            for pid in challenge.pids:
+                challenge.enforcer.terminate_process(pid)
+            self.add_log(f"Blocked launch of {challenge.name}")
+            self.notifier.send_notification("App Blocked", f"{challenge.name} is locked by CardGuard",
+                                            "critical")
+        
     def init_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -51,13 +356,45 @@ class MainWindow(QMainWindow):
         self.setup_tab = self.create_setup_tab()
         self.tabs.addTab(self.setup_tab, "Card Setup")
         
-        # Lock Tab
-        self.lock_tab = self.create_lock_tab()
-        self.tabs.addTab(self.lock_tab, "Lock Applications")
+        # Lock Tab (scans installed apps, so only built when opened)
+        self.lock_tab = self.add_lazy_tab(self.create_lock_tab, "Lock Applications")
         
         # Status Tab
-        self.status_tab = self.create_status_tab()
-        self.tabs.addTab(self.status_tab, "Status & Logs")
+        self.status_tab = self.add_lazy_tab(self.create_status_tab, "Status & Logs")
+        
+        self.tabs.currentChanged.connect(self.ensure_tab)
+        
+    def add_lazy_tab(self, builder, title):
+        """Add an empty tab whose contents are built by builder() on first show."""
+        container = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        container.setLayout(layout)
+        index = self.tabs.addTab(container, title)
+        self._lazy_tabs[index] = (container, builder)
+        return container
+        
+    def ensure_tab(self, index):
+        """Build a lazy tab if it has not been built yet."""
+        entry = self._lazy_tabs.pop(index, None)
+        if entry is None:
+            return
+        container, builder = entry
+        with self.profiler.stage(f'build tab {self.tabs.tabText(index)!r}'):
+            container.layout().addWidget(builder())
+            
+    def ensure_status_tab(self):
+        """Status widgets are shared by several actions; build them on demand."""
+        self.ensure_tab(self.tabs.indexOf(self.status_tab))
+        
+    def set_lock_status(self, locked):
+        self.ensure_status_tab()
+        if locked:
+            self.lock_status_label.setText("Locked")
+            self.lock_status_label.setStyleSheet("color: red; font-weight: bold;")
+        else:
+            self.lock_status_label.setText("Unlocked")
+            self.lock_status_label.setStyleSheet("color: green; font-weight: bold;")
         
     def create_setup_tab(self):
         widget = QWidget()
@@ -111,9 +448,18 @@ class MainWindow(QMainWindow):
         info_label.setFont(QFont("Arial", 12, QFont.Weight.Bold))
         layout.addWidget(info_label)
         
-        # Application list
-        self.app_list = QListWidget()
-        self.load_applications()
+        self.app_search = QLineEdit()
+        self.app_search.setPlaceholderText("Search applications...")
+        self.app_search.setClearButtonEnabled(True)
+        layout.addWidget(self.app_search)
+        
+        # Application list (model/view, filled in batches by a background loader)
+        self.app_model = AppListModel(self)
+        self.app_list = QListView()
+        self.app_list.setModel(self.app_model)
+        self.app_list.setUniformItemSizes(True)
+        self.app_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.app_search.textChanged.connect(self.app_model.set_filter)
         layout.addWidget(self.app_list)
         
         # Buttons
@@ -134,6 +480,8 @@ class MainWindow(QMainWindow):
         layout.addLayout(btn_layout)
         
         widget.setLayout(layout)
+        self.app_loader = None
+        self.load_applications()
         return widget
         
     def create_status_tab(self):
@@ -165,11 +513,16 @@ class MainWindow(QMainWindow):
         log_label = QLabel("Activity Log:")
         layout.addWidget(log_label)
         
-        self.log_area = QTextEdit()
+        self.log_area = QPlainTextEdit()
         self.log_area.setReadOnly(True)
+        self.log_area.setMaximumBlockCount(self.LOG_CAPACITY)
         layout.addWidget(self.log_area)
         
-        self.add_log("CardGuard initialized")
+        # Show recent history; later lines arrive through flush_log
+        self.activity_log.drain()
+        history = self.activity_log.get_lines()
+        if history:
+            self.log_area.setPlainText('\n'.join(history))
         
         widget.setLayout(layout)
         return widget
@@ -204,64 +557,156 @@ class MainWindow(QMainWindow):
     def set_pin(self):
         pin = self.pin_input.text()
         if len(pin) >= 4:
-            self.app_locker.set_pin(pin)
-            self.add_log("PIN set successfully")
-            QMessageBox.information(self, "PIN Set", "Your PIN has been set")
+            # Hashing takes ~100 ms of KDF work; do it off the GUI thread
+            self.set_pin_btn.setEnabled(False)
             self.pin_input.clear()
+            self.run_when_done(self.app_locker.set_pin_async(pin), self._on_pin_set)
         else:
             QMessageBox.warning(self, "Invalid PIN", "PIN must be at least 4 digits")
             
+    def _on_pin_set(self, future):
+        self.set_pin_btn.setEnabled(True)
+        try:
+            future.result()
+        except Exception as e:
+            self.add_log(f"Failed to set PIN: {e}")
+            QMessageBox.warning(self, "Error", "Failed to set PIN")
+            return
+        self.add_log("PIN set successfully")
+        QMessageBox.information(self, "PIN Set", "Your PIN has been set")
+            
     def load_applications(self):
-        self.app_list.clear()
-        apps = self.app_locker.get_installed_apps()
-        for app in apps:
-            # Extract app name with fallback to handle dict objects
-            try:
-                if isinstance(app, dict):
-                    app_name = app.get('name', str(app))
-                else:
-                    app_name = str(app)
-                self.app_list.addItem(app_name)
-            except Exception as e:
-                self.add_log(f"Error loading app: {e}")        self.add_log(f"Loaded {len(apps)} applications")
+        if self.app_loader is not None:
+            # Don't wait for the old scan here; its batches are ignored from now on
+            # and it is deleted once it stops (closeEvent waits for it if it hasn't)
+            old_loader = self.app_loader
+            old_loader.requestInterruption()
+            self._retired_loaders.append(old_loader)
+            old_loader.finished.connect(self._on_retired_loader_finished)
+            if old_loader.isFinished():
+                self._drop_retired_loader(old_loader)
+        self.app_model.clear()
+        self.refresh_apps_btn.setEnabled(False)
+        self.app_loader = AppInventoryLoader(self.app_locker, parent=self)
+        self.app_loader.batch_loaded.connect(self.on_apps_loaded)
+        self.app_loader.loading_finished.connect(self.on_apps_loading_finished)
+        self.app_loader.start()
+        
+    def _on_retired_loader_finished(self):
+        self._drop_retired_loader(self.sender())
+        
+    def _drop_retired_loader(self, loader):
+        if loader in self._retired_loaders:
+            self._retired_loaders.remove(loader)
+            loader.deleteLater()
+            
+    def on_apps_loaded(self, apps):
+        # Ignore batches still queued from a loader that was replaced
+        if self.sender() is self.app_loader:
+            self.app_model.append_apps(apps)
+            
+    def on_apps_loading_finished(self, count):
+        if self.sender() is self.app_loader:
+            self.refresh_apps_btn.setEnabled(True)
+            self.add_log(f"Loaded {count} applications")
         
     def lock_applications(self):
-        selected_items = self.app_list.selectedItems()
-        if not selected_items:
+        rows = sorted(index.row() for index in self.app_list.selectionModel().selectedRows())
+        if not rows:
             QMessageBox.warning(self, "No Selection", "Please select apps to lock")
             return
             
-        app_names = [item.text() for item in selected_items]
-        self.app_locker.lock_apps(app_names)
-        self.lock_status_label.setText("Locked")
-        self.lock_status_label.setStyleSheet("color: red; font-weight: bold;")
-        self.add_log(f"Locked {len(app_names)} applications")
-        self.notifier.send_notification("Apps Locked", f"{len(app_names)} applications are now locked")
+        apps = [self.app_model.app_at(row) for row in rows]
+        for app in apps:
+            self.app_locker.lock_app(app.get('path', ''), app.get('name', ''))
+        self.set_lock_status(True)
+        self.add_log(f"Locked {len(apps)} applications")
+        self.notifier.send_notification("Apps Locked", f"{len(apps)} applications are now locked")
         
     def unlock_applications(self):
-        if not self.app_locker.is_card_registered():
+        if not self.app_locker.get_registered_cards():
             QMessageBox.warning(self, "No Card", "Please register a card first")
             return
             
-        # Read card
-        card_id = self.card_reader.read_card()
-        if card_id and self.app_locker.verify_card(card_id):
+        trace = get_tracer().start_trace("unlock")
+        # The card is read, checked against the blacklist and verified in the
+        # scan pipeline; the unlock resumes in _on_unlock_scanned
+        span = trace.start_span("scan")
+        self.unlock_apps_btn.setEnabled(False)
+        self.run_when_done(self.scan_pipeline.submit(self.READER_ID, trace=trace),
+                           lambda future: self._on_unlock_scanned(trace, span, future))
+        
+    def _on_unlock_scanned(self, trace, span, future):
+        from utils.scan_pipeline import BLOCKED, GRANTED
+        span.end()
+        self.unlock_apps_btn.setEnabled(True)
+        try:
+            decision = future.result().decision
+        except Exception as e:
+            print(f"Error scanning card: {e}")
+            decision = None
+        try:
+            if decision == BLOCKED:
+                trace.finish(decision="blocked_card")
+                QMessageBox.critical(self, "Card Blocked", "This card has been blocked by CardGuard")
+                self.add_log("Unlock failed - card blocked")
+                return
+            if decision != GRANTED:
+                trace.finish(decision="invalid_card")
+                QMessageBox.critical(self, "Card Error", "Invalid card or card not detected")
+                self.add_log("Unlock failed - invalid card")
+                return
+                
             # Check PIN if set
             if self.app_locker.has_pin():
-                pin, ok = QLineEdit.getText(self, "Enter PIN", "Enter your PIN:")
-                if not ok or not self.app_locker.verify_pin(pin):
-                    QMessageBox.critical(self, "Wrong PIN", "Incorrect PIN")
-                    self.add_log("Unlock failed - wrong PIN")
+                with trace.span("pin_dialog"):
+                    pin, ok = QInputDialog.getText(self, "Enter PIN", "Enter your PIN:",
+                                                   QLineEdit.EchoMode.Password)
+                if not ok:
+                    self._reject_pin(trace)
                     return
-                    
-            self.app_locker.unlock_all_apps()
-            self.lock_status_label.setText("Unlocked")
-            self.lock_status_label.setStyleSheet("color: green; font-weight: bold;")
-            self.add_log("All applications unlocked")
-            self.notifier.send_notification("Apps Unlocked", "Applications are now unlocked")
+                # The KDF runs on a worker thread; the unlock resumes in _on_unlock_pin_checked
+                span = trace.start_span("verify_pin")
+                self.unlock_apps_btn.setEnabled(False)
+                self.run_when_done(self.app_locker.verify_pin_async(pin),
+                                   lambda future: self._on_unlock_pin_checked(trace, span, future))
+                return
+                
+            self._complete_unlock(trace)
+        except BaseException as e:
+            trace.finish(error=type(e).__name__)
+            raise
+            
+    def _on_unlock_pin_checked(self, trace, span, future):
+        span.end()
+        self.unlock_apps_btn.setEnabled(True)
+        try:
+            pin_ok = future.result()
+        except Exception as e:
+            print(f"Error verifying PIN: {e}")
+            pin_ok = False
+        if pin_ok:
+            self._complete_unlock(trace)
         else:
-            QMessageBox.critical(self, "Card Error", "Invalid card or card not detected")
-            self.add_log("Unlock failed - invalid card")
+            self._reject_pin(trace)
+            
+    def _reject_pin(self, trace):
+        trace.finish(decision="wrong_pin")
+        QMessageBox.critical(self, "Wrong PIN", "Incorrect PIN")
+        self.add_log("Unlock failed - wrong PIN")
+        
+    def _complete_unlock(self, trace):
+        try:
+            with trace.span("unlock_all_apps"):
+                self.app_locker.unlock_all_apps()
+            self.set_lock_status(False)
+            self.add_log("All applications unlocked")
+            with trace.span("notify"):
+                self.notifier.send_notification("Apps Unlocked", "Applications are now unlocked")
+        except BaseException as e:
+            trace.finish(error=type(e).__name__)
+            raise
+        trace.finish(decision="unlocked")
             
     def start_card_monitoring(self):
         self.card_timer = QTimer()
@@ -269,6 +714,14 @@ class MainWindow(QMainWindow):
         self.card_timer.start(1000)  # Check every second
         
     def check_card_presence(self):
+        # Pick up state changed by other CardGuard processes
+        if self._app_locker is not None:
+            self._app_locker.refresh()
+        if self._block_manager is not None:
+            self._block_manager.refresh()
+        if self.log_area is None:
+            # Status tab not built yet; nothing to update
+            return
         if self.card_reader.is_card_present():
             self.card_detect_label.setText("Card detected")
             self.card_detect_label.setStyleSheet("color: green;")
@@ -277,12 +730,46 @@ class MainWindow(QMainWindow):
             self.card_detect_label.setStyleSheet("color: gray;")
             
     def add_log(self, message):
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_area.append(f"[{timestamp}] {message}")
+        self.activity_log.add(message)
+        
+    def flush_log(self):
+        """Append lines logged since the last flush in one batch."""
+        if self.log_area is None:
+            return
+        lines = self.activity_log.drain()
+        if lines:
+            self.log_area.appendPlainText('\n'.join(lines))
         
     def closeEvent(self, event):
         # Clean up
+        self._closing = True
         if hasattr(self, 'card_timer'):
             self.card_timer.stop()
+        if hasattr(self, 'log_timer'):
+            self.log_timer.stop()
+        if self._scan_pipeline is not None:
+            self._scan_pipeline.close()
+        # Launches still waiting on a challenge would otherwise stay suspended
+        for challenge in list(self._challenges.values()):
+            self._decide_locked_launch(challenge, False)
+        enforcer = self.enforcer
+        if enforcer is None and self._enforcer_startup is not None:
+            # Still starting (or its result is queued); the event loop won't deliver it now
+            try:
+                enforcer = self._enforcer_startup.result()[1]
+            except Exception:
+                enforcer = None
+        if enforcer is not None:
+            # Also kills launches whose signal is still queued and will never be delivered
+            enforcer.stop()
+            self.enforcer = None
+        self.activity_log.close()
+        # A QThread destroyed with the window while still running aborts the process
+        loaders = list(self._retired_loaders)
+        if getattr(self, 'app_loader', None) is not None:
+            loaders.append(self.app_loader)
+        for loader in loaders:
+            loader.requestInterruption()
+        for loader in loaders:
+            loader.wait()
         event.accept()
@@ -0,0 +1,87 @@
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+
+class ActivityLog:
+    """
+    Bounded activity log.
+    Keeps the most recent lines in a ring buffer, queues new lines for the UI
+    to pick up in batches, and mirrors everything to a rotating file on disk.
+    """
+
+    def __init__(self, capacity=1000, log_file="activity.log", max_bytes=1024 * 1024,
+                 backup_count=5, data_dir=None):
+        """
+        Args:
+            capacity (int): Number of recent lines kept in memory
+            log_file (str): File name in the data directory, None to disable
+            max_bytes (int): Rotate the log file after this many bytes
+            backup_count (int): Number of rotated log files to keep
+            data_dir (str): Directory for the log file (default: ~/.cardguard)
+        """
+        self.capacity = capacity
+        self._lines = deque(maxlen=capacity)
+        self._pending = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        # Writes go straight to the handler; a logging.Logger per instance would
+        # stay registered in the logging module for the life of the process
+        self._file_lock = threading.Lock()
+        self._handler = None
+
+        if log_file:
+            self.data_dir = Path(data_dir) if data_dir else Path.home() / ".cardguard"
+            self.data_dir.mkdir(exist_ok=True)
+            self.log_path = self.data_dir / log_file
+            try:
+                handler = RotatingFileHandler(self.log_path, maxBytes=max_bytes,
+                                              backupCount=backup_count, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._handler = handler
+            except Exception as e:
+                print(f"Error opening activity log: {e}")
+        else:
+            self.log_path = None
+
+    def add(self, message):
+        """
+        Record a message.
+
+        Returns:
+            str: The timestamped line
+        """
+        now = datetime.now()
+        line = f"[{now.strftime('%H:%M:%S')}] {message}"
+        with self._lock:
+            self._lines.append(line)
+            self._pending.append(line)
+        with self._file_lock:
+            if self._handler is not None:
+                self._handler.handle(logging.makeLogRecord({
+                    'msg': f"{now.isoformat(timespec='seconds')} {message}",
+                    'levelno': logging.INFO,
+                    'levelname': 'INFO',
+                }))
+        return line
+
+    def drain(self):
+        """Take the lines added since the last drain (oldest first)."""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+        return lines
+
+    def get_lines(self):
+        """Get the most recent lines (up to capacity), oldest first."""
+        with self._lock:
+            return list(self._lines)
+
+    def close(self):
+        """Flush and close the on-disk log."""
+        with self._file_lock:
+            if self._handler is not None:
+                self._handler.close()
+                self._handler = None
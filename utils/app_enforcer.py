@@ -0,0 +1,474 @@
+import os
+import re
+import shlex
+import shutil
+import signal
+import select
+import socket
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.metrics import CACHE_REQUESTS
+from utils.records import LockedApp
+
+# Netlink process connector constants (linux/connector.h, linux/cn_proc.h)
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+NLMSG_DONE = 3
+
+_NLMSGHDR = struct.Struct('=IHHII')
+_CN_MSG = struct.Struct('=IIIIHH')
+_PROC_EVENT_HEADER = struct.Struct('=IIQ')
+_EXEC_EVENT = struct.Struct('=II')
+
+
+# Programs that run a script named on their command line; a process of
+# theirs is matched by that script, never by the interpreter itself
+_INTERPRETER = re.compile(r'^(python|pypy|perl|ruby|node|nodejs|php|lua|bash|sh|dash|zsh|ksh)[0-9.]*$')
+
+# Exec= wrappers that run the rest of the command line as given
+_WRAPPERS = frozenset({'env', 'nohup', 'setsid', 'prime-run', 'gamemoderun'})
+
+# Exec= programs that start something else (sandboxes, openers, privilege
+# helpers); what they end up running cannot be known from the entry
+LAUNCHERS = frozenset({
+    'flatpak', 'snap', 'firejail', 'bwrap', 'systemd-run', 'gtk-launch', 'xdg-open',
+    'gio', 'exo-open', 'kde-open', 'kde-open5', 'kioclient', 'kioclient5', 'dbus-launch',
+    'sudo', 'pkexec', 'gksu', 'kdesu', 'nice', 'ionice', 'taskset', 'wine', 'java',
+    'mono', 'dotnet', 'steam', 'appimage-run',
+})
+
+
+def is_interpreter(exe: str) -> bool:
+    """True if exe is a script interpreter (python3, sh, node ...)."""
+    return _INTERPRETER.match(os.path.basename(exe)) is not None
+
+
+def _script_argument(args: List[str]) -> Optional[str]:
+    """The script an interpreter was given, or None for inline code (-c, -m, -e)."""
+    for arg in args:
+        if arg in ('-c', '-m', '-e', '--eval'):
+            return None
+        if not arg.startswith('-'):
+            return arg
+    return None
+
+
+def parse_exec(exec_line: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Work out what a .desktop Exec= command line runs.
+
+    Returns:
+        tuple: (executable, script). Native programs give (path, None) and
+            interpreters running a script give (None, script path). Launchers
+            such as `flatpak run`, `sh -c` or `xdg-open` give (None, None),
+            since matching them would catch every process of that launcher.
+    """
+    args = [arg for arg in shlex.split(exec_line) if not arg.startswith('%')]
+    while args and os.path.basename(args[0]) in _WRAPPERS:
+        # env -i VAR=value program ...
+        args = args[1:]
+        while args and (args[0].startswith('-') or '=' in args[0]):
+            args = args[1:]
+    if not args or os.path.basename(args[0]) in LAUNCHERS:
+        return None, None
+    found = shutil.which(args[0])
+    exe = os.path.realpath(found) if found else None
+    if is_interpreter(args[0]) or (exe and is_interpreter(exe)):
+        script = _script_argument(args[1:])
+        if script is None or not os.path.isabs(script):
+            return None, None
+        return None, os.path.realpath(script)
+    return exe, None
+
+
+def resolve_launch(app_path: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Resolve a locked app path to what its processes look like: (executable, script).
+    .desktop entries are resolved through their Exec= line (see parse_exec).
+    Other paths are matched both as an executable and as a script.
+    """
+    if app_path.endswith('.desktop'):
+        try:
+            with open(app_path, 'r') as f:
+                for line in f:
+                    if line.startswith('Exec='):
+                        return parse_exec(line[5:].strip())
+        except (OSError, ValueError):
+            pass
+        return None, None
+    path = os.path.realpath(app_path)
+    return path, path
+
+
+def resolve_executable(app_path: str) -> Optional[str]:
+    """Resolve a locked app path to the executable a process would run, if it has one."""
+    return resolve_launch(app_path)[0]
+
+
+class AppEnforcer:
+    """
+    Watches for locked applications being launched (Linux).
+
+    New processes are found by diffing the PID set in /proc, and each PID's
+    /proc/<pid>/exe is resolved once and cached. Interpreter processes
+    (python3, sh ...) are matched by the script on their command line. When the netlink process
+    connector is available (needs CAP_NET_ADMIN), exec events are received
+    directly instead, so the monitor sleeps in recv() while nothing happens.
+    """
+
+    def __init__(self, app_locker, on_locked_launch: Callable[[int, str, LockedApp], None],
+                 poll_interval: float = 0.05, suspend: bool = False,
+                 use_netlink: bool = True, proc_root: str = '/proc', settle_polls: int = 3):
+        """
+        Args:
+            app_locker (AppLocker): Source of the locked application list
+            on_locked_launch (callable): Called as (pid, exe, app) from the monitor thread
+            poll_interval (float): Seconds between /proc scans in polling mode
+            suspend (bool): SIGSTOP matching processes before the callback runs;
+                the callback then calls resume_process() or terminate_process().
+                Processes still suspended when stop() is called are killed
+            use_netlink (bool): Try the netlink proc connector before polling
+            proc_root (str): procfs mount point
+            settle_polls (int): Re-resolve new PIDs for this many scans, to catch
+                a fork() that exec()s the locked binary just after being seen
+        """
+        self.app_locker = app_locker
+        self.on_locked_launch = on_locked_launch
+        self.poll_interval = poll_interval
+        self.suspend = suspend
+        self.use_netlink = use_netlink
+        self.proc_root = Path(proc_root)
+        self.settle_polls = settle_polls
+
+        self.mode = None
+        self._exe_cache: Dict[int, Optional[str]] = {}
+        self._young: Dict[int, int] = {}
+        self._known_pids = set()
+        self._locked_exes: Dict[str, LockedApp] = {}
+        self._locked_scripts: Dict[str, LockedApp] = {}
+        self._locked_version = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._sock = None
+        # PIDs this enforcer stopped and nobody has resumed or killed yet
+        self._suspended = set()
+        self._suspended_lock = threading.Lock()
+
+    # Locked set
+
+    def refresh_locked(self, force: bool = False):
+        """Rebuild the executable -> locked app index if the locked list changed."""
+        # Pick up locks written by other processes (one stat() when nothing changed)
+        self.app_locker.refresh()
+        version = getattr(self.app_locker, 'locked_apps_version', None)
+        if not force and version is not None and version == self._locked_version:
+            return
+        index = {}
+        scripts = {}
+        # Copy first: the GUI thread may lock or unlock apps meanwhile
+        for app in list(self.app_locker.get_locked_apps().values()):
+            exe, script = resolve_launch(app.path)
+            if exe:
+                index[exe] = app
+            if script:
+                scripts[script] = app
+            if not exe and not script and app.path.endswith('.desktop'):
+                print(f"Cannot enforce {app.name}: its launcher does not identify the program")
+            index[app.path] = app
+        self._locked_exes = index
+        self._locked_scripts = scripts
+        self._locked_version = version
+
+    def match(self, exe: str) -> Optional[LockedApp]:
+        """Get the locked app an executable belongs to, or None."""
+        app = self._locked_exes.get(exe)
+        if app is None:
+            # Directory and glob rules
+            app = self.app_locker.match_locked_app(exe)
+        return app
+
+    # /proc access
+
+    def _list_pids(self) -> set:
+        pids = set()
+        with os.scandir(self.proc_root) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.isdigit():
+                    pids.add(int(name))
+        return pids
+
+    def _read_exe(self, pid: int) -> Optional[str]:
+        try:
+            exe = os.readlink(self.proc_root / str(pid) / 'exe')
+        except OSError:
+            # Kernel threads, exited processes, or not permitted
+            return None
+        if exe.endswith(' (deleted)'):
+            exe = exe[:-10]
+        return exe
+
+    def _read_script(self, pid: int) -> Optional[str]:
+        """Absolute path of the script an interpreter process is running, if any."""
+        try:
+            with open(self.proc_root / str(pid) / 'cmdline', 'rb') as f:
+                args = f.read().split(b'\0')
+            script = _script_argument([os.fsdecode(arg) for arg in args[1:] if arg])
+            if script is None:
+                return None
+            if not os.path.isabs(script):
+                script = os.path.join(os.readlink(self.proc_root / str(pid) / 'cwd'), script)
+        except OSError:
+            return None
+        return os.path.realpath(script)
+
+    def _check(self, pid: int, exe: Optional[str], matches: List[Tuple[int, str, LockedApp]]):
+        if exe is None:
+            return
+        app = self.match(exe)
+        if app is None and self._locked_scripts and is_interpreter(exe):
+            script = self._read_script(pid)
+            if script is not None:
+                app = self._locked_scripts.get(script)
+        if app is not None:
+            matches.append((pid, exe, app))
+
+    def poll_once(self) -> List[Tuple[int, str, LockedApp]]:
+        """
+        Scan /proc once and report newly started locked processes.
+
+        Returns:
+            list: (pid, exe, app) for each match (callbacks are also fired)
+        """
+        self.refresh_locked()
+        pids = self._list_pids()
+        matches = []
+
+        for pid in self._known_pids - pids:
+            self._exe_cache.pop(pid, None)
+            self._young.pop(pid, None)
+            self._exited(pid)
+
+        new_pids = pids - self._known_pids
+        CACHE_REQUESTS.inc(len(pids) - len(new_pids) - len(self._young),
+                           cache='proc_exe', result='hit')
+        CACHE_REQUESTS.inc(len(new_pids) + len(self._young), cache='proc_exe', result='miss')
+
+        # Recently started PIDs may have exec()ed since the last scan
+        for pid in list(self._young):
+            exe = self._read_exe(pid)
+            if exe != self._exe_cache.get(pid):
+                self._exe_cache[pid] = exe
+                self._check(pid, exe, matches)
+            self._young[pid] -= 1
+            if self._young[pid] <= 0:
+                del self._young[pid]
+
+        first_scan = not self._known_pids
+        for pid in new_pids:
+            exe = self._read_exe(pid)
+            self._exe_cache[pid] = exe
+            if not first_scan:
+                self._young[pid] = self.settle_polls
+                self._check(pid, exe, matches)
+
+        self._known_pids = pids
+        self._dispatch(matches)
+        return matches
+
+    def _dispatch(self, matches):
+        for pid, exe, app in matches:
+            if self.suspend:
+                self.suspend_process(pid)
+            try:
+                self.on_locked_launch(pid, exe, app)
+            except Exception as e:
+                print(f"Error in locked launch callback: {e}")
+
+    # Process control
+
+    def suspend_process(self, pid: int) -> bool:
+        with self._suspended_lock:
+            try:
+                os.kill(pid, signal.SIGSTOP)
+            except OSError:
+                return False
+            self._suspended.add(pid)
+            return True
+
+    def _release(self, pid: int, sig) -> bool:
+        with self._suspended_lock:
+            if self.suspend:
+                # Only touch processes this enforcer stopped: once released (or
+                # killed by stop()) the PID may belong to an unrelated process
+                if pid not in self._suspended:
+                    return False
+                self._suspended.discard(pid)
+            try:
+                os.kill(pid, sig)
+                return True
+            except OSError:
+                return False
+
+    def _exited(self, pid: int):
+        # The PID can be reused from now on, so it must not be signalled later
+        with self._suspended_lock:
+            self._suspended.discard(pid)
+
+    def is_suspended(self, pid: int) -> bool:
+        """Check if a process is stopped by this enforcer and waiting for a decision."""
+        with self._suspended_lock:
+            return pid in self._suspended
+
+    def resume_process(self, pid: int) -> bool:
+        """Let a suspended process continue (e.g. after a successful challenge)."""
+        return self._release(pid, signal.SIGCONT)
+
+    def terminate_process(self, pid: int) -> bool:
+        """Kill a launched locked process (e.g. after a failed challenge)."""
+        return self._release(pid, signal.SIGKILL)
+
+    # Netlink fast path
+
+    def _open_netlink(self):
+        """Subscribe to proc connector events; returns None if unavailable."""
+        if not hasattr(socket, 'AF_NETLINK'):
+            return None
+        sock = None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+            sock.bind((0, CN_IDX_PROC))
+            sock.send(self._control_message(PROC_CN_MCAST_LISTEN, sock.getsockname()[0]))
+            return sock
+        except OSError:
+            if sock is not None:
+                sock.close()
+            return None
+
+    @staticmethod
+    def _control_message(op, port_id):
+        payload = struct.pack('=I', op)
+        cn_msg = _CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0)
+        length = _NLMSGHDR.size + len(cn_msg) + len(payload)
+        return _NLMSGHDR.pack(length, NLMSG_DONE, 0, 0, port_id) + cn_msg + payload
+
+    def _parse_events(self, data: bytes) -> List[Tuple[int, int]]:
+        """Extract (event, pid) pairs for process exec/exit from a netlink datagram."""
+        events = []
+        offset = 0
+        while offset + _NLMSGHDR.size <= len(data):
+            length = _NLMSGHDR.unpack_from(data, offset)[0]
+            if length < _NLMSGHDR.size:
+                break
+            event_at = offset + _NLMSGHDR.size + _CN_MSG.size
+            if event_at + _PROC_EVENT_HEADER.size + _EXEC_EVENT.size <= offset + length:
+                what = _PROC_EVENT_HEADER.unpack_from(data, event_at)[0]
+                if what in (PROC_EVENT_EXEC, PROC_EVENT_EXIT):
+                    # exec and exit events both start with (pid, tgid)
+                    pid, tgid = _EXEC_EVENT.unpack_from(data, event_at + _PROC_EVENT_HEADER.size)
+                    if pid == tgid:
+                        events.append((what, tgid))
+            offset += (length + 3) & ~3
+        return events
+
+    def _run_netlink(self):
+        sock = self._sock
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([sock], [], [], 0.5)
+                if not ready:
+                    continue
+                try:
+                    data = sock.recv(65536)
+                except OSError:
+                    continue
+                self._handle_events(data)
+            except Exception as e:
+                print(f"Enforcer netlink error: {e}")
+
+    def _handle_events(self, data: bytes):
+        self.refresh_locked()
+        matches = []
+        for what, pid in self._parse_events(data):
+            if what == PROC_EVENT_EXIT:
+                self._exe_cache.pop(pid, None)
+                self._exited(pid)
+                continue
+            exe = self._read_exe(pid)
+            self._exe_cache[pid] = exe
+            CACHE_REQUESTS.inc(cache='proc_exe', result='miss')
+            self._check(pid, exe, matches)
+        self._dispatch(matches)
+
+    # Lifecycle
+
+    def _run_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Enforcer poll error: {e}")
+
+    def start(self) -> bool:
+        """
+        Start monitoring on a background thread.
+
+        Returns:
+            bool: True if monitoring started, False if /proc is unavailable
+        """
+        if self._thread is not None:
+            return True
+        if not self.proc_root.is_dir():
+            print("App enforcement requires Linux /proc")
+            return False
+
+        self._stop.clear()
+        self.refresh_locked(force=True)
+        self._sock = self._open_netlink() if self.use_netlink else None
+        if self._sock is not None:
+            self.mode = 'netlink'
+            target = self._run_netlink
+        else:
+            self.mode = 'poll'
+            # Baseline scan: processes already running are not "launches"
+            self.poll_once()
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, name='cardguard-enforcer', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop monitoring, killing launches still waiting for a decision."""
+        if self._thread is None:
+            self._kill_suspended()
+            return
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+        if self._sock is not None:
+            try:
+                self._sock.send(self._control_message(PROC_CN_MCAST_IGNORE,
+                                                      self._sock.getsockname()[0]))
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+        self.mode = None
+        self._kill_suspended()
+
+    def _kill_suspended(self):
+        # Nothing can approve these launches any more; a locked app fails closed
+        with self._suspended_lock:
+            pids = list(self._suspended)
+        for pid in pids:
+            self.terminate_process(pid)
+
+    def is_running(self) -> bool:
+        return self._thread is not None
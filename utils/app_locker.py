@@ -1,16 +1,26 @@
 import os
 import sys
 import json
-import hashlib
+import marshal
+import time
 import platform
 import subprocess
-from typing import List, Dict, Optional
+import threading
+from itertools import islice
+from types import MappingProxyType
+from typing import List, Dict, Iterator, Mapping, Optional
 from pathlib import Path
+from utils.metrics import STORAGE_FLUSH, VERIFY_LATENCY
+from utils.path_rules import PathRuleSet
+from utils.pin_verifier import completed_future, get_pin_verifier
+from utils.records import LockedApp, RegisteredCard
+from utils.snapshot import get_snapshot
+from utils.state_sync import atomic_write_json, get_state_directory, synchronized_update
 
 class AppLocker:
     """Core application locking functionality"""
     
-    def __init__(self, config_dir=None):
+    def __init__(self, config_dir=None, pin_verifier=None):
         if config_dir is None:
             config_dir = Path.home() / '.cardguard'
         self.config_dir = Path(config_dir)
@@ -19,59 +29,119 @@ class AppLocker:
         self.config_file = self.config_dir / 'config.json'
         self.cards_file = self.config_dir / 'cards.json'
         self.locked_apps_file = self.config_dir / 'locked_apps.json'
+        self._pin_verifier = pin_verifier
+        
+        # Shared with other processes; generations are read before the files
+        # so a concurrent write is picked up by the next refresh()
+        self.state = get_state_directory(self.config_dir)
+        # Held by refresh() and synchronized_update so reloads and updates don't interleave
+        self._update_lock = threading.RLock()
+        self.snapshot = get_snapshot(self.config_dir)
+        current = self.state.generations()
+        self._generations = {
+            name: current.get(name, 0)
+            for name in (self.config_file.name, self.cards_file.name, self.locked_apps_file.name)
+        }
         
         self.config = self._load_config()
         self.registered_cards = self._load_cards()
         self.locked_apps = self._load_locked_apps()
+        # Bumped on every change to locked_apps so watchers can cache derived data
+        self.locked_apps_version = 0
+        self._path_rules = None
+        self._path_rules_version = None
         
-    def _load_config(self) -> Dict:
+    def refresh(self) -> bool:
+        """Reload only the state files other processes changed. Returns True if any did."""
+        with self._update_lock:
+            changed = self.state.changed(self._generations)
+            for name, generation in changed.items():
+                self._generations[name] = generation
+                # The writing process updates the snapshot; reloads here only read it
+                if name == self.config_file.name:
+                    self.config = self._load_config(seed_snapshot=False)
+                elif name == self.cards_file.name:
+                    self.registered_cards = self._load_cards(seed_snapshot=False)
+                elif name == self.locked_apps_file.name:
+                    self.locked_apps = self._load_locked_apps(seed_snapshot=False)
+                    self.locked_apps_version += 1
+            return bool(changed)
+    
+    # Card columns hold unique values, which marshal format 2 decodes fastest
+    _SNAPSHOT_VERSIONS = {'cards.json': 2}
+    
+    def _write_state(self, path: Path, data, snapshot_value):
+        """Atomically rewrite a state file, publish its new generation and update the snapshot"""
+        with STORAGE_FLUSH.time(file=path.name):
+            with self.state.write_lock():
+                atomic_write_json(path, data, indent=2)
+                self._generations[path.name] = self.state.bump(path.name)
+                self._update_snapshot(path, snapshot_value)
+    
+    def _update_snapshot(self, path: Path, value):
+        self.snapshot.update(path, value, self._SNAPSHOT_VERSIONS.get(path.name, marshal.version))
+    
+    def _read_state(self, path: Path, from_json, from_snapshot, to_snapshot, seed_snapshot=True):
+        """Load a state file from the binary snapshot, or parse the JSON (and seed the snapshot)"""
+        value = self.snapshot.load(path)
+        if value is not None:
+            return from_snapshot(value)
+        with open(path, 'r') as f:
+            result = from_json(json.load(f))
+        if seed_snapshot:
+            self._update_snapshot(path, to_snapshot(result))
+        return result
+        
+    def _load_config(self, seed_snapshot=True) -> Dict:
         """Load configuration from file"""
         if self.config_file.exists():
-            with open(self.config_file, 'r') as f:
-                return json.load(f)
+            return self._read_state(self.config_file, dict, dict, dict, seed_snapshot)
         return {'pin_enabled': False, 'pin_hash': None}
     
     def _save_config(self):
         """Save configuration to file"""
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f, indent=2)
+        self._write_state(self.config_file, self.config, self.config)
     
-    def _load_cards(self) -> Dict:
+    def _load_cards(self, seed_snapshot=True) -> Dict[str, RegisteredCard]:
         """Load registered cards"""
         if self.cards_file.exists():
-            with open(self.cards_file, 'r') as f:
-                return json.load(f)
+            return self._read_state(self.cards_file, RegisteredCard.load_all,
+                                    RegisteredCard.from_columns, RegisteredCard.to_columns,
+                                    seed_snapshot)
         return {}
     
     def _save_cards(self):
         """Save registered cards"""
-        with open(self.cards_file, 'w') as f:
-            json.dump(self.registered_cards, f, indent=2)
+        self._write_state(self.cards_file,
+                          {card_id: card.to_json() for card_id, card in self.registered_cards.items()},
+                          RegisteredCard.to_columns(self.registered_cards))
     
-    def _load_locked_apps(self) -> List:
-        """Load locked applications list"""
+    def _load_locked_apps(self, seed_snapshot=True) -> Dict[str, LockedApp]:
+        """Load locked applications, keyed by path"""
         if self.locked_apps_file.exists():
-            with open(self.locked_apps_file, 'r') as f:
-                return json.load(f)
-        return []
+            return self._read_state(self.locked_apps_file, LockedApp.load_all,
+                                    LockedApp.from_pairs, LockedApp.to_pairs, seed_snapshot)
+        return {}
     
     def _save_locked_apps(self):
         """Save locked applications list"""
-        with open(self.locked_apps_file, 'w') as f:
-            json.dump(self.locked_apps, f, indent=2)
+        self.locked_apps_version += 1
+        self._write_state(self.locked_apps_file,
+                          [app.to_json() for app in self.locked_apps.values()],
+                          LockedApp.to_pairs(self.locked_apps))
     
+    @synchronized_update
     def register_card(self, card_id: str, card_name: str = None) -> bool:
         """Register a new card"""
         if card_id in self.registered_cards:
             return False
         
-        self.registered_cards[card_id] = {
-            'name': card_name or f'Card {len(self.registered_cards) + 1}',
-            'registered_at': str(Path.home())
-        }
+        self.registered_cards[card_id] = RegisteredCard(
+            card_id, card_name or f'Card {len(self.registered_cards) + 1}', time.time())
         self._save_cards()
         return True
     
+    @synchronized_update
     def unregister_card(self, card_id: str) -> bool:
         """Unregister a card"""
         if card_id in self.registered_cards:
@@ -84,21 +154,63 @@ class AppLocker:
         """Check if card is registered"""
         return card_id in self.registered_cards
     
+    @property
+    def pin_verifier(self):
+        """PIN KDF worker pool (shared by default so calibration runs once)"""
+        if self._pin_verifier is None:
+            self._pin_verifier = get_pin_verifier()
+        return self._pin_verifier
+    
     def set_pin(self, pin: str) -> bool:
-        """Set PIN for additional security"""
-        pin_hash = hashlib.sha256(pin.encode()).hexdigest()
+        """Set PIN for additional security (blocks while the PIN is hashed)"""
+        return self.set_pin_async(pin).result()
+    
+    def set_pin_async(self, pin: str):
+        """Hash and store a new PIN on the KDF worker pool. Returns a Future of True."""
+        return self.pin_verifier.submit(self._store_pin, pin)
+    
+    def _store_pin(self, pin: str) -> bool:
+        pin_hash = self.pin_verifier.hash_pin(pin)
+        self._save_pin_hash(pin_hash)
+        return True
+    
+    @synchronized_update
+    def _save_pin_hash(self, pin_hash: str, replaces: Optional[str] = None):
+        """Store a PIN hash; with replaces, only if the stored hash is still that one"""
+        if replaces is not None and self.config.get('pin_hash') != replaces:
+            # The PIN was changed meanwhile; keep the new one
+            return
         self.config['pin_enabled'] = True
         self.config['pin_hash'] = pin_hash
         self._save_config()
-        return True
     
     def verify_pin(self, pin: str) -> bool:
-        """Verify entered PIN"""
+        """Verify entered PIN (blocks while the KDF runs; GUI code should use verify_pin_async)"""
+        return self.verify_pin_async(pin).result()
+    
+    def verify_pin_async(self, pin: str):
+        """
+        Verify a PIN on the KDF worker pool.
+        Legacy SHA-256 hashes are replaced by a PBKDF2 hash once the PIN matches.
+        
+        Returns:
+            Future: Resolves to True if the PIN is correct (or no PIN is set)
+        """
         if not self.config.get('pin_enabled'):
-            return True
-        pin_hash = hashlib.sha256(pin.encode()).hexdigest()
-        return pin_hash == self.config.get('pin_hash')
+            return completed_future(True)
+        return self.pin_verifier.submit(self._check_pin, pin, self.config.get('pin_hash'))
+    
+    def _check_pin(self, pin: str, stored: Optional[str]) -> bool:
+        with VERIFY_LATENCY.time(operation='verify_pin'):
+            ok, upgraded = self.pin_verifier.verify(pin, stored)
+        if upgraded is not None:
+            try:
+                self._save_pin_hash(upgraded, replaces=stored)
+            except Exception as e:
+                print(f"Error upgrading PIN hash: {e}")
+        return ok
     
+    @synchronized_update
     def disable_pin(self) -> bool:
         """Disable PIN protection"""
         self.config['pin_enabled'] = False
@@ -120,9 +232,24 @@ class AppLocker:
         
         return apps
     
+    def iter_installed_apps(self) -> Iterator[Dict]:
+        """Yield installed applications one at a time, without a count limit"""
+        system = platform.system()
+        
+        if system == 'Windows':
+            return self._iter_windows_apps()
+        elif system == 'Darwin':  # macOS
+            return self._iter_macos_apps()
+        elif system == 'Linux':
+            return self._iter_linux_apps()
+        return iter(())
+    
     def _get_windows_apps(self) -> List[Dict]:
         """Get Windows applications"""
-        apps = []
+        return list(islice(self._iter_windows_apps(), 50))  # Limit to 50 apps for performance
+    
+    def _iter_windows_apps(self) -> Iterator[Dict]:
+        """Yield Windows applications"""
         # Common Windows app locations
         program_files = [
             Path('C:/Program Files'),
@@ -137,34 +264,36 @@ class AppLocker:
                         # Look for .exe files
                         for exe in item.rglob('*.exe'):
                             if exe.is_file():
-                                apps.append({
+                                yield {
                                     'name': exe.stem,
                                     'path': str(exe),
                                     'type': 'application'
-                                })
+                                }
                                 break  # Only get first exe in each folder
-        
-        return apps[:50]  # Limit to 50 apps for performance
     
     def _get_macos_apps(self) -> List[Dict]:
         """Get macOS applications"""
-        apps = []
+        return list(self._iter_macos_apps())
+    
+    def _iter_macos_apps(self) -> Iterator[Dict]:
+        """Yield macOS applications"""
         app_folders = [Path('/Applications'), Path.home() / 'Applications']
         
         for folder in app_folders:
             if folder.exists():
                 for app in folder.glob('*.app'):
-                    apps.append({
+                    yield {
                         'name': app.stem,
                         'path': str(app),
                         'type': 'application'
-                    })
-        
-        return apps
+                    }
     
     def _get_linux_apps(self) -> List[Dict]:
         """Get Linux applications"""
-        apps = []
+        return list(self._iter_linux_apps())
+    
+    def _iter_linux_apps(self) -> Iterator[Dict]:
+        """Yield Linux applications"""
         desktop_files = [
             Path('/usr/share/applications'),
             Path.home() / '.local/share/applications'
@@ -176,42 +305,62 @@ class AppLocker:
                     try:
                         with open(desktop_file, 'r') as f:
                             content = f.read()
-                            if 'Name=' in content:
-                                name = [line.split('=')[1] for line in content.split('\n') if line.startswith('Name=')][0]
-                                apps.append({
-                                    'name': name.strip(),
-                                    'path': str(desktop_file),
-                                    'type': 'application'
-                                })
                     except:
-                        pass
-        
-        return apps
+                        continue
+                    name = next((line.split('=', 1)[1] for line in content.split('\n')
+                                 if line.startswith('Name=')), None)
+                    if name is not None:
+                        yield {
+                            'name': name.strip(),
+                            'path': str(desktop_file),
+                            'type': 'application'
+                        }
     
+    @synchronized_update
     def lock_app(self, app_path: str, app_name: str) -> bool:
-        """Add application to locked list"""
-        app_data = {'path': app_path, 'name': app_name}
-        if app_data not in self.locked_apps:
-            self.locked_apps.append(app_data)
+        """
+        Add application to locked list.
+        app_path may also be a directory ending in '/' (locks everything
+        below it) or a glob such as '/opt/*/bin/*'.
+        """
+        if app_path not in self.locked_apps:
+            self.locked_apps[app_path] = LockedApp(app_path, app_name)
             self._save_locked_apps()
             return True
         return False
     
+    @synchronized_update
     def unlock_app(self, app_path: str) -> bool:
         """Remove application from locked list"""
-        for app in self.locked_apps:
-            if app['path'] == app_path:
-                self.locked_apps.remove(app)
-                self._save_locked_apps()
-                return True
+        if self.locked_apps.pop(app_path, None) is not None:
+            self._save_locked_apps()
+            return True
         return False
     
+    def _get_path_rules(self) -> PathRuleSet:
+        """Compiled lock rules, rebuilt only after locked_apps changes"""
+        if self._path_rules is None or self._path_rules_version != self.locked_apps_version:
+            version = self.locked_apps_version
+            # Copy first: the enforcer thread matches while the GUI thread edits the list
+            self._path_rules = PathRuleSet.from_apps(list(self.locked_apps.values()))
+            self._path_rules_version = version
+        return self._path_rules
+    
+    def match_locked_app(self, app_path: str) -> Optional[LockedApp]:
+        """Get the most specific locked entry covering a path (exact, directory or glob)"""
+        return self._get_path_rules().match(app_path)
+    
     def is_app_locked(self, app_path: str) -> bool:
         """Check if application is locked"""
-        return any(app['path'] == app_path for app in self.locked_apps)
+        return self.match_locked_app(app_path) is not None
     
     def verify_access(self, card_id: str, pin: str = None) -> bool:
         """Verify if access should be granted"""
+        with VERIFY_LATENCY.time(operation='verify_access'):
+            return self._verify_access(card_id, pin)
+
+    def _verify_access(self, card_id: str, pin: str = None) -> bool:
+        """Access check behind verify_access (untimed)"""
         # Check card registration
         if not self.is_card_registered(card_id):
             return False
@@ -224,28 +373,28 @@ class AppLocker:
         
         return True
     
-    def get_locked_apps(self) -> List[Dict]:
-        """Get list of locked applications"""
-        return self.locked_apps.copy()
+    def get_locked_apps(self) -> Mapping[str, LockedApp]:
+        """Read-only view of locked applications, keyed by path"""
+        return MappingProxyType(self.locked_apps)
     
-    def get_registered_cards(self) -> Dict:
-        """Get all registered cards"""
-        return self.registered_cards.copy()
-
-        return self.registered_cards.copy()
+    def get_registered_cards(self) -> Mapping[str, RegisteredCard]:
+        """Read-only view of registered cards, keyed by card ID"""
+        return MappingProxyType(self.registered_cards)
     
     # Additional helper methods for UI compatibility
     
+    @synchronized_update
     def remove_card(self) -> bool:
         """Remove the first registered card (for UI compatibility)"""
         if self.registered_cards:
-            first_card_id = list(self.registered_cards.keys())[0]
+            first_card_id = next(iter(self.registered_cards))
             return self.unregister_card(first_card_id)
         return False
     
     def verify_card(self, card_id: str) -> bool:
         """Verify if card is registered"""
-        return self.is_card_registered(card_id)
+        with VERIFY_LATENCY.time(operation='verify_card'):
+            return self.is_card_registered(card_id)
     
     def has_pin(self) -> bool:
         """Check if PIN is enabled"""
@@ -266,6 +415,7 @@ class AppLocker:
             print(f"Error locking apps: {e}")
             return False
     
+    @synchronized_update
     def unlock_all_apps(self) -> bool:
         """Unlock all locked applications"""
         try:
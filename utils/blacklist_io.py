@@ -0,0 +1,335 @@
+import os
+import csv
+import sys
+import json
+import time
+import string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from utils.block_manager import hash_card
+
+# Record kinds yielded by iter_records()
+CARD, HASH, PATTERN = 'card', 'hash', 'pattern'
+
+CARD_COLUMNS = ('card_data', 'card', 'card_id')
+KNOWN_COLUMNS = frozenset(CARD_COLUMNS + ('hash', 'pattern', 'reason', 'timestamp'))
+HEX_DIGITS = frozenset(string.hexdigits.lower())
+
+DEFAULT_CHUNK_SIZE = 20_000
+
+Record = Tuple[str, str, Optional[str]]
+
+
+def detect_format(path, fmt=None) -> str:
+    """Pick 'csv' or 'ndjson' from an explicit format or the file extension."""
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        fmt = Path(path).suffix.lower().lstrip('.')
+    if fmt in ('ndjson', 'jsonl', 'json'):
+        return 'ndjson'
+    if fmt in ('csv', 'txt'):
+        return 'csv'
+    raise ValueError(f"Unknown blacklist format: {fmt or path}")
+
+
+def _record_from_mapping(row: Dict) -> Optional[Record]:
+    reason = row.get('reason') or None
+    if row.get('pattern'):
+        return PATTERN, str(row['pattern']), reason
+    if row.get('hash'):
+        return HASH, str(row['hash']), reason
+    for column in CARD_COLUMNS:
+        if row.get(column):
+            return CARD, str(row[column]), reason
+    return None
+
+
+def _iter_csv(f) -> Iterator[Record]:
+    reader = csv.reader(f)
+    columns = None
+    for row in reader:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if columns is None:
+            header = [cell.strip().lower() for cell in row]
+            if KNOWN_COLUMNS.intersection(header):
+                columns = [(kind, header.index(name))
+                           for kind, names in ((PATTERN, ('pattern',)), (HASH, ('hash',)),
+                                               (CARD, CARD_COLUMNS))
+                           for name in names if name in header]
+                reason_at = header.index('reason') if 'reason' in header else None
+                continue
+            # No header: card data in the first column, optional reason in the second
+            columns = [(CARD, 0)]
+            reason_at = 1
+        width = len(row)
+        reason = row[reason_at].strip() if reason_at is not None and reason_at < width else ''
+        for kind, at in columns:
+            if at < width:
+                value = row[at].strip()
+                if value:
+                    yield kind, value, reason or None
+                    break
+
+
+def _iter_ndjson(f) -> Iterator[Record]:
+    for number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            print(f"Skipping invalid blacklist line {number}: {e}")
+            continue
+        if isinstance(item, str):
+            record = CARD, item, None
+        elif isinstance(item, dict):
+            record = _record_from_mapping(item)
+        else:
+            record = None
+        if record is not None:
+            yield record
+
+
+def iter_records(path, fmt=None) -> Iterator[Record]:
+    """
+    Stream blacklist records from a CSV or NDJSON file.
+
+    CSV files may have a header naming any of card_data/card/card_id, hash,
+    pattern and reason; without one, the first column is card data and the
+    second an optional reason. NDJSON lines are objects with the same keys,
+    or bare strings of card data.
+
+    Yields:
+        tuple: (kind, value, reason) where kind is 'card', 'hash' or 'pattern'
+    """
+    parse = _iter_ndjson if detect_format(path, fmt) == 'ndjson' else _iter_csv
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        yield from parse(f)
+
+
+def _hash_chunk(records: List[Record]) -> Tuple[List[Tuple[str, Optional[str]]], int]:
+    """
+    Hash card records and validate pre-hashed ones (runs in a worker process).
+
+    Returns:
+        tuple: ([(card_hash, reason), ...], number of invalid hashes dropped)
+    """
+    hashed = []
+    invalid = 0
+    for kind, value, reason in records:
+        if kind == CARD:
+            hashed.append((hash_card(value), reason))
+        else:
+            value = value.lower()
+            if len(value) == 64 and HEX_DIGITS.issuperset(value):
+                hashed.append((value, reason))
+            else:
+                invalid += 1
+    return hashed, invalid
+
+
+class _InlineExecutor:
+    """Runs chunks in the calling process (workers <= 1, or no process pool)."""
+
+    def submit(self, fn, *args):
+        return _Done(fn(*args))
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class _Done:
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+def _make_executor(workers):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return _InlineExecutor(), 1
+    try:
+        return ProcessPoolExecutor(max_workers=workers), workers
+    except (OSError, NotImplementedError) as e:
+        print(f"Process pool unavailable, hashing in-process: {e}")
+        return _InlineExecutor(), 1
+
+
+def import_blacklist(block_manager, path, fmt=None, reason="Bulk import", workers=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE,
+                     progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Import a CSV/NDJSON feed into a BlockManager.
+
+    The file is streamed in chunks; card data is hashed on a process pool,
+    duplicates (within the feed and against the current blacklist) are
+    dropped, and everything is committed with a single blacklist write.
+
+    Args:
+        block_manager (BlockManager): Blacklist to add to
+        path (str): Feed file
+        fmt (str): 'csv' or 'ndjson' (default: from the file extension)
+        reason (str): Reason for records that do not carry one
+        workers (int): Hashing processes (default: CPU count; <= 1 hashes in-process)
+        chunk_size (int): Records per hashing task
+        progress (callable): Called with a stats dict after every chunk
+
+    Returns:
+        dict: records, added, duplicates, invalid, patterns_added, elapsed, rate
+    """
+    start = time.perf_counter()
+    stats = {'records': 0, 'unique': 0, 'duplicates': 0, 'invalid': 0,
+             'elapsed': 0.0, 'rate': 0.0}
+    entries = []
+    patterns = []
+    seen = set()
+    reasons = {}
+
+    def report():
+        stats['elapsed'] = time.perf_counter() - start
+        stats['rate'] = stats['records'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+        if progress is not None:
+            progress(dict(stats))
+
+    def collect(future):
+        hashed, invalid = future.result()
+        stats['invalid'] += invalid
+        for card_hash, card_reason in hashed:
+            if card_hash in seen or block_manager.is_hash_blacklisted(card_hash):
+                stats['duplicates'] += 1
+                continue
+            seen.add(card_hash)
+            card_reason = card_reason or reason
+            # Share one string per distinct reason across millions of entries
+            entries.append((card_hash, reasons.setdefault(card_reason, card_reason)))
+        stats['unique'] = len(entries)
+        report()
+
+    executor, workers = _make_executor(workers)
+    pending = deque()
+    try:
+        chunk = []
+        for record in iter_records(path, fmt):
+            stats['records'] += 1
+            if record[0] == PATTERN:
+                patterns.append(record[1])
+                continue
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                pending.append(executor.submit(_hash_chunk, chunk))
+                chunk = []
+                # Bound the work in flight so memory tracks chunk size, not file size
+                while len(pending) > workers * 2:
+                    collect(pending.popleft())
+        if chunk:
+            pending.append(executor.submit(_hash_chunk, chunk))
+        while pending:
+            collect(pending.popleft())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    added, patterns_added = block_manager.add_hashes_to_blacklist(entries, patterns)
+    stats['added'] = added
+    # Entries another process blacklisted while we were hashing
+    stats['duplicates'] += len(entries) - added
+    stats['patterns_added'] = patterns_added
+    del stats['unique']
+    report()
+    return stats
+
+
+def iter_blacklist(block_manager) -> Iterator[Dict]:
+    """Yield blocked cards then patterns as export rows."""
+    blacklist = block_manager.get_blacklist()
+    for item in list(blacklist['blocked_cards']):
+        yield {'hash': item.get('hash'), 'reason': item.get('reason'),
+               'timestamp': item.get('timestamp')}
+    for pattern in list(blacklist['blocked_patterns']):
+        yield {'pattern': pattern}
+
+
+def export_blacklist(block_manager, path, fmt=None, progress: Optional[Callable[[Dict], None]] = None,
+                     progress_every=100_000) -> int:
+    """
+    Stream the blacklist to a CSV or NDJSON file that import_blacklist() reads back.
+
+    Args:
+        block_manager (BlockManager): Blacklist to export
+        path (str): Output file
+        fmt (str): 'csv' or 'ndjson' (default: from the file extension)
+        progress (callable): Called with a stats dict every progress_every rows
+
+    Returns:
+        int: Number of rows written
+    """
+    fmt = detect_format(path, fmt)
+    start = time.perf_counter()
+    count = 0
+
+    def report():
+        elapsed = time.perf_counter() - start
+        if progress is not None:
+            progress({'records': count, 'elapsed': elapsed,
+                      'rate': count / elapsed if elapsed > 0 else 0.0})
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=['hash', 'pattern', 'reason', 'timestamp'])
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(row):
+                f.write(json.dumps(row) + '\n')
+        for row in iter_blacklist(block_manager):
+            write(row)
+            count += 1
+            if count % progress_every == 0:
+                report()
+    report()
+    return count
+
+
+def _print_progress(stats):
+    sys.stderr.write(f"\r{stats['records']:,} records  {stats['rate']:,.0f}/s  "
+                     f"{stats['elapsed']:.1f}s")
+    sys.stderr.flush()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import or export the CardGuard blacklist")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('path', help='CSV or NDJSON file')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='File format (default: from extension)')
+    parser.add_argument('--reason', default='Bulk import', help='Reason for records without one')
+    parser.add_argument('--workers', type=int, default=None, help='Hashing processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records per hashing task')
+    args = parser.parse_args(argv)
+
+    from utils.block_manager import BlockManager
+    block_manager = BlockManager()
+    if args.command == 'import':
+        stats = import_blacklist(block_manager, args.path, fmt=args.format, reason=args.reason,
+                                 workers=args.workers, chunk_size=args.chunk_size,
+                                 progress=_print_progress)
+        sys.stderr.write('\n')
+        print(f"Imported {stats['added']:,} cards and {stats['patterns_added']:,} patterns "
+              f"from {stats['records']:,} records ({stats['duplicates']:,} duplicates, "
+              f"{stats['invalid']:,} invalid) in {stats['elapsed']:.1f}s")
+    else:
+        count = export_blacklist(block_manager, args.path, fmt=args.format, progress=_print_progress)
+        sys.stderr.write('\n')
+        print(f"Exported {count:,} rows to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,119 @@
 import json
 import hashlib
+import threading
 from datetime import datetime
 from pathlib import Path
+from utils.metrics import BLACKLIST_SIZE, STORAGE_FLUSH
+from utils.velocity import VelocityTracker
+from utils.snapshot import get_snapshot
+from utils.state_sync import atomic_write, atomic_write_json, get_state_directory, synchronized_update
+
+
+def hash_card(card_data):
+    """Blacklist key for card data (hex SHA-256)."""
+    return hashlib.sha256(card_data.encode()).hexdigest()
+
 
 class BlockManager:
     """
     Manages blocking functionality for suspicious card activity.
     Maintains a blacklist and suspicious pattern detection.
     """
+
+    # Larger blacklists are written compactly, in chunks, by the C JSON encoder
+    PRETTY_PRINT_LIMIT = 10_000
+    WRITE_CHUNK = 10_000
     
-    def __init__(self, blacklist_file="blacklist.json"):
+    def __init__(self, blacklist_file="blacklist.json", velocity=True, trusted=None):
+        """
+        Args:
+            blacklist_file (str): File name in ~/.cardguard
+            velocity (VelocityTracker): Velocity limits checked by is_suspicious();
+                True uses the default limits, None or False disables velocity checks
+            trusted (callable): card_data -> bool; trusted cards (e.g. the owner's
+                registered card) are exempt from velocity checks, so frequent
+                taps never flag or blacklist them
+        """
         self.data_dir = Path.home() / ".cardguard"
         self.data_dir.mkdir(exist_ok=True)
         self.blacklist_file = self.data_dir / blacklist_file
+        self.state = get_state_directory(self.data_dir)
+        # Held by refresh() and synchronized_update so reloads and updates don't interleave
+        self._update_lock = threading.RLock()
+        self.snapshot = get_snapshot(self.data_dir)
+        name = self.blacklist_file.name
+        self._generations = {name: self.state.generations().get(name, 0)}
         self.blacklist = self._load_blacklist()
+        self._index_blacklist()
         self.suspicious_patterns = self._load_suspicious_patterns()
+        if velocity is True:
+            velocity = VelocityTracker()
+        self.velocity = velocity if velocity is not False else None
+        self.trusted = trusted
+        BLACKLIST_SIZE.set_function(lambda: len(self.blacklist['blocked_cards']), kind='cards')
+        BLACKLIST_SIZE.set_function(lambda: len(self.blacklist['blocked_patterns']), kind='patterns')
         
-    def _load_blacklist(self):
-        """Load blacklist from file."""
+    def _load_blacklist(self, seed_snapshot=True):
+        """Load blacklist from file (seeding the snapshot unless another process wrote it)."""
         if self.blacklist_file.exists():
+            blacklist = self.snapshot.load(self.blacklist_file)
+            if blacklist is not None:
+                return blacklist
             try:
                 with open(self.blacklist_file, 'r') as f:
-                    return json.load(f)
+                    blacklist = json.load(f)
+                if seed_snapshot:
+                    self.snapshot.update(self.blacklist_file, blacklist)
+                return blacklist
             except Exception as e:
                 print(f"Error loading blacklist: {e}")
                 return {'blocked_cards': [], 'blocked_patterns': []}
         else:
             return {'blocked_cards': [], 'blocked_patterns': []}
+
+    def _index_blacklist(self):
+        """Rebuild the set of blocked hashes used for lookups."""
+        self._blocked_hashes = {item.get('hash') for item in self.blacklist['blocked_cards']}
+            
+    def refresh(self):
+        """Reload the blacklist if another process changed it. Returns True if reloaded."""
+        with self._update_lock:
+            changed = self.state.changed(self._generations)
+            if changed:
+                self._generations.update(changed)
+                self.blacklist = self._load_blacklist(seed_snapshot=False)
+                self._index_blacklist()
+            return bool(changed)
             
     def _save_blacklist(self):
         """Save blacklist to file."""
         try:
-            with open(self.blacklist_file, 'w') as f:
-                json.dump(self.blacklist, f, indent=4)
+            with STORAGE_FLUSH.time(file=self.blacklist_file.name):
+                with self.state.write_lock():
+                    if len(self.blacklist['blocked_cards']) > self.PRETTY_PRINT_LIMIT:
+                        atomic_write(self.blacklist_file, self._write_compact)
+                    else:
+                        atomic_write_json(self.blacklist_file, self.blacklist, indent=4)
+                    name = self.blacklist_file.name
+                    self._generations[name] = self.state.bump(name)
+                    self.snapshot.update(self.blacklist_file, self.blacklist)
         except Exception as e:
             print(f"Error saving blacklist: {e}")
             
+    def _write_compact(self, f):
+        """Stream the blacklist as compact JSON, one slice of blocked cards at a time."""
+        cards = self.blacklist['blocked_cards']
+        f.write('{"blocked_cards": [')
+        for start in range(0, len(cards), self.WRITE_CHUNK):
+            if start:
+                f.write(', ')
+            f.write(json.dumps(cards[start:start + self.WRITE_CHUNK])[1:-1])
+        f.write(']')
+        for key, value in self.blacklist.items():
+            if key != 'blocked_cards':
+                f.write(f", {json.dumps(key)}: {json.dumps(value)}")
+        f.write('}')
+            
     def _load_suspicious_patterns(self):
         """Load predefined suspicious patterns."""
         return [
@@ -47,12 +125,16 @@ class BlockManager:
             'FFFFFFFF'
         ]
         
-    def is_suspicious(self, card_data):
+    def is_suspicious(self, card_data, reader_id=None):
         """
         Check if card data appears suspicious.
+        Cards that exceed a velocity limit are flagged, and blacklisted
+        when the limit is one of the tracker's blacklist_reasons. Trusted
+        cards skip the velocity checks.
         
         Args:
             card_data (str): Card data to check
+            reader_id (str): Reader the card was tapped on, if known
             
         Returns:
             bool: True if suspicious, False otherwise
@@ -63,8 +145,8 @@ class BlockManager:
         card_data_upper = str(card_data).upper()
         
         # Check against blacklist
-        card_hash = hashlib.sha256(card_data.encode()).hexdigest()
-        if card_hash in self.blacklist['blocked_cards']:
+        card_hash = hash_card(card_data)
+        if card_hash in self._blocked_hashes:
             return True
             
         # Check for suspicious patterns
@@ -75,9 +157,17 @@ class BlockManager:
         for pattern in self.blacklist['blocked_patterns']:
             if pattern.upper() in card_data_upper:
                 return True
+
+        if self.velocity is not None and not (self.trusted is not None and self.trusted(card_data)):
+            reason = self.velocity.check(card_hash, reader_id)
+            if reason is not None:
+                if reason in self.velocity.blacklist_reasons:
+                    self.add_to_blacklist(card_data, reason=f"Velocity: {reason}")
+                return True
                 
         return False
         
+    @synchronized_update
     def add_to_blacklist(self, card_data, reason="Manual block"):
         """
         Add card to blacklist.
@@ -86,18 +176,58 @@ class BlockManager:
             card_data (str): Card data to block
             reason (str): Reason for blocking
         """
-        card_hash = hashlib.sha256(card_data.encode()).hexdigest()
+        card_hash = hash_card(card_data)
         
-        if card_hash not in self.blacklist['blocked_cards']:
+        if card_hash not in self._blocked_hashes:
             self.blacklist['blocked_cards'].append({
                 'hash': card_hash,
                 'reason': reason,
                 'timestamp': datetime.now().isoformat()
             })
+            self._blocked_hashes.add(card_hash)
             self._save_blacklist()
             return True
         return False
+
+    @synchronized_update
+    def add_hashes_to_blacklist(self, entries, patterns=()):
+        """
+        Add many pre-hashed cards (and patterns) with a single write.
+
+        Args:
+            entries (iterable): (card_hash, reason) pairs, e.g. from hash_card()
+            patterns (iterable): Patterns to add to blocked_patterns
+
+        Returns:
+            tuple: (cards added, patterns added); duplicates are skipped
+        """
+        timestamp = datetime.now().isoformat()
+        blocked_cards = self.blacklist['blocked_cards']
+        added_cards = 0
+        for card_hash, reason in entries:
+            if card_hash not in self._blocked_hashes:
+                self._blocked_hashes.add(card_hash)
+                blocked_cards.append({'hash': card_hash, 'reason': reason, 'timestamp': timestamp})
+                added_cards += 1
+
+        blocked_patterns = self.blacklist['blocked_patterns']
+        known_patterns = set(blocked_patterns)
+        added_patterns = 0
+        for pattern in patterns:
+            if pattern not in known_patterns:
+                known_patterns.add(pattern)
+                blocked_patterns.append(pattern)
+                added_patterns += 1
+
+        if added_cards or added_patterns:
+            self._save_blacklist()
+        return added_cards, added_patterns
+
+    def is_hash_blacklisted(self, card_hash):
+        """Check a hash from hash_card() against the blocked cards."""
+        return card_hash in self._blocked_hashes
         
+    @synchronized_update
     def remove_from_blacklist(self, card_data):
         """
         Remove card from blacklist.
@@ -105,13 +235,17 @@ class BlockManager:
         Args:
             card_data (str): Card data to unblock
         """
-        card_hash = hashlib.sha256(card_data.encode()).hexdigest()
+        card_hash = hash_card(card_data)
+        self._blocked_hashes.discard(card_hash)
+        if self.velocity is not None:
+            self.velocity.forget(card_hash)
         self.blacklist['blocked_cards'] = [
             item for item in self.blacklist['blocked_cards'] 
             if item.get('hash') != card_hash
         ]
         self._save_blacklist()
         
+    @synchronized_update
     def add_suspicious_pattern(self, pattern):
         """Add a new suspicious pattern to watch for."""
         if pattern not in self.blacklist['blocked_patterns']:
@@ -122,7 +256,9 @@ class BlockManager:
         """Get current blacklist."""
         return self.blacklist
         
+    @synchronized_update
     def clear_blacklist(self):
         """Clear all blocked cards and patterns."""
         self.blacklist = {'blocked_cards': [], 'blocked_patterns': []}
+        self._blocked_hashes = set()
         self._save_blacklist()
@@ -0,0 +1,345 @@
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_value(value):
+    """Format a sample value the way the Prometheus text format expects."""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=None):
+    """Render a label set as {a="x",b="y"} (empty string if no labels)."""
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.extend(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class _Metric:
+    """Base class for a metric family with optional labels."""
+
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        """Yield (suffix, label_values, extra_labels, value) tuples."""
+        raise NotImplementedError
+
+    def render(self):
+        """Render this metric family in Prometheus exposition format."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type_name}',
+        ]
+        for suffix, values, extra, value in self._samples():
+            labels = _format_labels(self.labelnames, values, extra)
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Increment the counter by a non-negative amount."""
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def get(self, **labels):
+        """Get current counter value."""
+        return self._children.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._children.items())
+        for values, value in items:
+            yield '_total' if not self.name.endswith('_total') else '', values, None, value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed on scrape."""
+
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        """Set gauge to a value."""
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = value
+
+    def inc(self, amount=1, **labels):
+        """Increase gauge by amount."""
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        """Decrease gauge by amount."""
+        self.inc(-amount, **labels)
+
+    def set_function(self, func, **labels):
+        """Compute the gauge value by calling func() at scrape time."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = func
+
+    def get(self, **labels):
+        """Get current gauge value."""
+        key = self._key(labels)
+        func = self._functions.get(key)
+        if func is not None:
+            return func()
+        return self._children.get(key, 0)
+
+    def _samples(self):
+        with self._lock:
+            items = dict(self._children)
+            functions = dict(self._functions)
+        for key, func in functions.items():
+            try:
+                items[key] = func()
+            except Exception as e:
+                print(f"Error collecting gauge {self.name}: {e}")
+        for values, value in sorted(items.items()):
+            yield '', values, None, value
+
+
+class Histogram(_Metric):
+    """Cumulative histogram of observed values (e.g. latencies in seconds)."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """Record a single observation."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._children.get(key)
+            if state is None:
+                # Per-bucket counts, then sum and count
+                state = self._children[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager that observes the elapsed wall time of its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels):
+        """Get number of observations."""
+        state = self._children.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._children.items())
+        for values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield '_bucket', values, [('le', _format_value(bound))], cumulative
+            yield '_bucket', values, [('le', '+Inf')], count
+            yield '_sum', values, None, total
+            yield '_count', values, None, count
+
+
+class MetricsRegistry:
+    """
+    Collection of metric families.
+    Metrics are created once by name and shared by every caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Get or create a gauge."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        """Get a registered metric by name, or None."""
+        return self._metrics.get(name)
+
+    def render(self):
+        """Render every registered metric in Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# Process-wide registry used by CardGuard components
+REGISTRY = MetricsRegistry()
+
+CARD_SCANS = REGISTRY.counter(
+    'cardguard_card_scans_total', 'Card scan attempts by source and result.',
+    ('source', 'result'))
+VERIFY_LATENCY = REGISTRY.histogram(
+    'cardguard_verify_seconds', 'Latency of card and PIN verification.',
+    ('operation',))
+BLACKLIST_SIZE = REGISTRY.gauge(
+    'cardguard_blacklist_entries', 'Number of blacklist entries by kind.',
+    ('kind',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'cardguard_cache_requests_total', 'Cache lookups by cache name and result (hit/miss).',
+    ('cache', 'result'))
+NOTIFICATIONS = REGISTRY.counter(
+    'cardguard_notifications_total', 'Notifications sent by urgency.',
+    ('urgency',))
+NOTIFICATION_SEND = REGISTRY.histogram(
+    'cardguard_notification_send_seconds', 'Time taken to hand a notification to the platform.',
+    ('urgency',))
+STORAGE_FLUSH = REGISTRY.histogram(
+    'cardguard_storage_flush_seconds', 'Time taken to write a state file to disk.',
+    ('file',))
+VELOCITY_FLAGS = REGISTRY.counter(
+    'cardguard_velocity_flags_total', 'Taps flagged by velocity checks, by reason.',
+    ('reason',))
+SCAN_QUEUE_DEPTH = REGISTRY.gauge(
+    'cardguard_scan_queue_depth', 'Taps waiting in each scan pipeline stage.',
+    ('stage',))
+SCAN_DECISIONS = REGISTRY.counter(
+    'cardguard_scan_decisions_total', 'Taps completed by the scan pipeline, by decision.',
+    ('decision',))
+
+
+def _make_handler(registry):
+    """Build a request handler serving registry on /metrics."""
+    # http.server pulls in email/ssl; only pay for it when serving metrics
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes happen every few seconds; keep them out of the console
+            pass
+
+    return MetricsHandler
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint exporting metrics in Prometheus text format.
+    Runs on a daemon worker thread so it never blocks the caller.
+    """
+
+    def __init__(self, port=9464, host='127.0.0.1', registry=None):
+        self.host = host
+        self.requested_port = port
+        self.registry = registry or REGISTRY
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        """Port actually bound (useful when started with port 0)."""
+        if self._server is None:
+            return None
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        """Full URL of the metrics endpoint."""
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self):
+        """Start serving. Returns self for chaining."""
+        if self._server is not None:
+            return self
+        from http.server import ThreadingHTTPServer
+        handler = _make_handler(self.registry)
+        self._server = ThreadingHTTPServer((self.host, self.requested_port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='cardguard-metrics', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+        self._server = None
+        self._thread = None
+
+
+def start_metrics_server(port=9464, host='127.0.0.1', registry=None):
+    """Start a metrics endpoint on a worker thread and return the server."""
+    return MetricsServer(port, host, registry).start()
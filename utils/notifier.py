@@ -1,6 +1,8 @@
 import platform
 import subprocess
+import time
 from datetime import datetime
+from utils.metrics import NOTIFICATIONS, NOTIFICATION_SEND
 
 class Notifier:
     """
@@ -31,6 +33,7 @@ class Notifier:
         self.notification_history.append(notification_data)
         
         # Send platform-specific notification
+        start = time.perf_counter()
         try:
             if self.platform == "Windows":
                 self._send_windows_notification(title, message)
@@ -43,6 +46,9 @@ class Notifier:
         except Exception as e:
             print(f"Failed to send notification: {e}")
             print(f"[NOTIFICATION] {title}: {message}")
+        finally:
+            NOTIFICATION_SEND.observe(time.perf_counter() - start, urgency=urgency)
+            NOTIFICATIONS.inc(urgency=urgency)
             
     def _send_windows_notification(self, title, message):
         """Send notification on Windows using PowerShell."""
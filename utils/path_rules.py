@@ -0,0 +1,166 @@
+import re
+import bisect
+import platform
+from typing import Iterable, List, Optional, Tuple
+
+GLOB_CHARS = frozenset('*?[')
+
+# Specificity of a rule kind when two rules end at the same depth
+PREFIX, GLOB, EXACT = 0, 1, 2
+
+
+def _translate_glob(pattern: str):
+    """
+    Compile a path glob to a regex.
+    '*' and '?' stay within one path component, '**' spans components.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                i += 2
+                if pattern.startswith('/', i):
+                    # '**/' also matches zero directories
+                    out.append('(?:.*/)?')
+                    i += 1
+                else:
+                    out.append('.*')
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 2 if pattern.startswith('[!', i) else i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile(''.join(out) + r'\Z')
+
+
+def _glob_specificity(pattern: str):
+    """
+    Sort key putting the most specific of several globs first: more literal
+    characters, then the longer pattern, then the pattern text, so the
+    winner does not depend on the order rules were added.
+    """
+    literals = len(re.sub(r'\[[^\]]*\]|[*?]', '', pattern))
+    return (-literals, -len(pattern), pattern)
+
+
+class _Node:
+    __slots__ = ('children', 'exact', 'prefix', 'globs')
+
+    def __init__(self):
+        self.children = {}
+        self.exact = None
+        self.prefix = None
+        self.globs = None
+
+
+class PathRuleSet:
+    """
+    Compiled locking rules: exact paths, directory prefixes and globs.
+
+    Rules live in a trie keyed by path component, so a lookup walks the
+    path once and only tests the globs anchored along that walk. Cost is
+    proportional to path depth, not to the number of rules.
+
+    Rule syntax:
+        /usr/bin/firefox          exact path
+        /opt/vendor/              everything below /opt/vendor (also /opt/vendor/**)
+        /opt/*/bin/*.sh           glob ('*' within a component, '**' across)
+    """
+
+    def __init__(self, case_insensitive: Optional[bool] = None):
+        if case_insensitive is None:
+            case_insensitive = platform.system() == 'Windows'
+        self.case_insensitive = case_insensitive
+        self._root = _Node()
+        self._count = 0
+
+    @classmethod
+    def from_apps(cls, apps: Iterable, case_insensitive: Optional[bool] = None):
+        """Build rules from LockedApp records (rule in .path, result is the record)."""
+        rules = cls(case_insensitive)
+        for app in apps:
+            rules.add(app.path, app)
+        return rules
+
+    def __len__(self):
+        return self._count
+
+    def _split(self, path: str) -> List[str]:
+        path = path.replace('\\', '/')
+        if self.case_insensitive:
+            path = path.casefold()
+        return [part for part in path.split('/') if part and part != '.']
+
+    def add(self, rule: str, value) -> None:
+        """Add a rule; value is returned by match() when it is the best rule."""
+        normalized = rule.replace('\\', '/')
+        is_dir = normalized.endswith('/')
+        parts = self._split(rule)
+        if parts and parts[-1] == '**' and not any(GLOB_CHARS & set(p) for p in parts[:-1]):
+            parts.pop()
+            is_dir = True
+
+        node = self._root
+        for depth, part in enumerate(parts):
+            if GLOB_CHARS & set(part):
+                remainder = '/'.join(parts[depth:])
+                if node.globs is None:
+                    node.globs = []
+                # Kept most specific first, so match() can stop at the first hit
+                bisect.insort(node.globs, (_glob_specificity(remainder), self._count,
+                                           _translate_glob(remainder), value))
+                self._count += 1
+                return
+            node = node.children.setdefault(part, _Node())
+
+        if is_dir:
+            node.prefix = value
+        else:
+            node.exact = value
+        self._count += 1
+
+    def match(self, path: str):
+        """
+        Find the most specific rule matching path.
+
+        Returns:
+            The value of the deepest matching rule (exact beats glob beats
+            prefix at equal depth; among globs anchored at the same depth,
+            the one with the most literal characters), or None
+        """
+        parts = self._split(path)
+        best: Tuple[int, int] = (-1, -1)
+        result = None
+        node = self._root
+        depth = 0
+        while True:
+            if node.prefix is not None and depth < len(parts) and (depth, PREFIX) > best:
+                best, result = (depth, PREFIX), node.prefix
+            if node.globs is not None and depth < len(parts) and (depth, GLOB) > best:
+                remainder = '/'.join(parts[depth:])
+                for _, _, pattern, value in node.globs:
+                    if pattern.match(remainder):
+                        best, result = (depth, GLOB), value
+                        break
+            if depth == len(parts):
+                if node.exact is not None:
+                    return node.exact
+                return result
+            node = node.children.get(parts[depth])
+            if node is None:
+                return result
+            depth += 1
@@ -0,0 +1,148 @@
+import os
+import hmac
+import time
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+ALGORITHM = 'pbkdf2_sha256'
+SALT_BYTES = 16
+
+
+def completed_future(result) -> Future:
+    """A Future that already holds result (for answers that need no KDF)."""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class PinVerifier:
+    """
+    Salted PBKDF2-SHA256 PIN hashing on a worker thread pool.
+
+    hashlib.pbkdf2_hmac releases the GIL, so the KDF runs beside the GUI
+    thread instead of stalling it. The iteration count is calibrated once
+    so a hash takes about budget_ms on this machine (never fewer than
+    min_iterations). Hashes are stored as
+    'pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>'; bare SHA-256
+    hex digests from older versions are still accepted and reported for
+    upgrade.
+    """
+
+    def __init__(self, budget_ms: float = 100.0, min_iterations: int = 100_000,
+                 max_iterations: int = 5_000_000, iterations: Optional[int] = None,
+                 max_workers: int = 2):
+        """
+        Args:
+            budget_ms (float): Target time for one hash
+            min_iterations (int): Floor for the calibrated iteration count
+            max_iterations (int): Ceiling for the calibrated iteration count
+            iterations (int): Fixed iteration count, skipping calibration
+            max_workers (int): Worker threads running the KDF
+        """
+        self.budget_ms = budget_ms
+        self.min_iterations = min_iterations
+        self.max_iterations = max_iterations
+        self._iterations = iterations
+        self._calibrate_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='cardguard-pin')
+
+    @property
+    def iterations(self) -> int:
+        """Iteration count for new hashes (calibrated on first use)."""
+        if self._iterations is None:
+            with self._calibrate_lock:
+                if self._iterations is None:
+                    self._iterations = self.calibrate()
+        return self._iterations
+
+    def calibrate(self, sample_iterations: int = 20_000) -> int:
+        """Measure this machine and return the iteration count that fits the budget."""
+        salt = os.urandom(SALT_BYTES)
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            hashlib.pbkdf2_hmac('sha256', b'calibrate', salt, sample_iterations)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        per_iteration = best / sample_iterations
+        iterations = int(self.budget_ms / 1000 / per_iteration) if per_iteration > 0 else self.max_iterations
+        iterations = max(self.min_iterations, min(self.max_iterations, iterations))
+        return iterations // 1000 * 1000
+
+    # Synchronous API (runs the KDF on the calling thread)
+
+    def hash_pin(self, pin: str) -> str:
+        """Hash a PIN with a fresh salt."""
+        iterations = self.iterations
+        salt = os.urandom(SALT_BYTES)
+        digest = hashlib.pbkdf2_hmac('sha256', pin.encode(), salt, iterations)
+        return f"{ALGORITHM}${iterations}${salt.hex()}${digest.hex()}"
+
+    def verify(self, pin: str, encoded: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """
+        Check a PIN against a stored hash in constant time.
+
+        Returns:
+            tuple: (matches, replacement hash or None). A replacement is given
+                when the PIN matched a legacy or much weaker hash.
+        """
+        if not encoded:
+            return False, None
+        if '$' not in encoded:
+            # Legacy unsalted SHA-256
+            candidate = hashlib.sha256(pin.encode()).hexdigest()
+            if hmac.compare_digest(candidate, encoded):
+                return True, self.hash_pin(pin)
+            return False, None
+
+        try:
+            algorithm, iterations, salt, expected = encoded.split('$')
+            iterations = int(iterations)
+            salt = bytes.fromhex(salt)
+            expected = bytes.fromhex(expected)
+        except ValueError:
+            print("Unreadable PIN hash")
+            return False, None
+        if algorithm != ALGORITHM:
+            print(f"Unsupported PIN hash algorithm: {algorithm}")
+            return False, None
+
+        digest = hashlib.pbkdf2_hmac('sha256', pin.encode(), salt, iterations)
+        if not hmac.compare_digest(digest, expected):
+            return False, None
+        if iterations < self.iterations // 2:
+            return True, self.hash_pin(pin)
+        return True, None
+
+    # Future-based API
+
+    def submit(self, fn, *args) -> Future:
+        """Run fn(*args) on the KDF worker pool."""
+        return self._executor.submit(fn, *args)
+
+    def hash_pin_async(self, pin: str) -> Future:
+        """Future resolving to hash_pin(pin)."""
+        return self.submit(self.hash_pin, pin)
+
+    def verify_async(self, pin: str, encoded: Optional[str]) -> Future:
+        """Future resolving to verify(pin, encoded)."""
+        return self.submit(self.verify, pin, encoded)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_default_verifier = None
+_default_lock = threading.Lock()
+
+
+def get_pin_verifier() -> PinVerifier:
+    """Process-wide verifier, so calibration runs once."""
+    global _default_verifier
+    with _default_lock:
+        if _default_verifier is None:
+            _default_verifier = PinVerifier()
+        return _default_verifier
@@ -0,0 +1,129 @@
+import gc
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _parse_timestamp(value) -> Optional[float]:
+    """Epoch seconds from a stored timestamp (ISO string or number), None if unusable."""
+    if type(value) is str:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            # Older versions stored the home directory here
+            return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+@contextmanager
+def _bulk_allocation():
+    """Pause cyclic GC while building many records; they hold no reference cycles."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class RegisteredCard:
+    """A registered card. card_id is interned; registered_at is epoch seconds or None."""
+
+    __slots__ = ('card_id', 'name', 'registered_at')
+
+    def __init__(self, card_id: str, name: str, registered_at: Optional[float] = None):
+        self.card_id = sys.intern(card_id)
+        self.name = name
+        self.registered_at = registered_at
+
+    @classmethod
+    def from_json(cls, card_id: str, data: Dict) -> 'RegisteredCard':
+        """Build from a cards.json entry ({'name': ..., 'registered_at': ...})."""
+        return cls(card_id, data.get('name') or card_id, _parse_timestamp(data.get('registered_at')))
+
+    @classmethod
+    def load_all(cls, data: Dict[str, Dict]) -> Dict[str, 'RegisteredCard']:
+        """Build records for a whole cards.json mapping."""
+        intern = sys.intern
+        new = cls.__new__
+        cards = {}
+        with _bulk_allocation():
+            for card_id, info in data.items():
+                card = new(cls)
+                card.card_id = card_id = intern(card_id)
+                card.name = info.get('name') or card_id
+                card.registered_at = _parse_timestamp(info.get('registered_at'))
+                cards[card_id] = card
+        return cards
+
+    @staticmethod
+    def to_columns(cards: Dict[str, 'RegisteredCard']) -> Tuple[list, list, list]:
+        """Compact (card_ids, names, registered_at) form for the state snapshot."""
+        values = cards.values()
+        return ([card.card_id for card in values], [card.name for card in values],
+                [card.registered_at for card in values])
+
+    @classmethod
+    def from_columns(cls, columns: Tuple[list, list, list]) -> Dict[str, 'RegisteredCard']:
+        """Rebuild records from to_columns() output."""
+        card_ids, names, registered_ats = columns
+        new = cls.__new__
+        cards = {}
+        with _bulk_allocation():
+            for card_id, name, registered_at in zip(map(sys.intern, card_ids), names, registered_ats):
+                card = new(cls)
+                card.card_id = card_id
+                card.name = name
+                card.registered_at = registered_at
+                cards[card_id] = card
+        return cards
+
+    def to_json(self) -> Dict:
+        registered_at = None
+        if self.registered_at is not None:
+            registered_at = datetime.fromtimestamp(self.registered_at).isoformat(timespec='seconds')
+        return {'name': self.name, 'registered_at': registered_at}
+
+    def __repr__(self):
+        return f"RegisteredCard({self.card_id!r}, {self.name!r}, {self.registered_at!r})"
+
+
+class LockedApp:
+    """A locked application rule (exact path, directory prefix or glob)."""
+
+    __slots__ = ('path', 'name')
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'LockedApp':
+        """Build from a locked_apps.json entry ({'path': ..., 'name': ...})."""
+        return cls(data['path'], data.get('name') or data['path'])
+
+    @classmethod
+    def load_all(cls, data: Iterable[Dict]) -> Dict[str, 'LockedApp']:
+        """Build records for a whole locked_apps.json list, keyed by path."""
+        with _bulk_allocation():
+            return {app.path: app for app in map(cls.from_json, data)}
+
+    @staticmethod
+    def to_pairs(apps: Dict[str, 'LockedApp']) -> List[Tuple[str, str]]:
+        """Compact [(path, name)] form for the state snapshot."""
+        return [(app.path, app.name) for app in apps.values()]
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, str]]) -> Dict[str, 'LockedApp']:
+        with _bulk_allocation():
+            return {path: cls(path, name) for path, name in pairs}
+
+    def to_json(self) -> Dict:
+        return {'path': self.path, 'name': self.name}
+
+    def __repr__(self):
+        return f"LockedApp({self.path!r}, {self.name!r})"
@@ -0,0 +1,386 @@
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from utils.metrics import SCAN_DECISIONS, SCAN_QUEUE_DEPTH
+from utils.tracing import NULL_TRACE
+
+# Decisions reported on ScanContext.decision
+GRANTED = 'granted'
+DENIED = 'denied'
+BLOCKED = 'blocked'
+NO_CARD = 'no_card'
+ERROR = 'error'
+
+# Stages in processing order
+STAGES = ('read', 'normalize', 'check', 'verify', 'action', 'notify')
+
+# Worker threads per stage when not given; stages not listed get one
+DEFAULT_WORKERS = {'check': 2, 'verify': 2, 'notify': 2}
+
+# Most taps a worker takes from its queue at once
+BATCH_SIZE = 64
+
+_STOP = object()
+
+
+class ScanContext:
+    """One tap on its way through the pipeline."""
+
+    __slots__ = ('seq', 'reader_id', 'card_id', 'decision', 'error', 'event', 'trace', 'future')
+
+    def __init__(self, seq: int, reader_id: Optional[Hashable], card_id: Optional[str],
+                 event=None, trace=NULL_TRACE):
+        self.seq = seq
+        self.reader_id = reader_id
+        self.card_id = card_id
+        self.decision = None
+        self.error = None
+        # Caller's own object for the tap (e.g. a ScanEvent), passed through untouched
+        self.event = event
+        self.trace = trace
+        # Set for taps queued with submit(); submit_many() results go to on_result only
+        self.future = None
+
+    def __repr__(self):
+        return f"ScanContext({self.seq}, {self.reader_id!r}, {self.card_id!r}, {self.decision!r})"
+
+
+class _TapQueue:
+    """
+    Bounded FIFO of taps. put() blocks until there is room, and a worker
+    takes everything waiting (up to a batch) under one lock acquisition,
+    which keeps the hand-off cost per tap low during bursts.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items = deque()
+        lock = threading.Lock()
+        self._not_empty = threading.Condition(lock)
+        self._not_full = threading.Condition(lock)
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, taps: list, timeout: Optional[float] = None) -> int:
+        """Append taps in order, waiting for room; returns how many fit before timeout."""
+        items = self._items
+        queued = 0
+        with self._not_full:
+            while queued < len(taps):
+                if not self._not_full.wait_for(lambda: len(items) < self.capacity, timeout):
+                    break
+                room = self.capacity - len(items)
+                items.extend(taps[queued:queued + room])
+                queued += room
+                self._not_empty.notify()
+        return min(queued, len(taps))
+
+    def get_batch(self, limit: int) -> list:
+        """Remove and return up to limit taps, waiting for at least one."""
+        items = self._items
+        with self._not_empty:
+            while not items:
+                self._not_empty.wait()
+            if len(items) <= limit:
+                batch = list(items)
+                items.clear()
+            else:
+                batch = [items.popleft() for _ in range(limit)]
+            self._not_full.notify_all()
+        return batch
+
+
+class _Stage:
+    """Worker threads for one stage, each draining its own bounded queue."""
+
+    def __init__(self, name: str, handler: Callable, workers: int, capacity: int):
+        self.name = name
+        self.handler = handler
+        self.forward = None
+        self.queues = [_TapQueue(capacity) for _ in range(workers)]
+        self.threads = [threading.Thread(target=self._run, args=(q,), daemon=True,
+                                         name=f'cardguard-scan-{name}-{i}')
+                        for i, q in enumerate(self.queues)]
+
+    def put(self, taps: list, timeout: Optional[float] = None) -> list:
+        """
+        Queue taps on the workers that own their readers, blocking while a queue is full.
+
+        Returns:
+            list: Taps left out because timeout expired (always empty without a timeout)
+        """
+        queues = self.queues
+        if len(queues) == 1:
+            shards = {0: taps}
+        else:
+            shards = {}
+            for ctx in taps:
+                shards.setdefault(hash(ctx.reader_id) % len(queues), []).append(ctx)
+        rejected = []
+        for shard, shard_taps in shards.items():
+            queued = queues[shard].put(shard_taps, timeout)
+            rejected.extend(shard_taps[queued:])
+        return rejected
+
+    def stop(self):
+        for q in self.queues:
+            q.put([_STOP])
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self.queues)
+
+    def _run(self, q: _TapQueue):
+        handler = self.handler
+        forward = self.forward
+        name = self.name
+        while True:
+            batch = q.get_batch(BATCH_SIZE)
+            stopped = batch[-1] is _STOP
+            if stopped:
+                # Nothing is queued behind the stop marker
+                batch.pop()
+            for ctx in batch:
+                try:
+                    if ctx.trace.sampled:
+                        with ctx.trace.span(name):
+                            handler(ctx)
+                    else:
+                        handler(ctx)
+                except Exception as e:
+                    print(f"Error in scan pipeline stage {name}: {e}")
+                    ctx.error = e
+                    if ctx.decision is None:
+                        ctx.decision = ERROR
+            if batch:
+                forward(batch)
+            if stopped:
+                return
+
+
+class ScanPipeline:
+    """
+    Staged card-tap processing: read -> normalize -> check -> verify ->
+    action -> notify.
+
+    Stages are linked by bounded queues and run on their own worker
+    threads, so a slow stage (a notification, a blacklist write) does not
+    hold up taps already past it. When a queue fills up, the stage feeding
+    it blocks, and that backpressure reaches submit(), which then blocks
+    the reader. Each stage shards taps across its workers by reader_id:
+    a reader's taps always go to the same worker at every stage, so
+    decisions for one reader come out in the order the taps went in,
+    while different readers are processed side by side.
+
+    A tap that is decided early (no card, blocked) or whose stage raised
+    skips the check and verify stages but still goes through action and
+    notify. An exception leaves the decision as it was, or ERROR if none
+    had been made, and is kept on ScanContext.error.
+    """
+
+    def __init__(self, app_locker, block_manager=None, card_reader=None, notifier=None,
+                 log: Optional[Callable[[str], None]] = None,
+                 action: Optional[Callable[[ScanContext], None]] = None,
+                 on_result: Optional[Callable[[ScanContext], None]] = None,
+                 workers: Optional[Dict[str, int]] = None, capacity: int = 256):
+        """
+        Args:
+            app_locker (AppLocker): Decides whether a card is registered
+            block_manager (BlockManager): Blacklist, pattern and velocity checks;
+                None skips the check stage
+            card_reader (CardReader): Read from when a tap is submitted without a card ID
+            notifier (Notifier): Alerted when a card is blocked
+            log (callable): Receives activity log lines (e.g. ActivityLog.add)
+            action (callable): Called with each decided ScanContext in the action stage
+            on_result (callable): Called with each ScanContext once it is complete
+            workers (dict): Worker threads per stage name (see DEFAULT_WORKERS)
+            capacity (int): Queue size per stage worker
+        """
+        self.app_locker = app_locker
+        self.block_manager = block_manager
+        self.card_reader = card_reader
+        self.notifier = notifier
+        self.log = log
+        self.action = action
+        self.on_result = on_result
+
+        counts = dict(DEFAULT_WORKERS)
+        counts.update(workers or {})
+        unknown = set(counts) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown scan pipeline stages: {', '.join(sorted(unknown))}")
+
+        self._stages: List[_Stage] = [
+            _Stage(name, getattr(self, f'_{name}'), max(1, counts.get(name, 1)), capacity)
+            for name in STAGES]
+        for stage, next_stage in zip(self._stages, self._stages[1:]):
+            stage.forward = next_stage.put
+        self._stages[-1].forward = self._complete
+
+        self._seq = 0
+        self._pending = 0
+        # submit() calls still handing taps to the first stage; close() waits for them
+        self._producers = 0
+        self._idle = threading.Condition()
+        self._closed = False
+        for stage in self._stages:
+            SCAN_QUEUE_DEPTH.set_function(stage.depth, stage=stage.name)
+            for thread in stage.threads:
+                thread.start()
+
+    def submit(self, reader_id: Optional[Hashable] = None, card_id: Optional[str] = None,
+               event=None, trace=NULL_TRACE, timeout: Optional[float] = None) -> Future:
+        """
+        Queue a tap, blocking while the pipeline is full.
+
+        Args:
+            reader_id: Reader the tap came from
+            card_id (str): Card ID, or None to read one from card_reader
+            event: Caller's object for the tap, available as ScanContext.event
+            trace: Trace to record a span per stage in
+            timeout (float): Most seconds to wait for room; None waits indefinitely
+
+        Returns:
+            Future: Resolves to the completed ScanContext
+
+        Raises:
+            queue.Full: No room within timeout
+            RuntimeError: The pipeline was closed
+        """
+        future = Future()
+        self._queue([(reader_id, card_id, event)], trace, timeout, future)
+        return future
+
+    def submit_many(self, taps: Iterable[Tuple[Optional[Hashable], Optional[str], object]],
+                    trace=NULL_TRACE, timeout: Optional[float] = None) -> int:
+        """
+        Queue a burst of taps at once, e.g. everything a reader has buffered.
+
+        Handing taps over together lets each stage take them in one batch,
+        which is much cheaper per tap than submitting them one by one.
+        Results are delivered to on_result only.
+
+        Args:
+            taps (iterable): (reader_id, card_id, event) tuples, in arrival order
+            trace: Trace to record stage spans in
+            timeout (float): Most seconds to wait for room; None waits indefinitely
+
+        Returns:
+            int: Number of taps queued
+
+        Raises:
+            queue.Full: No room within timeout; taps already queued are still processed
+            RuntimeError: The pipeline was closed
+        """
+        return self._queue(taps, trace, timeout)
+
+    def _queue(self, taps, trace, timeout, future=None) -> int:
+        with self._idle:
+            if self._closed:
+                raise RuntimeError("Scan pipeline is closed")
+            seq = self._seq
+            batch = [ScanContext(seq + i, reader_id, card_id, event, trace)
+                     for i, (reader_id, card_id, event) in enumerate(taps, 1)]
+            self._seq = seq + len(batch)
+            self._pending += len(batch)
+            self._producers += 1
+        if future is not None:
+            batch[0].future = future
+        stage = self._stages[0]
+        try:
+            for start in range(0, len(batch), BATCH_SIZE):
+                rejected = stage.put(batch[start:start + BATCH_SIZE], timeout)
+                if rejected:
+                    self._done(len(rejected) + max(0, len(batch) - start - BATCH_SIZE))
+                    raise queue.Full
+        finally:
+            with self._idle:
+                self._producers -= 1
+                self._idle.notify_all()
+        return len(batch)
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Taps currently waiting in each stage's queues."""
+        return {stage.name: stage.depth() for stage in self._stages}
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted tap is complete; False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        """Finish the taps already submitted, then stop the workers."""
+        with self._idle:
+            if self._closed:
+                return
+            self._closed = True
+            # A submit() blocked on a full queue must finish queueing before the
+            # stop markers go in, or its taps would sit behind them forever
+            self._idle.wait_for(lambda: self._producers == 0)
+        # A stage is only stopped once everything before it has drained into it
+        for stage in self._stages:
+            stage.stop()
+            for thread in stage.threads:
+                thread.join()
+
+    def _done(self, count: int):
+        with self._idle:
+            self._pending -= count
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _complete(self, taps: list):
+        on_result = self.on_result
+        for ctx in taps:
+            if on_result is not None:
+                try:
+                    on_result(ctx)
+                except Exception as e:
+                    print(f"Error handling scan result: {e}")
+            if ctx.future is not None:
+                ctx.future.set_result(ctx)
+        for decision, count in Counter(ctx.decision for ctx in taps).items():
+            SCAN_DECISIONS.inc(count, decision=decision)
+        self._done(len(taps))
+
+    # Stages
+
+    def _read(self, ctx: ScanContext):
+        if ctx.card_id is None and self.card_reader is not None:
+            ctx.card_id = self.card_reader.read_card()
+
+    def _normalize(self, ctx: ScanContext):
+        card_id = ctx.card_id
+        if card_id is not None:
+            card_id = str(card_id).strip()
+        if not card_id:
+            ctx.card_id = None
+            ctx.decision = NO_CARD
+        else:
+            ctx.card_id = card_id
+
+    def _check(self, ctx: ScanContext):
+        if ctx.decision is None and self.block_manager is not None:
+            if self.block_manager.is_suspicious(ctx.card_id, ctx.reader_id):
+                ctx.decision = BLOCKED
+
+    def _verify(self, ctx: ScanContext):
+        if ctx.decision is None:
+            ctx.decision = GRANTED if self.app_locker.verify_card(ctx.card_id) else DENIED
+
+    def _action(self, ctx: ScanContext):
+        if self.action is not None:
+            self.action(ctx)
+
+    def _notify(self, ctx: ScanContext):
+        if ctx.decision == BLOCKED:
+            reader = f" on reader {ctx.reader_id}" if ctx.reader_id is not None else ""
+            if self.log is not None:
+                self.log(f"Blocked suspicious card{reader}")
+            if self.notifier is not None:
+                self.notifier.send_notification("Card Blocked",
+                                                f"A suspicious card was blocked{reader}", "critical")
+        if ctx.error is not None and self.log is not None:
+            self.log(f"Scan failed: {ctx.error}")
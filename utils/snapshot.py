@@ -0,0 +1,268 @@
+import os
+import mmap
+import zlib
+import atexit
+import struct
+import marshal
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from utils.metrics import STORAGE_FLUSH
+from utils.state_sync import atomic_write, get_state_directory
+
+SNAPSHOT_FILE = 'state.snapshot'
+MAGIC = b'CGSNAP\r\n'
+FORMAT_VERSION = 1
+
+# magic, format version, marshal version, index length, index CRC-32
+_HEADER = struct.Struct('<8sHHII')
+
+
+def file_signature(path) -> Optional[Tuple[int, int, int]]:
+    """(mtime_ns, size, inode) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class StateSnapshot:
+    """
+    Binary copy of the JSON state files in one directory, for fast startup.
+
+    The snapshot holds one marshal-encoded section per state file, each
+    tagged with the signature (mtime, size, inode) of the JSON file it
+    mirrors and a CRC-32. A section is only used while its JSON file still
+    has that signature, so a snapshot that is stale, corrupt or from another
+    format version falls back to JSON per file. The JSON files remain the
+    source of truth.
+
+    Layout: header, marshal index {name: (signature, offset, length, crc)},
+    then the sections. The file is memory-mapped (read into memory on
+    Windows, where a mapped file cannot be replaced by other processes) and
+    sections are decoded on demand. Updates are coalesced and written
+    atomically in the background.
+    """
+
+    def __init__(self, directory, file_name=SNAPSHOT_FILE, write_delay: Optional[float] = 1.0):
+        """
+        Args:
+            directory (str): State directory holding the JSON files
+            file_name (str): Snapshot file name in that directory
+            write_delay (float): Seconds to coalesce updates before writing;
+                None writes synchronously in update()
+        """
+        self.directory = Path(directory)
+        self.path = self.directory / file_name
+        self.write_delay = write_delay
+        self.state = get_state_directory(self.directory)
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Tuple[tuple, bytes]] = {}
+        self._timer = None
+        self._map = None
+        self._map_signature = None
+        self._index: Dict[str, tuple] = {}
+        self._data_start = 0
+
+    # Reading
+
+    @staticmethod
+    def _release(mapped):
+        if isinstance(mapped, mmap.mmap):
+            mapped.close()
+
+    def _close_map(self):
+        if self._map is not None:
+            self._release(self._map)
+        self._map = None
+        self._index = {}
+
+    def _mapped(self) -> bool:
+        """Map the snapshot file if it changed since it was last mapped."""
+        signature = file_signature(self.path)
+        if signature == self._map_signature:
+            return self._map is not None
+        self._close_map()
+        self._map_signature = signature
+        if signature is None or signature[1] < _HEADER.size:
+            return False
+        mapped = None
+        try:
+            with open(self.path, 'rb') as f:
+                if os.name == 'nt':
+                    # Keep a private copy: other processes flush by replacing the file
+                    mapped = f.read()
+                else:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, marshal_version, index_length, index_crc = _HEADER.unpack_from(mapped)
+            index_end = _HEADER.size + index_length
+            if (magic != MAGIC or version != FORMAT_VERSION
+                    or marshal_version != marshal.version or index_end > len(mapped)):
+                self._release(mapped)
+                return False
+            index_data = mapped[_HEADER.size:index_end]
+            if zlib.crc32(index_data) != index_crc:
+                print("State snapshot index is corrupt; using JSON files")
+                self._release(mapped)
+                return False
+            self._index = marshal.loads(index_data)
+        except (OSError, ValueError, EOFError, TypeError, struct.error) as e:
+            print(f"Error reading state snapshot: {e}")
+            if mapped is not None:
+                self._release(mapped)
+            return False
+        self._map = mapped
+        self._data_start = index_end
+        return True
+
+    def load(self, source):
+        """
+        Get the snapshot copy of a state file.
+
+        Args:
+            source (str): Path of the JSON file the section mirrors
+
+        Returns:
+            The stored value, or None if there is no current, intact section
+        """
+        source = Path(source)
+        signature = file_signature(source)
+        if signature is None:
+            return None
+        with self._lock:
+            pending = self._pending.get(source.name)
+            if pending is not None and pending[0] == signature:
+                return marshal.loads(pending[1])
+            if not self._mapped():
+                return None
+            entry = self._index.get(source.name)
+            if entry is None or tuple(entry[0]) != signature:
+                return None
+            _, offset, length, crc = entry
+            start = self._data_start + offset
+            data = self._map[start:start + length]
+        if len(data) != length or zlib.crc32(data) != crc:
+            print(f"State snapshot section {source.name} is corrupt; using JSON")
+            return None
+        try:
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    # Writing
+
+    def update(self, source, value, version=marshal.version):
+        """
+        Record the current contents of a state file, just after this process
+        saved it (or first loaded it from JSON). Processes that only reload a
+        file another process wrote should not call this; the writer does.
+
+        Args:
+            source (str): Path of the JSON file value mirrors
+            value: Marshal-able data (dicts, lists, tuples, str, numbers, None)
+            version (int): marshal format; 2 skips shared-object references,
+                which decodes columns of unique values about twice as fast
+        """
+        source = Path(source)
+        signature = file_signature(source)
+        if signature is None:
+            return
+        try:
+            data = marshal.dumps(value, version)
+        except ValueError as e:
+            print(f"Cannot snapshot {source.name}: {e}")
+            return
+        with self._lock:
+            self._pending[source.name] = (signature, data)
+            if self.write_delay is not None and self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if self.write_delay is None:
+            self.flush()
+
+    def flush(self):
+        """Write pending sections now, keeping on-disk sections that are still current."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+        if not pending or not self.directory.is_dir():
+            # Nothing to write, or the state directory was deleted (e.g. a test's temp home)
+            return
+        try:
+            with STORAGE_FLUSH.time(file=self.path.name):
+                with self.state.write_lock(), self._lock:
+                    sections = self._collect_sections(pending)
+                    atomic_write(self.path, lambda f: self._write(f, sections), binary=True)
+        except Exception as e:
+            print(f"Error writing state snapshot: {e}")
+
+    def _collect_sections(self, pending):
+        sections = {}
+        if self._mapped():
+            for name, (signature, offset, length, crc) in self._index.items():
+                if name in pending or file_signature(self.directory / name) != tuple(signature):
+                    continue
+                start = self._data_start + offset
+                sections[name] = (tuple(signature), self._map[start:start + length], crc)
+        for name, (signature, data) in pending.items():
+            # Skip sections whose file another process rewrote since
+            if file_signature(self.directory / name) == signature:
+                sections[name] = (signature, data, zlib.crc32(data))
+        return sections
+
+    @staticmethod
+    def _write(f, sections):
+        index = {}
+        offset = 0
+        for name, (signature, data, crc) in sections.items():
+            index[name] = (signature, offset, len(data), crc)
+            offset += len(data)
+        index_data = marshal.dumps(index)
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version,
+                             len(index_data), zlib.crc32(index_data)))
+        f.write(index_data)
+        for signature, data, crc in sections.values():
+            f.write(data)
+
+    def close(self):
+        """Write pending sections and unmap the file."""
+        self.flush()
+        with self._lock:
+            self._close_map()
+            self._map_signature = None
+
+
+_snapshots: Dict[str, StateSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(directory) -> StateSnapshot:
+    """Shared snapshot for a state directory, so every component reuses one mapping."""
+    key = os.path.realpath(directory)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            snapshot = _snapshots[key] = StateSnapshot(directory)
+        return snapshot
+
+
+def close_snapshot(directory):
+    """Flush and release a directory's shared snapshot, e.g. before deleting the directory."""
+    key = os.path.realpath(directory)
+    with _snapshots_lock:
+        snapshot = _snapshots.pop(key, None)
+    if snapshot is not None:
+        snapshot.close()
+
+
+@atexit.register
+def flush_snapshots():
+    """Write any coalesced snapshot updates (also runs at interpreter exit)."""
+    with _snapshots_lock:
+        snapshots = list(_snapshots.values())
+    for snapshot in snapshots:
+        snapshot.flush()
@@ -0,0 +1,58 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """
+    Records named startup stages (imports, construction, first paint).
+    Times are measured with perf_counter relative to start (default: creation).
+    """
+
+    def __init__(self, budget_ms=300.0, stream=None, start=None):
+        # start lets the caller count time spent before the profiler existed
+        self.start = time.perf_counter() if start is None else start
+        self.budget_ms = budget_ms
+        self.stream = stream or sys.stderr
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as a named stage."""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, begin - self.start, time.perf_counter() - begin))
+
+    def mark(self, name):
+        """Record a point in time (zero-length stage)."""
+        self.stages.append((name, time.perf_counter() - self.start, 0.0))
+
+    def elapsed_ms(self):
+        """Milliseconds since the profiler was created."""
+        return (time.perf_counter() - self.start) * 1000
+
+    def report(self):
+        """Format the recorded stages as a table."""
+        lines = [f"{'stage':<36} {'at (ms)':>10} {'took (ms)':>10}"]
+        for name, offset, duration in self.stages:
+            lines.append(f"{name:<36} {offset * 1000:>10.1f} {duration * 1000:>10.1f}")
+        total = max((offset + duration for _, offset, duration in self.stages), default=0.0) * 1000
+        status = 'OK' if total <= self.budget_ms else 'OVER BUDGET'
+        lines.append(f"{'total':<36} {total:>10.1f} {'':>10}  [{status}, budget {self.budget_ms:.0f} ms]")
+        return '\n'.join(lines)
+
+    def print_report(self):
+        print(self.report(), file=self.stream)
+
+
+class NullProfiler:
+    """Profiler stand-in used when startup profiling is off."""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def mark(self, name):
+        pass
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import functools
+import threading
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+def atomic_write(path, write, binary=False):
+    """Call write(f) on a temp file and rename it over path, so readers never see a partial file."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb' if binary else 'w') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, data, indent=None):
+    """Atomically write data as JSON (see atomic_write)."""
+    atomic_write(path, lambda f: json.dump(data, f, indent=indent))
+
+
+class StateDirectory:
+    """
+    Coordinates processes sharing one CardGuard state directory.
+
+    Writers hold an advisory lock on <dir>/.lock while they reload, modify
+    and save a file, then bump that file's generation in <dir>/generations.json.
+    Readers compare generations to what they loaded; checking costs a single
+    stat() unless generations.json itself was replaced, and never waits for
+    the writer lock.
+    """
+
+    LOCK_FILE = '.lock'
+    GENERATIONS_FILE = 'generations.json'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.path / self.LOCK_FILE
+        self.generations_path = self.path / self.GENERATIONS_FILE
+        # Serializes writers in this process; held while waiting for the file lock
+        self._thread_lock = threading.RLock()
+        # Guards the generations cache only, so readers never wait behind a writer
+        self._generations_lock = threading.Lock()
+        self._depth = 0
+        self._lock_fd = None
+        self._signature = None
+        self._generations: Dict[str, int] = {}
+
+    # Locking
+
+    def _acquire_os_lock(self):
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.name == 'nt':
+            while True:
+                try:
+                    msvcrt.locking(self._lock_fd, msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:
+                    # LK_LOCK gives up after ~10 s; keep waiting like flock does
+                    time.sleep(0.05)
+        else:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+
+    def _release_os_lock(self):
+        try:
+            if os.name == 'nt':
+                os.lseek(self._lock_fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._lock_fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    @contextmanager
+    def write_lock(self):
+        """Hold the directory's writer lock (re-entrant within a process)."""
+        with self._thread_lock:
+            if self._depth == 0:
+                self._acquire_os_lock()
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._release_os_lock()
+
+    # Generations
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.generations_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def generations(self) -> Dict[str, int]:
+        """Current generation of every tracked file (re-read only if the file changed)."""
+        with self._generations_lock:
+            signature = self._stat_signature()
+            if signature != self._signature:
+                try:
+                    with open(self.generations_path, 'r') as f:
+                        self._generations = json.load(f)
+                except FileNotFoundError:
+                    self._generations = {}
+                except Exception as e:
+                    print(f"Error loading state generations: {e}")
+                    self._generations = {}
+                self._signature = signature
+            return self._generations
+
+    def changed(self, seen: Dict[str, int]) -> Dict[str, int]:
+        """
+        Compare generations a reader has loaded against the current ones.
+
+        Args:
+            seen (dict): File name -> generation the reader last loaded
+
+        Returns:
+            dict: File name -> current generation, for files that changed
+        """
+        current = self.generations()
+        return {name: current.get(name, 0) for name, generation in seen.items()
+                if current.get(name, 0) != generation}
+
+    def bump(self, name: str) -> int:
+        """Record that a file was rewritten. Call while holding write_lock()."""
+        with self.write_lock():
+            generations = dict(self.generations())
+            generations[name] = generations.get(name, 0) + 1
+            atomic_write_json(self.generations_path, generations)
+            with self._generations_lock:
+                self._generations = generations
+                self._signature = self._stat_signature()
+            return generations[name]
+
+
+_directories: Dict[str, StateDirectory] = {}
+_directories_lock = threading.Lock()
+
+
+def get_state_directory(path) -> StateDirectory:
+    """
+    Get the shared StateDirectory for a path.
+    Components in one process must share it: flock() locks taken through two
+    separate file descriptors would block each other.
+    """
+    key = os.path.realpath(path)
+    with _directories_lock:
+        state = _directories.get(key)
+        if state is None:
+            state = _directories[key] = StateDirectory(path)
+        return state
+
+
+def synchronized_update(method):
+    """
+    Run a mutating method under the state directory's writer lock, after
+    reloading anything other processes changed, so no update is lost.
+    The instance needs `state` (StateDirectory), `refresh()` and
+    `_update_lock` (a threading.RLock that refresh() also holds while it
+    swaps in reloaded state, so a refresh on another thread never replaces
+    data halfway through an update). The file lock is taken first, so
+    refresh() never waits for another process.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.state.write_lock(), self._update_lock:
+            self.refresh()
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+class Span:
+    """A single timed stage of a trace (monotonic nanoseconds)."""
+
+    __slots__ = ('name', 'start_ns', 'end_ns', 'attributes', 'parent')
+
+    def __init__(self, name, start_ns, attributes=None, parent=None):
+        self.name = name
+        self.start_ns = start_ns
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.parent = parent
+
+    @property
+    def duration_ns(self):
+        if self.end_ns is None:
+            return None
+        return self.end_ns - self.start_ns
+
+    def end(self):
+        """Close a span opened with Trace.start_span()."""
+        if self.end_ns is None:
+            self.end_ns = time.monotonic_ns()
+
+
+class Trace:
+    """
+    One card tap from read to decision.
+    Collects spans and hands a single record to the sink when finished.
+    """
+
+    sampled = True
+
+    def __init__(self, name, sink, attributes=None):
+        self.trace_id = os.urandom(8).hex()
+        self.name = name
+        self.sink = sink
+        self.attributes = dict(attributes or {})
+        self.timestamp = datetime.now().isoformat()
+        self.start_ns = time.monotonic_ns()
+        self.end_ns = None
+        self.spans = []
+        self._open = []
+
+    def _current(self):
+        """The innermost span() block still running, if any."""
+        return self._open[-1] if self._open else None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed block as a span of this trace (nested blocks become children)."""
+        span = Span(name, time.monotonic_ns(), attributes, self._current())
+        self.spans.append(span)
+        self._open.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            span.end_ns = time.monotonic_ns()
+            self._open.remove(span)
+
+    def start_span(self, name, **attributes):
+        """Open a span that ends later with span.end(), e.g. across a worker callback."""
+        span = Span(name, time.monotonic_ns(), attributes, self._current())
+        self.spans.append(span)
+        return span
+
+    def set_attribute(self, key, value):
+        """Attach a value (e.g. the final decision) to the trace."""
+        self.attributes[key] = value
+
+    def finish(self, **attributes):
+        """Close the trace and emit it to the sink. Safe to call twice."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.monotonic_ns()
+        self.attributes.update(attributes)
+        try:
+            self.sink.emit(self.to_dict())
+        except Exception as e:
+            print(f"Error writing trace: {e}")
+
+    def to_dict(self):
+        """
+        Serializable form; span offsets are relative to the trace start and
+        'parent' is the index of the enclosing span in 'spans' (None at top level).
+        """
+        end_ns = self.end_ns if self.end_ns is not None else time.monotonic_ns()
+        index = {id(span): i for i, span in enumerate(self.spans)}
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'timestamp': self.timestamp,
+            'duration_ns': end_ns - self.start_ns,
+            'attributes': self.attributes,
+            'spans': [
+                {
+                    'name': span.name,
+                    'parent': index[id(span.parent)] if span.parent is not None else None,
+                    'offset_ns': span.start_ns - self.start_ns,
+                    'duration_ns': span.duration_ns,
+                    'attributes': span.attributes,
+                }
+                for span in self.spans
+            ],
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        self.finish()
+        return False
+
+
+class _NullSpan:
+    """Stand-in span for unsampled traces."""
+
+    __slots__ = ()
+    attributes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def end(self):
+        pass
+
+
+class NullTrace:
+    """Unsampled trace: every operation is a cheap no-op."""
+
+    sampled = False
+    trace_id = None
+    _span = _NullSpan()
+
+    def span(self, name, **attributes):
+        return self._span
+
+    def start_span(self, name, **attributes):
+        return self._span
+
+    def set_attribute(self, key, value):
+        pass
+
+    def finish(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TRACE = NullTrace()
+
+
+class MemorySink:
+    """Keeps the most recent trace records in memory (bounded)."""
+
+    def __init__(self, max_records=1000):
+        self._records = deque(maxlen=max_records)
+
+    def emit(self, record):
+        self._records.append(record)
+
+    def get_records(self):
+        """Get collected trace records, oldest first."""
+        return list(self._records)
+
+    def clear(self):
+        self._records.clear()
+
+
+class JsonLinesSink:
+    """
+    Appends one JSON object per trace to a file.
+    Rotates to file.1 ... file.N once the file exceeds max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        """Shift file -> file.1 -> file.2 ..., dropping the oldest."""
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def emit(self, record):
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        with self._lock:
+            try:
+                if self.max_bytes and self.path.stat().st_size + len(line) > self.max_bytes:
+                    self._rotate()
+            except FileNotFoundError:
+                pass
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+
+class Tracer:
+    """
+    Creates traces for a fraction of taps (sample_rate 0.0 - 1.0).
+    Unsampled taps get NULL_TRACE, so instrumented code stays cheap.
+    """
+
+    def __init__(self, sample_rate=0.0, sink=None):
+        self.sample_rate = sample_rate
+        self.sink = sink or MemorySink()
+        self._random = random.Random()
+
+    def start_trace(self, name, **attributes):
+        """Start a trace if this call is sampled, else return NULL_TRACE."""
+        rate = self.sample_rate
+        if rate <= 0.0 or (rate < 1.0 and self._random.random() >= rate):
+            return NULL_TRACE
+        return Trace(name, self.sink, attributes)
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """Get the process-wide tracer (disabled until configured)."""
+    return _tracer
+
+
+def configure_tracing(sample_rate, path=None, sink=None, max_bytes=5 * 1024 * 1024,
+                      backup_count=3):
+    """
+    Configure the process-wide tracer.
+
+    Args:
+        sample_rate (float): Fraction of taps to trace, 0.0 disables tracing
+        path (str): Write traces as JSON lines to this rotating file
+        sink: Custom sink with an emit(record) method (default: in-memory)
+        max_bytes (int): Rotate the trace file after this many bytes
+        backup_count (int): Number of rotated trace files to keep
+
+    Returns:
+        Tracer: The configured tracer
+    """
+    if sink is None:
+        sink = JsonLinesSink(path, max_bytes, backup_count) if path else MemorySink()
+    _tracer.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+    _tracer.sink = sink
+    return _tracer
@@ -1,7 +1,11 @@
 import json
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
+from utils.metrics import STORAGE_FLUSH
+from utils.snapshot import get_snapshot
+from utils.state_sync import atomic_write_json, get_state_directory, synchronized_update
 
 class UsageCounter:
     """
@@ -13,14 +17,26 @@ class UsageCounter:
         self.data_dir = Path.home() / ".cardguard"
         self.data_dir.mkdir(exist_ok=True)
         self.data_file = self.data_dir / data_file
+        self.state = get_state_directory(self.data_dir)
+        # Held by refresh() and synchronized_update so reloads and updates don't interleave
+        self._update_lock = threading.RLock()
+        self.snapshot = get_snapshot(self.data_dir)
+        name = self.data_file.name
+        self._generations = {name: self.state.generations().get(name, 0)}
         self.data = self._load_data()
         
-    def _load_data(self):
-        """Load usage data from file."""
+    def _load_data(self, seed_snapshot=True):
+        """Load usage data from file (seeding the snapshot unless another process wrote it)."""
         if self.data_file.exists():
+            data = self.snapshot.load(self.data_file)
+            if data is not None:
+                return data
             try:
                 with open(self.data_file, 'r') as f:
-                    return json.load(f)
+                    data = json.load(f)
+                if seed_snapshot:
+                    self.snapshot.update(self.data_file, data)
+                return data
             except Exception as e:
                 print(f"Error loading usage data: {e}")
                 return self._initialize_data()
@@ -36,14 +52,28 @@ class UsageCounter:
             'launch_history': []
         }
         
+    def refresh(self):
+        """Reload usage data if another process changed it. Returns True if reloaded."""
+        with self._update_lock:
+            changed = self.state.changed(self._generations)
+            if changed:
+                self._generations.update(changed)
+                self.data = self._load_data(seed_snapshot=False)
+            return bool(changed)
+            
     def _save_data(self):
         """Save usage data to file."""
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.data, f, indent=4)
+            with STORAGE_FLUSH.time(file=self.data_file.name):
+                with self.state.write_lock():
+                    atomic_write_json(self.data_file, self.data, indent=4)
+                    name = self.data_file.name
+                    self._generations[name] = self.state.bump(name)
+                    self.snapshot.update(self.data_file, self.data)
         except Exception as e:
             print(f"Error saving usage data: {e}")
             
+    @synchronized_update
     def increment(self):
         """Increment usage counter."""
         self.data['total_launches'] += 1
@@ -70,6 +100,7 @@ class UsageCounter:
             'recent_launches': len(self.data['launch_history'])
         }
         
+    @synchronized_update
     def reset(self):
         """Reset usage counter."""
         self.data = self._initialize_data()
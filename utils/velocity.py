@@ -0,0 +1,174 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+from utils.metrics import VELOCITY_FLAGS
+
+# Reasons returned by VelocityTracker.check()
+CARD_VELOCITY = 'card_velocity'
+READER_SPREAD = 'reader_spread'
+NEW_CARD_BURST = 'new_card_burst'
+GLOBAL_VELOCITY = 'global_velocity'
+
+
+class SlidingWindowCounter:
+    """
+    Event count over the last `window` seconds, kept in a fixed ring of
+    time buckets. Adding an event and reading the count cost O(buckets).
+    """
+
+    __slots__ = ('width', 'buckets', '_counts', '_epochs')
+
+    def __init__(self, window: float, buckets: int = 12):
+        self.width = window / buckets
+        self.buckets = buckets
+        self._counts = [0] * buckets
+        self._epochs = [-1] * buckets
+
+    def add(self, now: float, count: int = 1) -> int:
+        """Record count events at time now; returns the total inside the window."""
+        epoch = int(now / self.width)
+        slot = epoch % self.buckets
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+        self._counts[slot] += count
+        return self.total(now)
+
+    def total(self, now: float) -> int:
+        oldest = int(now / self.width) - self.buckets
+        return sum(count for count, epoch in zip(self._counts, self._epochs) if epoch > oldest)
+
+
+class _CardState:
+    __slots__ = ('tokens', 'stamp', 'readers')
+
+    def __init__(self, tokens: float, stamp: float):
+        self.tokens = tokens
+        self.stamp = stamp
+        # reader_id -> last tap time, only allocated once a reader is reported
+        self.readers = None
+
+
+class VelocityTracker:
+    """
+    Detects cards tapped too often, cards seen at too many readers, and
+    bursts of never-seen cards (brute-forcing random IDs).
+
+    Each card gets a token bucket of max_card_taps taps refilled over
+    `window` seconds, plus the readers it was seen at in that window.
+    Tracked cards are kept in LRU order and capped at max_tracked, so
+    memory stays bounded however many distinct IDs are presented.
+    Global and new-card rates use one SlidingWindowCounter each. A check
+    is O(1) in the number of cards.
+    """
+
+    def __init__(self, window: float = 60.0, max_card_taps: int = 20, max_card_readers: int = 3,
+                 max_new_cards: int = 100, max_global_taps: Optional[int] = None,
+                 max_tracked: int = 50_000, buckets: int = 12,
+                 blacklist_reasons: Iterable[str] = (),
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            window (float): Length of the sliding window in seconds
+            max_card_taps (int): Taps allowed per card per window (0 disables)
+            max_card_readers (int): Distinct readers allowed per card per window (0 disables)
+            max_new_cards (int): Never-seen cards allowed per window (0 disables)
+            max_global_taps (int): Taps allowed across all cards per window (None disables)
+            max_tracked (int): Most cards tracked at once; least recently seen are dropped
+            buckets (int): Time buckets per window for the global counters
+            blacklist_reasons (iterable): Reasons that should get the card blacklisted
+                permanently (e.g. CARD_VELOCITY, READER_SPREAD); by default cards
+                are only flagged while they exceed a limit
+            clock (callable): Monotonic time source in seconds
+        """
+        self.window = window
+        self.max_card_taps = max_card_taps
+        self.max_card_readers = max_card_readers
+        self.max_new_cards = max_new_cards
+        self.max_global_taps = max_global_taps
+        self.max_tracked = max_tracked
+        self.blacklist_reasons = frozenset(blacklist_reasons)
+        self.clock = clock
+
+        self._refill_rate = max_card_taps / window if max_card_taps else 0.0
+        self._cards: 'OrderedDict[Hashable, _CardState]' = OrderedDict()
+        self._new_cards = SlidingWindowCounter(window, buckets)
+        self._taps = SlidingWindowCounter(window, buckets)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cards)
+
+    def check(self, card: Hashable, reader_id: Optional[Hashable] = None) -> Optional[str]:
+        """
+        Record a tap and test it against the limits.
+
+        Args:
+            card: Card key (e.g. its blacklist hash)
+            reader_id: Reader the tap came from, if known
+
+        Returns:
+            str: The limit exceeded (CARD_VELOCITY, READER_SPREAD,
+                NEW_CARD_BURST or GLOBAL_VELOCITY), or None
+        """
+        now = self.clock()
+        with self._lock:
+            reason = self._check(card, reader_id, now)
+        if reason is not None:
+            VELOCITY_FLAGS.inc(reason=reason)
+        return reason
+
+    def _check(self, card, reader_id, now):
+        cards = self._cards
+        state = cards.get(card)
+        is_new = state is None
+        if is_new:
+            if len(cards) >= self.max_tracked:
+                cards.popitem(last=False)
+            state = cards[card] = _CardState(self.max_card_taps, now)
+        else:
+            cards.move_to_end(card)
+            state.tokens = min(self.max_card_taps,
+                               state.tokens + (now - state.stamp) * self._refill_rate)
+            state.stamp = now
+
+        reason = None
+        if self.max_card_taps:
+            if state.tokens >= 1:
+                state.tokens -= 1
+            else:
+                reason = CARD_VELOCITY
+
+        if reader_id is not None and self.max_card_readers:
+            readers = state.readers
+            if readers is None:
+                readers = state.readers = {}
+            readers[reader_id] = now
+            if len(readers) > self.max_card_readers:
+                horizon = now - self.window
+                for seen_reader in [r for r, seen in readers.items() if seen < horizon]:
+                    del readers[seen_reader]
+                if len(readers) > self.max_card_readers:
+                    reason = reason or READER_SPREAD
+                    if len(readers) > self.max_card_readers + 1:
+                        # Keep the dict bounded while the card stays flagged
+                        del readers[min(readers, key=readers.get)]
+
+        if is_new and self.max_new_cards:
+            if self._new_cards.add(now) > self.max_new_cards:
+                reason = reason or NEW_CARD_BURST
+
+        if self.max_global_taps is not None:
+            if self._taps.add(now) > self.max_global_taps:
+                reason = reason or GLOBAL_VELOCITY
+        return reason
+
+    def forget(self, card: Hashable):
+        """Stop tracking a card (e.g. after it was unblocked)."""
+        with self._lock:
+            self._cards.pop(card, None)
+
+    def clear(self):
+        with self._lock:
+            self._cards.clear()